@@ -58,12 +58,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'platform_manager.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'platform_manager.middleware.UserRolesMiddleware',
     'platform_manager.middleware.PanelRedirectMiddleware',
     'platform_manager.middleware.RestrictAdminAccessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -200,10 +202,11 @@ STATIC_URL = '/static/'
 # MINIO_STORAGE_MEDIA_BUCKET_NAME = os.getenv('MINIO_STORAGE_MEDIA_BUCKET_NAME', 'deli-bikes')
 
 
-# Use local filesystem storage (much faster)
+# Use local filesystem storage (much faster). Uploads are stored once per content under
+# blobs/<sha256 prefix>/; use platform_manager.storage.ContentAddressedMinioStorage with MinIO.
 STORAGES = {
     "default": {
-        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "BACKEND": "platform_manager.storage.ContentAddressedFileSystemStorage",
     },
     "staticfiles": {
         "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
@@ -214,6 +217,46 @@ MEDIA_URL = '/media/'
 # Directory where uploaded media files are stored
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+# Media is served by platform_manager.views.protected_media after an access check. Set to
+# 'nginx' (X-Accel-Redirect to an internal location aliasing MEDIA_ROOT) or 'sendfile'
+# (X-Sendfile) to let the front proxy transfer the files; empty streams them from Django.
+PROTECTED_MEDIA_SERVER = os.getenv('PROTECTED_MEDIA_SERVER', '')
+PROTECTED_MEDIA_INTERNAL_URL = os.getenv('PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+
+# Wizard uploads are staged here (outside MEDIA_ROOT) until the form is submitted.
+# Run `manage.py purge_staged_uploads` periodically to drop abandoned drafts and files.
+WIZARD_UPLOAD_STAGING_ROOT = os.getenv('WIZARD_UPLOAD_STAGING_ROOT', os.path.join(BASE_DIR, 'upload_staging/'))
+WIZARD_UPLOAD_STAGING_TTL = int(os.getenv('WIZARD_UPLOAD_STAGING_TTL', 24 * 60 * 60))
+# Uploaded photos are downscaled to this many pixels on the longest side and re-encoded
+# without EXIF metadata before they are stored (format: JPEG, WEBP or PNG).
+UPLOAD_IMAGE_MAX_SIDE = int(os.getenv('UPLOAD_IMAGE_MAX_SIDE', 2560))
+UPLOAD_IMAGE_FORMAT = os.getenv('UPLOAD_IMAGE_FORMAT', 'JPEG')
+UPLOAD_IMAGE_QUALITY = int(os.getenv('UPLOAD_IMAGE_QUALITY', 85))
+# Unfinished form drafts are kept for a week so officers can resume them.
+FORM_DRAFT_TTL = int(os.getenv('FORM_DRAFT_TTL', 7 * 24 * 60 * 60))
+# Dashboard statistics on the responses list are cached for this many seconds.
+RESPONSE_STATS_CACHE_TTL = int(os.getenv('RESPONSE_STATS_CACHE_TTL', 60))
+# Paging of the responses list: 'keyset' (cursor links, no OFFSET/COUNT) or 'offset' (?page=N).
+RESPONSES_LIST_PAGINATION = os.getenv('RESPONSES_LIST_PAGINATION', 'keyset')
+# Largest number of responses the bulk export of the filtered responses list renders.
+BULK_EXPORT_MAX_RESPONSES = int(os.getenv('BULK_EXPORT_MAX_RESPONSES', 500))
+# Request profiling (off by default): per-view timings are exported at /metrics, and this share
+# of requests (plus every request slower than REQUEST_PROFILING_SLOW_MS) is logged as PERF events.
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', 'False').lower() == 'true'
+REQUEST_PROFILING_SAMPLE_RATE = float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', 0.05))
+REQUEST_PROFILING_SLOW_MS = int(os.getenv('REQUEST_PROFILING_SLOW_MS', 1000))
+# Addresses allowed to scrape /metrics without logging in as a superuser (none by default).
+# This is checked against REMOTE_ADDR: behind a reverse proxy every request comes from the
+# proxy's address, so only list addresses that reach the application directly.
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+# Group names of a user are cached for this many seconds (0 = per request only). Only enable
+# this with a cache shared by all workers: group changes are invalidated in the shared cache.
+USER_ROLES_CACHE_TTL = int(os.getenv('USER_ROLES_CACHE_TTL', 0))
+# Version of the threat scoring rules (platform_manager.scoring.RULESETS); defaults to the latest.
+# After switching, re-score stored answers with `manage.py recalculate_threat_levels --in-database`.
+if os.getenv('SCORING_RULES_VERSION'):
+    SCORING_RULES_VERSION = int(os.getenv('SCORING_RULES_VERSION'))
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -14,18 +14,23 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf.urls.i18n import i18n_patterns
 
 from django.conf import settings
 from django.conf.urls.static import static
 
 from django.views.generic import RedirectView
-from platform_manager.views import DashboardView
+from platform_manager.views import DashboardView, metrics, protected_media
 
 urlpatterns = [
     path('i18n/', include('django.conf.urls.i18n')),
+    # Uploaded files go through an access check instead of being served publicly
+    re_path(r'^%s(?P<name>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), protected_media, name='protected_media'),
+    path('metrics', metrics, name='metrics'),
 ]
 
 urlpatterns += i18n_patterns(   
@@ -35,4 +40,4 @@ urlpatterns += i18n_patterns(
     path('panel/', DashboardView.as_view(), name='manager_panel'),
     path('', RedirectView.as_view(url='/admin/', permanent=True)),
     prefix_default_language=True,
-) + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+) + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -2,9 +2,16 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from .models import User, Profile, AdminUser, NotificationTemplate, EventLog, FormResponse, BorderOfficerAssessment
+from .models import User, Profile, AdminUser, NotificationTemplate, EventLog, FormResponse, BorderOfficerAssessment, IngestedUpload
 from django.utils.safestring import mark_safe
 from django.utils.html import format_html
+import uuid
+
+from django.contrib.admin.views.main import ChangeList
+
+from .listing import list_queryset, serialize_row
+from .pagination import EstimatedCountPaginator
+from .search import search_responses
 
 class CustomUserAdmin(UserAdmin):
     model = User
@@ -109,15 +116,43 @@ class BorderOfficerAssessmentInline(admin.StackedInline):
     )
 
 
+class FormResponseChangeList(ChangeList):
+    """Changelist that loads only the columns of a list row (see platform_manager.listing)."""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        return list_queryset(super().get_queryset(request, exclude_parameters))
+
+    def get_results(self, request):
+        super().get_results(request)
+        # One serialized row per response, shared by the column methods below
+        for obj in self.result_list:
+            obj.list_row = serialize_row(obj)
+
+
 @admin.register(FormResponse)
 class FormResponseAdmin(admin.ModelAdmin):
-    list_display = ['get_full_name', 'get_country_display', 'threat_level_badge', 'total_score', 'created_by', 'created_at']
-    list_filter = ['threat_level', 'created_at', 'birth_place']
-    search_fields = ['last_name', 'first_name', 'patronymic', 'full_name_and_birth', 'id']
+    list_display = ['get_full_name', 'get_country_display', 'threat_level_badge', 'total_score', 'get_created_by', 'created_at']
+    list_select_related = ['created_by']
+    # Planner estimate instead of COUNT(*) for large tables, and no second count of the unfiltered table
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_filter = ['threat_level', 'created_date', 'birth_place']
+    search_fields = ['search_name']
     readonly_fields = ['id', 'created_at', 'total_score', 'threat_level']
-    date_hierarchy = 'created_at'
+    date_hierarchy = 'created_date'
+    ordering = ['-created_at']
     inlines = [BorderOfficerAssessmentInline]
     actions = ['delete_selected_responses']
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        try:
+            response_id = uuid.UUID(search_term)
+        except ValueError:
+            return search_responses(queryset, search_term), False
+        return queryset.filter(pk=response_id), False
     
     fieldsets = (
         ('Основная информация', {
@@ -144,22 +179,32 @@ class FormResponseAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_changelist(self, request, **kwargs):
+        return FormResponseChangeList
+    
+    def get_list_row(self, obj):
+        row = getattr(obj, 'list_row', None)
+        return row if row is not None else serialize_row(obj)
+    
     def get_full_name(self, obj):
-        if obj.last_name or obj.first_name:
-            return f"{obj.last_name} {obj.first_name} {obj.patronymic}".strip()
-        return obj.full_name_and_birth[:50] if obj.full_name_and_birth else "—"
+        return self.get_list_row(obj)['full_name'] or "—"
     get_full_name.short_description = 'ФИО'
     
     def get_country_display(self, obj):
-        if obj.birth_place and '|' in obj.birth_place:
-            country_name, country_code = obj.birth_place.split('|')
+        row = self.get_list_row(obj)
+        if row['country_code']:
             return format_html(
                 '<img src="https://flagcdn.com/w40/{}.png" style="width: 20px; height: auto; border-radius: 2px; vertical-align: middle; margin-right: 5px;"> {}',
-                country_code.lower(), country_name
+                row['country_code'], row['country_name']
             )
-        return obj.birth_place or "—"
+        return row['country_name'] or "—"
     get_country_display.short_description = 'Страна'
     
+    def get_created_by(self, obj):
+        return self.get_list_row(obj)['created_by_name'] or "—"
+    get_created_by.short_description = 'Пользователь'
+    get_created_by.admin_order_field = 'created_by'
+    
     def threat_level_badge(self, obj):
         colors = {
             'Низкий': '#36d399',
@@ -192,6 +237,17 @@ admin.site.register(NotificationTemplate)
 admin.site.register(EventLog)
 
 
+@admin.register(IngestedUpload)
+class IngestedUploadAdmin(admin.ModelAdmin):
+    list_display = ('name', 'field', 'original_size', 'size', 'normalized', 'created_at')
+    list_filter = ('field', 'normalized')
+    search_fields = ('name', 'original_name')
+    readonly_fields = ('name', 'field', 'original_name', 'original_size', 'size', 'normalized', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
 # Allow adding/removing users directly from Group admin page
 try:
     UserModel = get_user_model()
@@ -32,6 +32,38 @@ class PlatformManagerConfig(AppConfig):
         except Exception:
             # It's ok to fail here during migrate/initial setup — permissions may not exist yet.
             pass
+        # Keep the daily threat statistics rollup in sync with form responses.
+        from . import rollups
+        rollups.connect_signals()
+
+        # Downscale and strip metadata from uploaded photos before they are stored.
+        from . import ingest
+        ingest.connect_signals()
+
+        # Count references to content-addressed media and delete unreferenced files.
+        from . import blobs
+        blobs.connect_signals()
+
+        # Render photo thumbnails and export renditions when responses are saved.
+        from . import renditions
+        renditions.connect_signals()
+
+        # Delete stored PDF/DOCX exports of responses that changed.
+        from . import export_cache
+        export_cache.connect_signals()
+
+        # Drop cached user roles when group membership changes.
+        from . import roles
+        roles.connect_signals()
+
+        # Register the PDF export fonts once per process instead of on every export.
+        try:
+            from .exports import register_fonts
+            register_fonts()
+        except ImportError:
+            # ReportLab isn't installed; PDF export is unavailable but the rest works.
+            pass
+
         # Connect a signal so we can flag sessions after successful login.
         try:
             from django.contrib.auth.signals import user_logged_in
@@ -39,7 +71,7 @@ class PlatformManagerConfig(AppConfig):
             def _on_user_logged_in(sender, user, request, **kwargs):
                 # Flag the session so middleware can redirect on next request.
                 try:
-                    if user.groups.filter(name__in=['manager', 'submitter']).exists():
+                    if not roles.get_user_roles(user).isdisjoint(roles.PANEL_ROLES):
                         request.session['redirect_to_panel'] = True
                 except Exception:
                     # If anything goes wrong (e.g., during migrations), ignore.
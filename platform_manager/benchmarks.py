@@ -0,0 +1,386 @@
+"""End-to-end benchmarks of the main paths through the application.
+
+Each scenario drives the real views through the test ``Client`` (middleware,
+templates and all) on the current database, normally one filled by
+``generate_synthetic_data``: the responses list with each filter, name search,
+the detail page, the 22-step wizard submit, the officer assessment, the PDF and
+DOCX exports and the recalculation of all scores. ``run_benchmarks`` runs them,
+reports p50/p95 wall time and the SQL statement count, and compares them with a
+stored baseline.
+
+Every request commits its own transaction as in production, so timings include
+the commit and the ``on_commit`` work (rendition and export invalidation).
+Files go to a temporary ``MEDIA_ROOT`` and staging directory that are removed
+afterwards, and the run deletes the responses it submitted and restores the
+sample assessment, so writes don't pile up between runs. The recalculation runs
+in a transaction rolled back after it is timed, so its time leaves out the
+commit. Because the scenarios still write, ``run`` refuses a database that
+isn't the synthetic dataset unless it is told ``allow_writes``. The list statistics
+cache is disabled to measure the cold path; timings include the test client
+but no network or WSGI server, so only compare them with baselines taken on the
+same machine and dataset.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import export_cache, roles, scoring, uploads, wizard
+from .management.commands.generate_synthetic_data import USERNAME_PREFIX
+from .models import BorderOfficerAssessment, FormResponse
+from .services import SCORE_FIELDS
+
+BASELINE_PATH = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+
+# Last name of the responses the wizard scenario submits; they are deleted after the run
+WIZARD_LAST_NAME = 'Бенчмарков'
+
+SCENARIOS = {}
+
+
+class BenchmarkError(Exception):
+    """A scenario couldn't run or got an unexpected response."""
+
+
+@dataclass
+class Scenario:
+    name: str
+    func: object
+    description: str
+    # Slow scenarios that rewrite the whole table run fewer times
+    max_repeat: int = None
+    # Run each call in a transaction rolled back once it is timed
+    rollback: bool = False
+
+
+@dataclass
+class Result:
+    scenario: str
+    runs: int
+    p50_ms: float
+    p95_ms: float
+    queries: int
+
+
+def scenario(name, description, max_repeat=None, rollback=False):
+    def register(func):
+        SCENARIOS[name] = Scenario(name, func, description, max_repeat, rollback)
+        return func
+    return register
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+class Session:
+    """Logged-in clients and sample data shared by the scenarios."""
+
+    def __init__(self):
+        User = get_user_model()
+        self.manager = (
+            User.objects.filter(Q(is_superuser=True) | Q(groups__name=roles.MANAGER), is_active=True)
+            .order_by('date_joined').first()
+        )
+        sample = (
+            FormResponse.objects.filter(officer_assessment__isnull=False)
+            .select_related('officer_assessment').order_by('-created_at').first()
+        )
+        if self.manager is None or sample is None:
+            raise BenchmarkError(
+                "Benchmarks need a manager and assessed responses; run generate_synthetic_data first"
+            )
+        self.sample = sample
+        self.submitter = sample.created_by or self.manager
+        self.started_at = timezone.now()
+        # The assessment scenario changes the sample; these are written back afterwards
+        assessment = sample.officer_assessment
+        self.assessment_values = {
+            field.attname: getattr(assessment, field.attname)
+            for field in assessment._meta.concrete_fields
+            if not field.primary_key and field.name not in ('revision', 'updated_at')
+        }
+        self.manager_client = self.login(self.manager)
+        self.submitter_client = self.login(self.submitter)
+        self.assessment_runs = 0
+
+    def close(self):
+        """Undo what the scenarios wrote: delete the submitted responses and sessions, restore the sample."""
+        FormResponse.objects.filter(
+            created_by=self.submitter, created_at__gte=self.started_at, last_name=WIZARD_LAST_NAME,
+        ).delete()
+        if self.assessment_runs:
+            assessment = BorderOfficerAssessment.objects.get(form_response=self.sample)
+            for name, value in self.assessment_values.items():
+                setattr(assessment, name, value)
+            assessment.save()
+            response = FormResponse.objects.get(pk=self.sample.pk)
+            response.apply_assessment_score(assessment)
+            response.save(update_fields=SCORE_FIELDS)
+        self.manager_client.logout()
+        self.submitter_client.logout()
+
+    def login(self, user):
+        client = Client()
+        client.force_login(user)
+        # The first page after login is redirected to the panel
+        client.get('/ru/panel/')
+        return client
+
+    def get(self, client, url, params=None, status=200, **headers):
+        response = client.get(url, params or {}, **headers)
+        return self.check(response, url, status)
+
+    def post(self, client, url, data, status=200, **headers):
+        response = client.post(url, data, **headers)
+        return self.check(response, url, status)
+
+    def check(self, response, url, status):
+        if response.status_code != status:
+            raise BenchmarkError(f'{url} answered {response.status_code}, expected {status}')
+        if response.streaming:
+            # Exports are streamed; the body is produced while it is consumed
+            b''.join(response.streaming_content)
+        return response
+
+    def list_url(self):
+        return reverse('platform_manager:form_responses')
+
+    def response_url(self, name):
+        return reverse(f'platform_manager:{name}', args=[self.sample.pk])
+
+
+def _list(params):
+    def run(session):
+        session.get(session.manager_client, session.list_url(), params(session))
+    return run
+
+
+def _filter_dates(session):
+    today = timezone.localdate()
+    return {'date_from': (today - timedelta(days=30)).isoformat(), 'date_to': today.isoformat()}
+
+
+scenario('list', 'Responses list, no filters')(_list(lambda session: {}))
+scenario('list_created_by', 'Responses list by submitter')(
+    _list(lambda session: {'created_by': str(session.sample.created_by_id)})
+)
+scenario('list_threat_level', 'Responses list by threat level')(
+    _list(lambda session: {'threat_level': session.sample.threat_level})
+)
+scenario('list_country', 'Responses list by country')(
+    _list(lambda session: {'country': session.sample.birth_place})
+)
+scenario('list_dates', 'Responses list, last 30 days')(_list(_filter_dates))
+scenario('search', 'Name search')(_list(lambda session: {'search': session.sample.last_name[:5]}))
+
+
+@scenario('detail', 'Response detail page')
+def detail(session):
+    session.get(session.manager_client, session.response_url('form_response_detail'))
+
+
+@scenario('wizard_submit', 'Questionnaire wizard, 22 steps and submit', max_repeat=10)
+def wizard_submit(session):
+    url = reverse('platform_manager:form_submit')
+    headers = {'HTTP_X_WIZARD_FRAGMENT': '1'}
+    for number in range(1, wizard.TOTAL_STEPS):
+        data = {'current_step': number, 'action': 'next'}
+        if number == 1:
+            data.update(last_name=WIZARD_LAST_NAME, first_name='Ерлан')
+        session.post(session.submitter_client, url, data, **headers)
+    session.post(session.submitter_client, url, {'current_step': wizard.TOTAL_STEPS, 'action': 'submit'}, **headers)
+
+
+@scenario('assessment', 'Officer assessment')
+def assessment(session):
+    # Flip one criterion every run so each save changes the score
+    session.assessment_runs += 1
+    criteria = scoring.score_fields('assessment')
+    data = {name: 'on' for name in criteria[1:] if getattr(session.sample.officer_assessment, name)}
+    if session.assessment_runs % 2:
+        data[criteria[0]] = 'on'
+    session.post(session.manager_client, session.response_url('officer_assessment'), data, status=302)
+
+
+@scenario('pdf', 'PDF export of one response, repeated')
+def pdf(session):
+    session.get(session.manager_client, session.response_url('export_response_pdf'))
+
+
+@scenario('docx', 'DOCX export of one response, repeated')
+def docx(session):
+    session.get(session.manager_client, session.response_url('export_response_docx'))
+
+
+@scenario('pdf_uncached', 'PDF export rendered from scratch')
+def pdf_uncached(session):
+    export_cache.delete_exports(session.sample.pk)
+    pdf(session)
+
+
+@scenario('recalculate', 'Re-score every response', max_repeat=3, rollback=True)
+def recalculate(session):
+    scoring.rescore()
+
+
+@contextmanager
+def rolled_back(rollback):
+    """Roll back what the block wrote when ``rollback`` is set."""
+    if not rollback:
+        yield
+        return
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(session, item, repeat):
+    # One untimed run warms up caches and lazy imports
+    with rolled_back(item.rollback):
+        item.func(session)
+    timings = []
+    queries = []
+    for _ in range(min(repeat, item.max_repeat or repeat)):
+        with CaptureQueriesContext(connection) as captured, rolled_back(item.rollback):
+            start = time.perf_counter()
+            item.func(session)
+            timings.append(time.perf_counter() - start)
+        queries.append(len(captured))
+    return Result(
+        scenario=item.name,
+        runs=len(timings),
+        p50_ms=round(percentile(timings, 50) * 1000, 2),
+        p95_ms=round(percentile(timings, 95) * 1000, 2),
+        queries=max(queries),
+    )
+
+
+@contextmanager
+def temporary_media(sample):
+    """Store files in temporary directories, starting with copies of the files of ``sample``."""
+    names = [
+        getattr(instance, field.name).name
+        for instance in (sample, sample.officer_assessment)
+        for field in instance._meta.concrete_fields
+        if isinstance(field, models.FileField) and getattr(instance, field.name)
+    ]
+    sources = {}
+    for name in names:
+        try:
+            sources[name] = default_storage.path(name)
+        except NotImplementedError:
+            # Remote storages don't depend on MEDIA_ROOT; their files stay where they are
+            break
+    media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+    staging_root = tempfile.mkdtemp(prefix='benchmark-staging-')
+    try:
+        with override_settings(MEDIA_ROOT=media_root, WIZARD_UPLOAD_STAGING_ROOT=staging_root):
+            uploads.get_staging_storage.cache_clear()
+            for name, source in sources.items():
+                if os.path.exists(source):
+                    target = default_storage.path(name)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(source, target)
+            yield
+    finally:
+        uploads.get_staging_storage.cache_clear()
+        shutil.rmtree(media_root, ignore_errors=True)
+        shutil.rmtree(staging_root, ignore_errors=True)
+
+
+def is_synthetic():
+    """Whether every response in the database was made by ``generate_synthetic_data``."""
+    responses = FormResponse.objects.all()
+    return responses.exists() and not responses.exclude(created_by__username__startswith=USERNAME_PREFIX).exists()
+
+
+def run(names=None, repeat=20, progress=None, allow_writes=False):
+    """Run the scenarios ``names`` (all by default) and return their results.
+
+    The scenarios write to the database, so unless ``allow_writes`` is set it
+    must hold only the synthetic dataset.
+    """
+    unknown = set(names or ()) - set(SCENARIOS)
+    if unknown:
+        raise BenchmarkError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if not allow_writes and not is_synthetic():
+        raise BenchmarkError(
+            "The benchmarks write to the database and this one isn't only synthetic data; "
+            "run generate_synthetic_data on a separate database or pass run_benchmarks --allow-writes"
+        )
+    selected = [SCENARIOS[name] for name in names] if names else list(SCENARIOS.values())
+    results = []
+    # The test client sends Host: testserver
+    hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+    with override_settings(ALLOWED_HOSTS=hosts, RESPONSE_STATS_CACHE_TTL=0):
+        session = Session()
+        with temporary_media(session.sample):
+            try:
+                for item in selected:
+                    if progress:
+                        progress(item)
+                    results.append(measure(session, item, repeat))
+            finally:
+                session.close()
+    return results
+
+
+def dataset():
+    """What the numbers were measured on, stored with the baseline."""
+    return {
+        'vendor': connection.vendor,
+        'responses': FormResponse.objects.count(),
+        'assessments': BorderOfficerAssessment.objects.count(),
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    """Store ``results`` in the baseline, keeping the entries of scenarios that didn't run."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    previous = load_baseline(path) or {}
+    baseline = {
+        'created_at': timezone.now().isoformat(),
+        'dataset': dataset(),
+        'results': {**previous.get('results', {}), **{result.scenario: asdict(result) for result in results}},
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, indent=2, ensure_ascii=False)
+    return baseline
+
+
+def regressions(result, baseline, tolerance):
+    """Reasons ``result`` is worse than its ``baseline`` entry; empty when it isn't."""
+    if not baseline:
+        return []
+    reasons = []
+    if result.p95_ms > baseline['p95_ms'] * (1 + tolerance):
+        reasons.append(f"p95 {result.p95_ms} ms > {baseline['p95_ms']} ms")
+    if result.queries > baseline['queries']:
+        reasons.append(f"{result.queries} queries > {baseline['queries']}")
+    return reasons
@@ -0,0 +1,140 @@
+"""Reference counting of content-addressed media (see ``platform_manager.storage``).
+
+Every file field of ``FormResponse``, ``BorderOfficerAssessment`` and
+``Profile`` that holds a blob counts as one reference in ``MediaBlob``. Saves
+that replace a file move the reference, deletes drop it. When the last
+reference goes the blob and its renditions are deleted after the transaction
+commits. Names outside the blob root (files stored before content addressing)
+are not counted and never deleted.
+
+Storing content also holds a reference (``pin()``) until the transaction
+commits, taken before the storage trusts an existing file. The ``MediaBlob``
+row is the lock both sides go through: a blob is only deleted together with a
+row whose count is 0, so a concurrent upload of the same content either waits
+and keeps the file or finds the row gone and writes the file again.
+
+Changes made with ``QuerySet.update()`` or ``bulk_update()`` bypass signals, so
+bulk jobs run ``rebuild_media_blobs`` afterwards.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import BorderOfficerAssessment, FormResponse, MediaBlob, Profile
+from .renditions import RENDITIONS, rendition_name
+from .storage import ContentAddressedStorageMixin, is_blob
+
+BLOB_MODELS = (FormResponse, BorderOfficerAssessment, Profile)
+
+
+def blob_fields(model):
+    return [
+        field for field in model._meta.fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorageMixin)
+    ]
+
+
+def _names(instance, fields):
+    return {field.attname: getattr(instance, field.attname).name or '' for field in fields}
+
+
+def add_reference(name):
+    if MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, ref_count=1)
+    except IntegrityError:
+        # A concurrent request created the row first
+        MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def drop_reference(name, storage):
+    # The row stays at 0 until _delete_blob removes it with the file
+    MediaBlob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    transaction.on_commit(lambda: _delete_blob(name, storage))
+
+
+def pin(name, storage):
+    """Hold a reference to the blob ``name`` being stored until the transaction commits.
+
+    The field that gets the name adds its own reference when its instance is
+    saved; content stored but never saved on an instance is deleted again.
+    Outside a transaction there is nothing to hold the reference for.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        return
+    add_reference(name)
+    transaction.on_commit(lambda: drop_reference(name, storage))
+
+
+def _delete_blob(name, storage):
+    with transaction.atomic():
+        # Waits for transactions still referring to the blob; they may have attached the content again
+        deleted, _ = MediaBlob.objects.filter(name=name, ref_count=0).delete()
+        if deleted:
+            # Still holding the row, so nobody relies on the file while it goes
+            storage.delete(name)
+            for size in RENDITIONS:
+                storage.delete(rendition_name(name, size))
+
+
+def _remember_previous_names(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._blob_previous_names = None
+    fields = blob_fields(sender)
+    if instance._state.adding or not fields:
+        return
+    if update_fields is not None and not {field.name for field in fields} & set(update_fields):
+        return
+    instance._blob_previous_names = (
+        sender.objects.filter(pk=instance.pk).values(*[field.attname for field in fields]).first()
+    )
+
+
+def _on_saved(sender, instance, created, update_fields=None, **kwargs):
+    previous = getattr(instance, '_blob_previous_names', None)
+    instance._blob_previous_names = None
+    if not created and previous is None:
+        return
+    fields = blob_fields(sender)
+    current = _names(instance, fields)
+    for field in fields:
+        old = (previous or {}).get(field.attname) or ''
+        new = current[field.attname]
+        if old == new:
+            continue
+        if is_blob(new):
+            add_reference(new)
+        if is_blob(old):
+            drop_reference(old, field.storage)
+
+
+def _on_deleted(sender, instance, **kwargs):
+    for field in blob_fields(sender):
+        name = getattr(instance, field.attname).name
+        if is_blob(name):
+            drop_reference(name, field.storage)
+
+
+def rebuild():
+    """Recount the references of every blob; returns the number of referenced blobs."""
+    counts = Counter()
+    for model in BLOB_MODELS:
+        for field in blob_fields(model):
+            names = model.objects.exclude(**{field.attname: ''}).values_list(field.attname, flat=True)
+            counts.update(name for name in names.iterator() if is_blob(name))
+    with transaction.atomic():
+        MediaBlob.objects.all().delete()
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(name=name, ref_count=count) for name, count in counts.items()], batch_size=1000
+        )
+    return len(counts)
+
+
+def connect_signals():
+    for model in BLOB_MODELS:
+        pre_save.connect(_remember_previous_names, sender=model, dispatch_uid=f'media_blob_pre_save_{model.__name__}')
+        post_save.connect(_on_saved, sender=model, dispatch_uid=f'media_blob_post_save_{model.__name__}')
+        post_delete.connect(_on_deleted, sender=model, dispatch_uid=f'media_blob_post_delete_{model.__name__}')
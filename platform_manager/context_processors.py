@@ -1,8 +1,11 @@
 from django.urls import reverse
 
+from .roles import MANAGER, get_user_roles
+
 def menu_items(request):
     """Add custom menu items to the admin template context."""
     items = []
+    roles = get_user_roles(request.user)
     
     if request.user.is_authenticated:
         items.append({
@@ -17,7 +20,7 @@ def menu_items(request):
         })
         
         # Добавляем пункт меню "Просмотр ответов" только для менеджеров
-        if request.user.groups.filter(name='manager').exists():
+        if MANAGER in roles:
             items[0]['children'].append({
                 'title': 'Просмотр ответов',
                 'url': reverse('platform_manager:form_responses'),
@@ -25,7 +28,7 @@ def menu_items(request):
     
     is_manager = False
     try:
-        is_manager = request.user.is_authenticated and request.user.groups.filter(name='manager').exists()
+        is_manager = request.user.is_authenticated and MANAGER in roles
     except Exception:
         is_manager = False
 
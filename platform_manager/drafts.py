@@ -0,0 +1,106 @@
+"""Server-side drafts for the multi-step form wizard.
+
+The session only remembers which draft the wizard is working on. Answers live
+in ``FormDraftStep`` rows, one per step, so a step POST upserts just its own
+fields instead of rewriting the whole questionnaire. A draft can be resumed on
+another device with ``?draft=<id>``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import uploads
+from .models import FormDraft, FormDraftStep
+
+
+def _session_key(form_response_id=None):
+    if form_response_id is None:
+        return 'form_draft_id'
+    return f'form_draft_id:{form_response_id}'
+
+
+def get_draft(request, form_response=None, create=True):
+    """Return the user's current draft, optionally creating a new one.
+
+    A ``draft`` query parameter takes precedence over the draft remembered in
+    the session. The wizard keeps it in its form action and redirects, so each
+    tab stays on its own draft, and it lets officers resume a draft started
+    elsewhere.
+    """
+    key = _session_key(form_response.pk if form_response is not None else None)
+    draft_id = request.GET.get('draft') or request.session.get(key)
+    draft = None
+    if draft_id:
+        try:
+            draft = FormDraft.objects.filter(pk=draft_id, user=request.user, form_response=form_response).first()
+        except ValidationError:
+            draft = None
+    if draft is None and create:
+        draft = FormDraft.objects.create(user=request.user, form_response=form_response)
+    if draft is not None and request.session.get(key) != str(draft.pk):
+        request.session[key] = str(draft.pk)
+    return draft
+
+
+def save_step(draft, step, data, files=None):
+    """Upsert the answers of one step.
+
+    Handles of newly staged files replace the ones previously saved for the same
+    field; the replaced staged files are deleted once the transaction commits.
+    """
+    replaced = {}
+    with transaction.atomic():
+        step_obj, _ = FormDraftStep.objects.select_for_update().get_or_create(draft=draft, step=step)
+        step_obj.data = data
+        for field_name, handle in (files or {}).items():
+            if field_name in step_obj.files:
+                replaced[field_name] = step_obj.files[field_name]
+            step_obj.files[field_name] = handle
+        step_obj.save()
+        FormDraft.objects.filter(pk=draft.pk).update(current_step=step, updated_at=timezone.now())
+    draft.current_step = step
+    if replaced:
+        transaction.on_commit(lambda: uploads.discard_staged_files(replaced))
+
+
+def delete_draft(request, draft, file_data=None):
+    """Delete a draft with its staged files and forget it in the session."""
+    if file_data is None:
+        _, file_data = draft.get_data()
+    key = _session_key(draft.form_response_id)
+    draft_id = str(draft.pk)
+    draft.delete()
+    transaction.on_commit(lambda: uploads.discard_staged_files(file_data))
+    if request.session.get(key) == draft_id:
+        request.session.pop(key, None)
+
+
+def referenced_staged_paths():
+    """Return staged file paths that still belong to a draft."""
+    paths = set()
+    for files in FormDraftStep.objects.exclude(files={}).values_list('files', flat=True):
+        for handle in files.values():
+            if isinstance(handle, dict) and 'path' in handle:
+                paths.add(handle['path'])
+    return paths
+
+
+def purge_expired_drafts(max_age=None):
+    """Delete drafts untouched for ``max_age`` seconds and return their count.
+
+    Defaults to ``FORM_DRAFT_TTL`` (7 days).
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'FORM_DRAFT_TTL', 7 * 24 * 60 * 60)
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    removed = 0
+    for draft in FormDraft.objects.filter(updated_at__lt=cutoff):
+        _, file_data = draft.get_data()
+        with transaction.atomic():
+            draft.delete()
+        uploads.discard_staged_files(file_data)
+        removed += 1
+    return removed
@@ -0,0 +1,94 @@
+"""Rendered PDF/DOCX exports kept in storage.
+
+The same response is often exported several times (by the officer, the
+supervisor, then for the file) without changing in between. The first export is
+stored under ``exports/<response pk>/`` with a name made of the revisions of the
+response and its assessment, the language and the format; later exports with
+the same name are served from storage instead of being rendered again.
+
+Every save of a response or assessment bumps its ``revision`` (score
+recalculations too), so an edit or assessment leads to a new name by itself.
+``connect_signals`` deletes the stored files of a response when it or its
+assessment is saved or deleted. Bulk recalculations don't send signals: the
+files they leave behind are never served and go with the next save or delete.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import translation
+
+from .models import BorderOfficerAssessment, FormResponse
+
+EXPORT_ROOT = 'exports'
+
+
+def export_directory(pk):
+    return f'{EXPORT_ROOT}/{pk}'
+
+
+def export_name(response_obj, kind, language=None):
+    """Storage name of the ``kind`` ('pdf' or 'docx') export of this revision of ``response_obj``."""
+    try:
+        assessment = response_obj.officer_assessment
+    except BorderOfficerAssessment.DoesNotExist:
+        assessment = None
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    revisions = [response_obj.revision, assessment.revision if assessment else 0]
+    # Concurrent saves may count the same revision; their timestamps still differ
+    stamps = '|'.join(obj.updated_at.isoformat() for obj in (response_obj, assessment) if obj is not None)
+    digest = hashlib.sha256(stamps.encode()).hexdigest()[:12]
+    return f'{export_directory(response_obj.pk)}/{revisions[0]}-{revisions[1]}-{digest}.{language}.{kind}'
+
+
+def get_export(response_obj, kind, storage=default_storage):
+    """Storage name of the ``kind`` export of ``response_obj``, rendered on first use."""
+    from .exports import FILE_RENDERERS
+
+    name = export_name(response_obj, kind)
+    if storage.exists(name):
+        return name
+    output = FILE_RENDERERS[kind](response_obj)
+    try:
+        saved = storage.save(name, File(output, name))
+    finally:
+        output.close()
+    if saved != name:
+        # A concurrent export of the same revision was stored first
+        storage.delete(saved)
+    return name
+
+
+def delete_exports(pk, storage=default_storage):
+    """Delete every stored export of the response ``pk``."""
+    directory = export_directory(pk)
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for file_name in files:
+        storage.delete(f'{directory}/{file_name}')
+
+
+def _on_response_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        # Deleting clears instance.pk before the transaction commits
+        pk = instance.pk
+        transaction.on_commit(lambda: delete_exports(pk))
+
+
+def _on_assessment_changed(sender, instance, **kwargs):
+    pk = instance.form_response_id
+    transaction.on_commit(lambda: delete_exports(pk))
+
+
+def connect_signals():
+    post_save.connect(_on_response_changed, sender=FormResponse, dispatch_uid='export_cache_response_saved')
+    post_delete.connect(_on_response_changed, sender=FormResponse, dispatch_uid='export_cache_response_deleted')
+    post_save.connect(_on_assessment_changed, sender=BorderOfficerAssessment, dispatch_uid='export_cache_assessment_saved')
+    post_delete.connect(
+        _on_assessment_changed, sender=BorderOfficerAssessment, dispatch_uid='export_cache_assessment_deleted'
+    )
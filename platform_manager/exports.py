@@ -0,0 +1,902 @@
+"""PDF and DOCX rendering of form responses.
+
+ReportLab setup is done once per process instead of on every export: the
+DejaVu fonts are registered at app startup (``register_fonts()`` is called from
+``PlatformManagerConfig.ready``), and paragraph/table styles are built once per
+set of fonts and shared. Documents are rendered into a spooled temporary file
+that is streamed to the client with ``FileResponse``.
+
+Rendering doesn't touch the database as long as the response is loaded with
+``select_related('officer_assessment', 'created_by')``. Every PDF being built
+takes its own copy of the fonts from ``document_fonts()``, as ReportLab fonts
+can't be shared between the threads of a threaded server.
+"""
+import itertools
+import os
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.text import get_valid_filename
+from django.utils.translation import gettext as _
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import BaseDocTemplate, Frame, PageBreak, PageTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import Image as RLImage
+
+from .renditions import rendition_file
+
+WATERMARK_TEXT = 'АБАЙ'
+WATERMARK_FONT_SIZE = 180
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Rendered documents stay in memory up to this size, larger ones spill to disk.
+SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+# Chunk size used when copying rendered files into a streamed archive.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# Registered font copies not used by a document being built right now
+_free_fonts = []
+_free_fonts_lock = threading.Lock()
+_font_copies = itertools.count()
+
+
+@lru_cache(maxsize=None)
+def register_fonts(copy=0):
+    """Register the Cyrillic DejaVu fonts once and return ``(normal_font, bold_font)``.
+
+    Copies other than the first are registered under names ending in ``-<copy>``.
+    """
+    suffix = f'-{copy}' if copy else ''
+    fonts_dir = os.path.join(settings.BASE_DIR, 'fonts')
+    try:
+        pdfmetrics.registerFont(TTFont(f'DejaVuSans{suffix}', os.path.join(fonts_dir, 'DejaVuSans.ttf')))
+        pdfmetrics.registerFont(TTFont(f'DejaVuSans-Bold{suffix}', os.path.join(fonts_dir, 'DejaVuSans-Bold.ttf')))
+        return f'DejaVuSans{suffix}', f'DejaVuSans-Bold{suffix}'
+    except Exception:
+        # Fallback to Helvetica if DejaVu fonts not available
+        return 'Helvetica', 'Helvetica-Bold'
+
+
+@contextmanager
+def document_fonts():
+    """Fonts no other document uses until the block exits, as ``(normal_font, bold_font)``.
+
+    A TrueType font keeps its subsetting state, including the read position in
+    the font file, on the registered font object, so PDFs built at the same
+    time must not share one. Copies are registered when every existing one is
+    in use and reused afterwards: there are as many as PDFs were ever built at
+    once.
+    """
+    with _free_fonts_lock:
+        fonts = _free_fonts.pop() if _free_fonts else None
+    if fonts is None:
+        fonts = register_fonts(next(_font_copies))
+    try:
+        yield fonts
+    finally:
+        with _free_fonts_lock:
+            _free_fonts.append(fonts)
+
+
+@lru_cache(maxsize=None)
+def get_styles(fonts):
+    """Paragraph and table styles shared by all exports using ``fonts``."""
+    normal_font, bold_font = fonts
+    sample = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=sample['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#1f2937'),
+            spaceAfter=20,
+            alignment=TA_CENTER,
+            fontName=bold_font
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=sample['Heading2'],
+            fontSize=12,
+            textColor=colors.HexColor('#1f2937'),
+            spaceAfter=10,
+            spaceBefore=15,
+            fontName=bold_font
+        ),
+        'normal': ParagraphStyle(
+            'CustomNormal',
+            parent=sample['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#1f2937'),
+            fontName=normal_font
+        ),
+        'table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.white),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#4b5563')),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1f2937')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e5e7eb'))
+        ]),
+        'footer_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3f4f6')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#1f2937')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), bold_font),
+            ('FONTNAME', (1, 0), (-1, -1), normal_font),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e5e7eb'))
+        ]),
+    }
+
+
+@lru_cache(maxsize=None)
+def _watermark_width(bold_font):
+    return pdfmetrics.stringWidth(WATERMARK_TEXT, bold_font, WATERMARK_FONT_SIZE)
+
+
+def draw_watermark(canvas, doc):
+    """Draw the rotated 'АБАЙ' watermark in the middle of the page."""
+    _, bold_font = doc.fonts
+    canvas.saveState()
+    canvas.setFont(bold_font, WATERMARK_FONT_SIZE)
+    canvas.setFillColor(colors.HexColor('#1e40af'))
+    canvas.setFillAlpha(0.08)
+    canvas.translate(A4[0]/2, A4[1]/2)
+    canvas.rotate(-12)
+    canvas.drawString(-_watermark_width(bold_font)/2, -90, WATERMARK_TEXT)
+    canvas.restoreState()
+
+
+class ResponseDocTemplate(BaseDocTemplate):
+    """A4 document with the watermark page template.
+
+    Frames keep layout state while a document is built, so every document gets
+    its own (cheap) frame; styles are shared. ``fonts`` are the
+    ``document_fonts()`` the story was built with.
+    """
+
+    def __init__(self, filename, fonts, **kwargs):
+        kwargs.setdefault('pagesize', A4)
+        kwargs.setdefault('topMargin', 1.5*cm)
+        kwargs.setdefault('bottomMargin', 1.5*cm)
+        kwargs.setdefault('leftMargin', 2*cm)
+        kwargs.setdefault('rightMargin', 2*cm)
+        super().__init__(filename, **kwargs)
+        self.fonts = fonts
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([PageTemplate(id='watermark', frames=frame, onPage=draw_watermark)])
+
+
+def build_response_story(response_obj, fonts):
+    """Return the list of flowables describing ``response_obj`` set in ``fonts``."""
+    styles = get_styles(fonts)
+    story = []
+
+    # Title
+    story.append(Paragraph(_("Form Response"), styles['title']))
+    story.append(Spacer(1, 0.5*cm))
+
+    # Helper function for yes/no with details
+    def add_field(data, question, yes_no_field, details_field=None, details_label=None):
+        yes_no = _('Yes') if yes_no_field else _('No')
+        data.append([Paragraph(question, styles['normal']), Paragraph(yes_no, styles['normal'])])
+        if details_field and details_field.strip():
+            if details_label:
+                data.append([Paragraph(details_label, styles['normal']), Paragraph(details_field.replace('\n', '<br/>'), styles['normal'])])
+
+    # Section 1: Biographical Data
+    story.append(Paragraph(_("Biographical Data"), styles['heading']))
+    bio_data = []
+
+    # Question 1
+    full_name_parts = []
+    if response_obj.last_name:
+        full_name_parts.append(response_obj.last_name)
+    if response_obj.first_name:
+        full_name_parts.append(response_obj.first_name)
+    if response_obj.patronymic:
+        full_name_parts.append(response_obj.patronymic)
+    full_name = ' '.join(full_name_parts) if full_name_parts else ''
+
+    birth_info_parts = []
+    if response_obj.birth_date:
+        # Handle both date objects and string representations
+        if isinstance(response_obj.birth_date, str):
+            birth_info_parts.append(f'{_("Birth date")}: {response_obj.birth_date}')
+        else:
+            birth_info_parts.append(f'{_("Birth date")}: {response_obj.birth_date.strftime("%d.%m.%Y")}')
+    if response_obj.birth_place:
+        birth_info_parts.append(f'{_("Birth place")}: {response_obj.birth_place}')
+    birth_info = '<br/>'.join(birth_info_parts) if birth_info_parts else ''
+
+    q1_answer = '<br/>'.join(filter(None, [full_name, birth_info])) if full_name or birth_info else '—'
+
+    bio_data.append([
+        Paragraph(_('1. Full name, date and place of birth'), styles['normal']),
+        Paragraph(q1_answer, styles['normal'])
+    ])
+
+    # Question 2
+    add_field(bio_data, _('2. Changed surname/name/patronymic'), response_obj.name_changed, 
+        response_obj.name_change_reason, _('Reason for change'))
+
+    # Question 3
+    bio_data.append([
+        Paragraph(_('3. Phones and email'), styles['normal']),
+        Paragraph(response_obj.phones_emails.replace('\n', '<br/>') if response_obj.phones_emails else '—', styles['normal'])
+    ])
+
+    # Question 4
+    add_field(bio_data, _('4. Military service'), response_obj.military_service,
+        response_obj.military_details, _('Service details'))
+
+    bio_table = Table(bio_data, colWidths=[7*cm, 10*cm])
+    bio_table.setStyle(styles['table'])
+    story.append(bio_table)
+    story.append(Spacer(1, 0.5*cm))
+
+    # Section 2: Criminal and Legal Information
+    story.append(Paragraph(_("Сriminal and Legal Information"), styles['heading']))
+    criminal_data = []
+
+    # Question 5
+    add_field(criminal_data, _('5. Criminal record'), response_obj.criminal_record,
+        (response_obj.criminal_period_where or '') + '\n' + (response_obj.criminal_offenses or '') if response_obj.criminal_period_where or response_obj.criminal_offenses else None,
+        _('Period and place of imprisonment / For which crimes'))
+
+    # Question 6
+    add_field(criminal_data, _('6. Detentions abroad'), response_obj.detained_abroad,
+        (response_obj.detained_when_why or '') + ('\n' + response_obj.detained_where if response_obj.detained_where else ''),
+        _('When and why / Where detained'))
+
+    criminal_table = Table(criminal_data, colWidths=[7*cm, 10*cm])
+    criminal_table.setStyle(styles['table'])
+    story.append(criminal_table)
+    story.append(Spacer(1, 0.5*cm))
+
+    # Section 3: Relatives and Religion
+    story.append(Paragraph(_("Relatives and Religion"), styles['heading']))
+    relatives_data = []
+
+    # Question 7
+    add_field(relatives_data, _('7. Relatives in specified countries'), response_obj.relatives_in_countries,
+        response_obj.relatives_details, _('Relatives details'))
+
+    # Question 8
+    add_field(relatives_data, _('8. Religious'), response_obj.religious,
+        response_obj.denomination, _('Denomination/views'))
+
+    # Question 9 (previously was question 8 about relatives_wanted)
+    if response_obj.relatives_wanted:
+        relatives_data.append([
+            Paragraph(_('9. Are relatives wanted'), styles['normal']),
+            Paragraph(_('Yes'), styles['normal'])
+        ])
+        if response_obj.relatives_wanted_reason and response_obj.relatives_wanted_reason.strip():
+            relatives_data.append([
+                Paragraph(_('Reason for search'), styles['normal']),
+                Paragraph(response_obj.relatives_wanted_reason.replace('\n', '<br/>'), styles['normal'])
+            ])
+
+    relatives_table = Table(relatives_data, colWidths=[7*cm, 10*cm])
+    relatives_table.setStyle(styles['table'])
+    story.append(relatives_table)
+    story.append(Spacer(1, 0.5*cm))
+
+    # Section 4: Travel and Deportations
+    story.append(Paragraph(_("Travel and Deportations"), styles['heading']))
+    travel_data = []
+
+    # Question 10
+    add_field(travel_data, _('10. Visited specified countries'), response_obj.visited_countries,
+        response_obj.visited_countries_details, _('Visit details'))
+
+    # Question 11
+    add_field(travel_data, _('11. Deportation/expulsion'), response_obj.deported,
+        response_obj.deportation_details, _('Deportation details'))
+
+    # Question 12
+    if response_obj.not_allowed_reason:
+        travel_data.append([
+            Paragraph(_('12. Reason for not allowing entry'), styles['normal']),
+            Paragraph(response_obj.not_allowed_reason.replace('\n', '<br/>'), styles['normal'])
+        ])
+
+    # Question 13
+    if response_obj.last_time_in_homeland:
+        travel_data.append([
+            Paragraph(_('13. Last time in homeland'), styles['normal']),
+            Paragraph(str(response_obj.last_time_in_homeland), styles['normal'])
+        ])
+
+    travel_table = Table(travel_data, colWidths=[7*cm, 10*cm])
+    travel_table.setStyle(styles['table'])
+    story.append(travel_table)
+    story.append(Spacer(1, 0.8*cm))
+
+    # Section 5: Officer Assessment (Questions 14-23)
+    if hasattr(response_obj, 'officer_assessment') and response_obj.officer_assessment:
+        story.append(Paragraph(_("Border Officer Assessment"), styles['heading']))
+        assessment = response_obj.officer_assessment
+        assessment_data = []
+
+        # Helper function to add checkbox selections
+        def add_checkbox_field(data, question, yes_no_field, labels_method, details_field=None):
+            yes_no = _('Yes') if yes_no_field else _('No')
+            data.append([Paragraph(question, styles['normal']), Paragraph(yes_no, styles['normal'])])
+            if yes_no_field and labels_method:
+                labels = labels_method()
+                if labels:
+                    items_html = '<br/>'.join([f'• {label}' for label in labels])
+                    data.append([Paragraph(_('Identified issues:'), styles['normal']), Paragraph(items_html, styles['normal'])])
+            if details_field and details_field.strip():
+                data.append([Paragraph(_('Additional details:'), styles['normal']), Paragraph(details_field.replace('\n', '<br/>'), styles['normal'])])
+
+        # Question 14 & 15 - Radical Internet
+        add_checkbox_field(assessment_data, _('14. Radical content on internet'), 
+            assessment.radical_internet, assessment.get_radical_internet_content_labels,
+            assessment.radical_internet_details)
+
+        if assessment.radical_internet_sheikhs:
+            labels = assessment.get_radical_internet_sheikhs_labels()
+            if labels:
+                items_html = '<br/>'.join([f'• {label}' for label in labels])
+                assessment_data.append([Paragraph(_('15. Radical sheikhs:'), styles['normal']), Paragraph(items_html, styles['normal'])])
+
+        # Question 16 - Radical Religious Ideology
+        add_checkbox_field(assessment_data, _('16. Radical religious ideology'),
+            assessment.radical_religious_ideology, assessment.get_radical_religious_signs_labels,
+            assessment.radical_religious_details)
+
+        # Question 17 - Document Issues
+        add_checkbox_field(assessment_data, _('17. Document issues'),
+            assessment.document_issues, assessment.get_document_issues_types_labels,
+            assessment.document_issues_details)
+
+        # Question 18 - Religious Deviations
+        add_checkbox_field(assessment_data, _('18. Deviation from religious norms'),
+            assessment.religious_deviations, assessment.get_religious_deviations_types_labels,
+            assessment.religious_deviations_details)
+
+        # Question 19 - Suspicious Mobile Content
+        add_checkbox_field(assessment_data, _('19. Suspicious mobile content'),
+            assessment.suspicious_mobile_content, assessment.get_suspicious_mobile_types_labels,
+            assessment.suspicious_mobile_details)
+
+        # Question 20 - Suspicious Behavior
+        add_checkbox_field(assessment_data, _('20. Suspicious behavior'),
+            assessment.suspicious_behavior, assessment.get_suspicious_behavior_types_labels,
+            assessment.suspicious_behavior_details)
+
+        # Question 21 - Psychological Issues
+        add_checkbox_field(assessment_data, _('21. Psychological deviations'),
+            assessment.psychological_issues, assessment.get_psychological_types_labels,
+            assessment.psychological_details)
+
+        # Question 22 - Relatives MTO
+        add_checkbox_field(assessment_data, _('22. Relatives in MTO'),
+            assessment.relatives_mto, assessment.get_relatives_mto_types_labels,
+            assessment.relatives_mto_details)
+
+        # Question 23 - Criminal Element
+        add_checkbox_field(assessment_data, _('23. Criminal element'),
+            assessment.criminal_element, assessment.get_criminal_element_types_labels,
+            assessment.criminal_element_details)
+
+        # Question 23b - Violence Traces
+        if assessment.violence_traces:
+            add_checkbox_field(assessment_data, _('23. Traces of violence'),
+                assessment.violence_traces, assessment.get_violence_traces_types_labels,
+                assessment.violence_traces_details)
+
+        assessment_table = Table(assessment_data, colWidths=[7*cm, 10*cm])
+        assessment_table.setStyle(styles['table'])
+        story.append(assessment_table)
+        story.append(Spacer(1, 0.5*cm))
+
+    # Section 6: Attached Photos (at the end)
+    photos = []
+
+    # Check for full_name_photo (Question 1)
+    if response_obj.full_name_photo:
+        photos.append((_('Document photo (Question 1)'), response_obj.full_name_photo))
+
+    # Check for person_photo (Question 1)
+    if response_obj.person_photo:
+        photos.append((_('Person photo (Question 1)'), response_obj.person_photo))
+
+    # Check for radical_internet_photo (Question 14-15)
+    if hasattr(response_obj, 'officer_assessment') and response_obj.officer_assessment.radical_internet_photo:
+        photos.append((_('Radical internet content photo (Question 14-15)'), response_obj.officer_assessment.radical_internet_photo))
+
+    # Check for suspicious_mobile_photo (Question 19)
+    if hasattr(response_obj, 'officer_assessment') and response_obj.officer_assessment.suspicious_mobile_photo:
+        photos.append((_('Suspicious mobile content photo (Question 19)'), response_obj.officer_assessment.suspicious_mobile_photo))
+
+    if photos:
+        story.append(Paragraph(_("Attached Photos"), styles['heading']))
+
+        for photo_title, photo_field in photos:
+            story.append(Paragraph(photo_title, styles['normal']))
+            story.append(Spacer(1, 0.2*cm))
+
+            try:
+                # Embed the page-sized rendition instead of the original phone photo
+                photo = rendition_file(photo_field, 'export')
+                if photo is None:
+                    raise ValueError(os.path.basename(photo_field.name))
+
+                # Create image with max width to fit page
+                img = RLImage(photo, width=15*cm, height=15*cm, kind='proportional')
+                story.append(img)
+                story.append(Spacer(1, 0.5*cm))
+            except Exception as e:
+                # If image can't be loaded, just show a note
+                story.append(Paragraph(f"[{_('Photo unavailable')}: {str(e)}]", styles['normal']))
+                story.append(Spacer(1, 0.3*cm))
+
+    # Footer with metadata
+    footer_data = [
+        [_('Created:'), response_obj.created_at.strftime('%d.%m.%Y %H:%M')],
+        [_('Total score:'), f"{response_obj.total_score} {_('points')}"],
+        [_('Threat level:'), response_obj.threat_level],
+    ]
+    if response_obj.created_by:
+        footer_data.insert(0, [_('Created by:'), f"{response_obj.created_by.first_name} {response_obj.created_by.last_name}"])
+
+    footer_table = Table(footer_data, colWidths=[4*cm, 13*cm])
+    footer_table.setStyle(styles['footer_table'])
+    story.append(footer_table)
+
+    return story
+
+
+def render_response_pdf(response_obj, output):
+    """Write the PDF of ``response_obj`` into the binary file-like ``output``."""
+    with document_fonts() as fonts:
+        ResponseDocTemplate(output, fonts).build(build_response_story(response_obj, fonts))
+
+
+def render_response_pdf_file(response_obj):
+    """Render the PDF into a temporary file rewound to the start.
+
+    Small documents stay in memory, large ones (many photos) spill to disk,
+    so the caller can stream the file without holding a second copy.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    render_response_pdf(response_obj, output)
+    output.seek(0)
+    return output
+
+
+def build_response_docx(response_obj):
+    """Return a python-docx ``Document`` describing ``response_obj``."""
+    from docx import Document
+    from docx.shared import Pt, RGBColor, Cm
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    # Create document
+    doc = Document()
+
+    # Add watermark in header
+    section = doc.sections[0]
+    header = section.header
+    watermark_para = header.paragraphs[0]
+    watermark_run = watermark_para.add_run('АБАЙ')
+    watermark_run.font.size = Pt(72)
+    watermark_run.font.color.rgb = RGBColor(30, 64, 175)
+    watermark_run.font.bold = True
+    watermark_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Title
+    title = doc.add_heading(_('Form Response'), 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Helper function to create table
+    def create_table(data_rows):
+        """Create a 2-column table with question and answer"""
+        table = doc.add_table(rows=len(data_rows), cols=2)
+        table.style = 'Light Grid Accent 1'
+
+        # Set column widths
+        for row in table.rows:
+            row.cells[0].width = Cm(7)
+            row.cells[1].width = Cm(10)
+
+        # Fill table
+        for i, (question, answer) in enumerate(data_rows):
+            # Question cell
+            cell_q = table.rows[i].cells[0]
+            cell_q.text = question
+            # Make question text gray and smaller
+            for paragraph in cell_q.paragraphs:
+                for run in paragraph.runs:
+                    run.font.size = Pt(9)
+                    run.font.color.rgb = RGBColor(75, 85, 99)
+
+            # Answer cell
+            cell_a = table.rows[i].cells[1]
+            cell_a.text = answer
+            # Make answer text darker
+            for paragraph in cell_a.paragraphs:
+                for run in paragraph.runs:
+                    run.font.size = Pt(9)
+                    run.font.color.rgb = RGBColor(31, 41, 55)
+
+        return table
+
+    # Helper function for yes/no fields
+    def add_yes_no_row(question, yes_no_field, details_field=None, details_label=None):
+        rows = []
+        yes_no = _('Yes') if yes_no_field else _('No')
+        rows.append((question, yes_no))
+        if details_field and details_field.strip():
+            if details_label:
+                rows.append((details_label, details_field))
+        return rows
+
+    # Section 1: Biographical Data
+    doc.add_heading(_('Biographical Data'), 1)
+    bio_data = []
+
+    # Question 1
+    full_name_parts = []
+    if response_obj.last_name:
+        full_name_parts.append(response_obj.last_name)
+    if response_obj.first_name:
+        full_name_parts.append(response_obj.first_name)
+    if response_obj.patronymic:
+        full_name_parts.append(response_obj.patronymic)
+    full_name = ' '.join(full_name_parts) if full_name_parts else ''
+
+    birth_info_parts = []
+    if response_obj.birth_date:
+        if isinstance(response_obj.birth_date, str):
+            birth_info_parts.append(f'{_("Birth date")}: {response_obj.birth_date}')
+        else:
+            birth_info_parts.append(f'{_("Birth date")}: {response_obj.birth_date.strftime("%d.%m.%Y")}')
+    if response_obj.birth_place:
+        birth_info_parts.append(f'{_("Birth place")}: {response_obj.birth_place}')
+    birth_info = '\n'.join(birth_info_parts) if birth_info_parts else ''
+
+    q1_answer = '\n'.join(filter(None, [full_name, birth_info])) if full_name or birth_info else '—'
+    bio_data.append((_('1. Full name, date and place of birth'), q1_answer))
+
+    # Question 2
+    bio_data.extend(add_yes_no_row(_('2. Changed surname/name/patronymic'), response_obj.name_changed,
+        response_obj.name_change_reason, _('Reason for change')))
+
+    # Question 3
+    bio_data.append((_('3. Phones and email'), response_obj.phones_emails if response_obj.phones_emails else '—'))
+
+    # Question 4
+    bio_data.extend(add_yes_no_row(_('4. Military service'), response_obj.military_service,
+        response_obj.military_details, _('Service details')))
+
+    create_table(bio_data)
+    doc.add_paragraph()  # Spacer
+
+    # Section 2: Criminal and Legal Information
+    doc.add_heading(_('Criminal and Legal Information'), 1)
+    criminal_data = []
+
+    # Question 5
+    criminal_details_text = None
+    if response_obj.criminal_period_where or response_obj.criminal_offenses:
+        parts = []
+        if response_obj.criminal_period_where:
+            parts.append(response_obj.criminal_period_where)
+        if response_obj.criminal_offenses:
+            parts.append(response_obj.criminal_offenses)
+        criminal_details_text = '\n'.join(parts)
+
+    criminal_data.extend(add_yes_no_row(_('5. Criminal record'), response_obj.criminal_record,
+        criminal_details_text, _('Period and place of imprisonment / For which crimes')))
+
+    # Question 6
+    detained_details_text = None
+    if response_obj.detained_when_why or response_obj.detained_where:
+        parts = []
+        if response_obj.detained_when_why:
+            parts.append(response_obj.detained_when_why)
+        if response_obj.detained_where:
+            parts.append(response_obj.detained_where)
+        detained_details_text = '\n'.join(parts)
+
+    criminal_data.extend(add_yes_no_row(_('6. Detentions abroad'), response_obj.detained_abroad,
+        detained_details_text, _('When and why / Where detained')))
+
+    create_table(criminal_data)
+    doc.add_paragraph()
+
+    # Section 3: Relatives and Religion
+    doc.add_heading(_('Relatives and Religion'), 1)
+    relatives_data = []
+
+    # Question 7
+    relatives_data.extend(add_yes_no_row(_('7. Relatives in specified countries'), response_obj.relatives_in_countries,
+        response_obj.relatives_details, _('Relatives details')))
+
+    # Question 8
+    relatives_data.extend(add_yes_no_row(_('8. Religious'), response_obj.religious,
+        response_obj.denomination, _('Denomination/views')))
+
+    # Question 9
+    if response_obj.relatives_wanted:
+        relatives_data.append((_('9. Are relatives wanted'), _('Yes')))
+        if response_obj.relatives_wanted_reason and response_obj.relatives_wanted_reason.strip():
+            relatives_data.append((_('Reason for search'), response_obj.relatives_wanted_reason))
+
+    create_table(relatives_data)
+    doc.add_paragraph()
+
+    # Section 4: Travel and Deportations
+    doc.add_heading(_('Travel and Deportations'), 1)
+    travel_data = []
+
+    # Question 10
+    travel_data.extend(add_yes_no_row(_('10. Visited specified countries'), response_obj.visited_countries,
+        response_obj.visited_countries_details, _('Visit details')))
+
+    # Question 11
+    travel_data.extend(add_yes_no_row(_('11. Deportation/expulsion'), response_obj.deported,
+        response_obj.deportation_details, _('Deportation details')))
+
+    # Question 12
+    if response_obj.not_allowed_reason:
+        travel_data.append((_('12. Reason for not allowing entry'), response_obj.not_allowed_reason))
+
+    # Question 13
+    if response_obj.last_time_in_homeland:
+        travel_data.append((_('13. Last time in homeland'), str(response_obj.last_time_in_homeland)))
+
+    create_table(travel_data)
+    doc.add_paragraph()
+
+    # Section 5: Officer Assessment (Questions 14-23)
+    if hasattr(response_obj, 'officer_assessment') and response_obj.officer_assessment:
+        doc.add_heading(_('Border Officer Assessment'), 1)
+        assessment = response_obj.officer_assessment
+        assessment_data = []
+
+        # Helper function for checkbox fields
+        def add_checkbox_rows(question, yes_no_field, labels_method, details_field=None):
+            rows = []
+            yes_no = _('Yes') if yes_no_field else _('No')
+            rows.append((question, yes_no))
+            if yes_no_field and labels_method:
+                labels = labels_method()
+                if labels:
+                    items_text = '\n'.join([f'• {label}' for label in labels])
+                    rows.append((_('Identified issues:'), items_text))
+            if details_field and details_field.strip():
+                rows.append((_('Additional details:'), details_field))
+            return rows
+
+        # Question 14 & 15
+        assessment_data.extend(add_checkbox_rows(_('14. Radical content on internet'),
+            assessment.radical_internet, assessment.get_radical_internet_content_labels,
+            assessment.radical_internet_details))
+
+        if assessment.radical_internet_sheikhs:
+            labels = assessment.get_radical_internet_sheikhs_labels()
+            if labels:
+                items_text = '\n'.join([f'• {label}' for label in labels])
+                assessment_data.append((_('15. Radical sheikhs:'), items_text))
+
+        # Questions 16-23
+        assessment_data.extend(add_checkbox_rows(_('16. Radical religious ideology'),
+            assessment.radical_religious_ideology, assessment.get_radical_religious_signs_labels,
+            assessment.radical_religious_details))
+
+        assessment_data.extend(add_checkbox_rows(_('17. Document issues'),
+            assessment.document_issues, assessment.get_document_issues_types_labels,
+            assessment.document_issues_details))
+
+        assessment_data.extend(add_checkbox_rows(_('18. Deviation from religious norms'),
+            assessment.religious_deviations, assessment.get_religious_deviations_types_labels,
+            assessment.religious_deviations_details))
+
+        assessment_data.extend(add_checkbox_rows(_('19. Suspicious mobile content'),
+            assessment.suspicious_mobile_content, assessment.get_suspicious_mobile_types_labels,
+            assessment.suspicious_mobile_details))
+
+        assessment_data.extend(add_checkbox_rows(_('20. Suspicious behavior'),
+            assessment.suspicious_behavior, assessment.get_suspicious_behavior_types_labels,
+            assessment.suspicious_behavior_details))
+
+        assessment_data.extend(add_checkbox_rows(_('21. Psychological deviations'),
+            assessment.psychological_issues, assessment.get_psychological_types_labels,
+            assessment.psychological_details))
+
+        assessment_data.extend(add_checkbox_rows(_('22. Relatives in MTO'),
+            assessment.relatives_mto, assessment.get_relatives_mto_types_labels,
+            assessment.relatives_mto_details))
+
+        assessment_data.extend(add_checkbox_rows(_('23. Criminal element'),
+            assessment.criminal_element, assessment.get_criminal_element_types_labels,
+            assessment.criminal_element_details))
+
+        if assessment.violence_traces:
+            assessment_data.extend(add_checkbox_rows(_('23. Traces of violence'),
+                assessment.violence_traces, assessment.get_violence_traces_types_labels,
+                assessment.violence_traces_details))
+
+        create_table(assessment_data)
+        doc.add_paragraph()
+
+    # Section 6: Attached Photos
+    photos = []
+    if response_obj.full_name_photo:
+        photos.append((_('Document photo (Question 1)'), response_obj.full_name_photo))
+    if response_obj.person_photo:
+        photos.append((_('Person photo (Question 1)'), response_obj.person_photo))
+    if hasattr(response_obj, 'officer_assessment') and response_obj.officer_assessment.radical_internet_photo:
+        photos.append((_('Radical internet content photo (Question 14-15)'), response_obj.officer_assessment.radical_internet_photo))
+    if hasattr(response_obj, 'officer_assessment') and response_obj.officer_assessment.suspicious_mobile_photo:
+        photos.append((_('Suspicious mobile content photo (Question 19)'), response_obj.officer_assessment.suspicious_mobile_photo))
+
+    if photos:
+        doc.add_heading(_('Attached Photos'), 1)
+        for photo_title, photo_field in photos:
+            p = doc.add_paragraph()
+            p.add_run(photo_title).bold = True
+            p.paragraph_format.space_after = Pt(6)
+            try:
+                photo = rendition_file(photo_field, 'export')
+                if photo is None:
+                    raise ValueError(os.path.basename(photo_field.name))
+                doc.add_picture(photo, width=Cm(15))
+                doc.add_paragraph()
+            except Exception as e:
+                doc.add_paragraph(f"[{_('Photo unavailable')}: {str(e)}]")
+
+    # Footer metadata table
+    doc.add_heading(_('Metadata'), 1)
+
+    footer_data = []
+    if response_obj.created_by:
+        footer_data.append((_('Created by'), f"{response_obj.created_by.first_name} {response_obj.created_by.last_name}"))
+    footer_data.append((_('Created'), response_obj.created_at.strftime('%d.%m.%Y %H:%M')))
+    footer_data.append((_('Total score'), f"{response_obj.total_score} {_('points')}"))
+    footer_data.append((_('Threat level'), response_obj.threat_level))
+
+    # Create footer table with different style
+    footer_table = doc.add_table(rows=len(footer_data), cols=2)
+    footer_table.style = 'Light List Accent 1'
+
+    for i, (label, value) in enumerate(footer_data):
+        cell_label = footer_table.rows[i].cells[0]
+        cell_value = footer_table.rows[i].cells[1]
+
+        cell_label.text = label
+        cell_value.text = value
+
+        # Make label bold
+        for paragraph in cell_label.paragraphs:
+            for run in paragraph.runs:
+                run.font.bold = True
+                run.font.size = Pt(9)
+
+        # Style value
+        for paragraph in cell_value.paragraphs:
+            for run in paragraph.runs:
+                run.font.size = Pt(9)
+
+    return doc
+
+
+def render_response_docx_file(response_obj):
+    """Render the DOCX into a temporary file rewound to the start."""
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    build_response_docx(response_obj).save(output)
+    output.seek(0)
+    return output
+
+
+# ------------------------------
+# Bulk export
+# ------------------------------
+
+def render_merged_pdf_file(responses):
+    """Render several responses into one PDF, each starting on a new page."""
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    with document_fonts() as fonts:
+        story = []
+        for index, response_obj in enumerate(responses):
+            if index:
+                story.append(PageBreak())
+            story.extend(build_response_story(response_obj, fonts))
+        ResponseDocTemplate(output, fonts).build(story)
+    output.seek(0)
+    return output
+
+
+FILE_RENDERERS = {
+    'pdf': render_response_pdf_file,
+    'docx': render_response_docx_file,
+}
+
+
+def export_basename(response_obj):
+    """File name (without extension) of a response inside a bulk export archive."""
+    name = get_valid_filename(f'{response_obj.last_name} {response_obj.first_name}'.strip() or 'response')
+    return f'{name}_{response_obj.pk}'
+
+
+class _ZipStream:
+    """Write-only sink for ``zipfile``; written bytes are collected until ``pop()``.
+
+    It has no ``tell()``, so ``zipfile`` treats it as unseekable and writes
+    data descriptors instead of seeking back to patch local headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_export_archive(responses, kinds=('pdf',), merged=False):
+    """Yield a ZIP archive of rendered responses chunk by chunk.
+
+    Every response is rendered as one file per ``kinds`` entry, each just
+    before it is added, so the client receives the archive while the rest is
+    still being rendered. Rendering is CPU-bound Python, so it is done in the
+    request's thread: worker threads would only take turns on the GIL. With
+    ``merged`` the archive also gets ``responses.pdf`` containing all
+    responses. ``responses`` must be loaded with
+    ``select_related('officer_assessment', 'created_by')``.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for response_obj in responses:
+            for kind in kinds:
+                name = f'{export_basename(response_obj)}.{kind}'
+                yield from _copy_into_archive(archive, stream, name, FILE_RENDERERS[kind](response_obj))
+        if merged:
+            yield from _copy_into_archive(archive, stream, 'responses.pdf', render_merged_pdf_file(responses))
+    yield stream.pop()
+
+
+def _copy_into_archive(archive, stream, name, source):
+    with source, archive.open(name, 'w') as target:
+        for chunk in iter(lambda: source.read(STREAM_CHUNK_SIZE), b''):
+            target.write(chunk)
+            data = stream.pop()
+            if data:
+                yield data
+    data = stream.pop()
+    if data:
+        yield data
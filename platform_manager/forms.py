@@ -114,7 +114,8 @@ class FormResponseForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         # Set choices for birth_place
-        self.fields['birth_place'].widget.choices = COUNTRY_CHOICES
+        if 'birth_place' in self.fields:
+            self.fields['birth_place'].widget.choices = COUNTRY_CHOICES
         
         # Add common class to boolean fields (checkboxes)
         bool_fields = [
@@ -208,6 +209,13 @@ class BorderOfficerAssessmentForm(forms.ModelForm):
         label=_("Типы следов насилия")
     )
     
+    MULTI_CHOICE_FIELDS = (
+        'radical_internet_content', 'radical_internet_sheikhs', 'radical_religious_signs',
+        'document_issues_types', 'religious_deviations_types', 'suspicious_mobile_types',
+        'suspicious_behavior_types', 'psychological_types', 'relatives_mto_types',
+        'criminal_element_types', 'violence_traces_types',
+    )
+    
     class Meta:
         model = BorderOfficerAssessment
         fields = [
@@ -268,17 +276,9 @@ class BorderOfficerAssessmentForm(forms.ModelForm):
         
         # Инициализируем значения из JSONField
         if self.instance.pk:
-            self.fields['radical_internet_content'].initial = self.instance.radical_internet_content or []
-            self.fields['radical_internet_sheikhs'].initial = self.instance.radical_internet_sheikhs or []
-            self.fields['radical_religious_signs'].initial = self.instance.radical_religious_signs or []
-            self.fields['document_issues_types'].initial = self.instance.document_issues_types or []
-            self.fields['religious_deviations_types'].initial = self.instance.religious_deviations_types or []
-            self.fields['suspicious_mobile_types'].initial = self.instance.suspicious_mobile_types or []
-            self.fields['suspicious_behavior_types'].initial = self.instance.suspicious_behavior_types or []
-            self.fields['psychological_types'].initial = self.instance.psychological_types or []
-            self.fields['relatives_mto_types'].initial = self.instance.relatives_mto_types or []
-            self.fields['criminal_element_types'].initial = self.instance.criminal_element_types or []
-            self.fields['violence_traces_types'].initial = self.instance.violence_traces_types or []
+            for f in self.MULTI_CHOICE_FIELDS:
+                if f in self.fields:
+                    self.fields[f].initial = getattr(self.instance, f) or []
         
         bool_fields = [
             'radical_internet', 'radical_religious_ideology', 'document_issues',
@@ -296,17 +296,9 @@ class BorderOfficerAssessmentForm(forms.ModelForm):
         instance = super().save(commit=False)
         
         # Сохраняем данные множественного выбора в JSONField
-        instance.radical_internet_content = self.cleaned_data.get('radical_internet_content', [])
-        instance.radical_internet_sheikhs = self.cleaned_data.get('radical_internet_sheikhs', [])
-        instance.radical_religious_signs = self.cleaned_data.get('radical_religious_signs', [])
-        instance.document_issues_types = self.cleaned_data.get('document_issues_types', [])
-        instance.religious_deviations_types = self.cleaned_data.get('religious_deviations_types', [])
-        instance.suspicious_mobile_types = self.cleaned_data.get('suspicious_mobile_types', [])
-        instance.suspicious_behavior_types = self.cleaned_data.get('suspicious_behavior_types', [])
-        instance.psychological_types = self.cleaned_data.get('psychological_types', [])
-        instance.relatives_mto_types = self.cleaned_data.get('relatives_mto_types', [])
-        instance.criminal_element_types = self.cleaned_data.get('criminal_element_types', [])
-        instance.violence_traces_types = self.cleaned_data.get('violence_traces_types', [])
+        for f in self.MULTI_CHOICE_FIELDS:
+            if f in self.fields:
+                setattr(instance, f, self.cleaned_data.get(f, []))
         
         if commit:
             instance.save()
@@ -0,0 +1,130 @@
+"""Normalization of uploaded files before they are stored.
+
+Officers attach photos straight from tablet cameras: 5-12 megapixels with EXIF
+metadata (GPS position, device serials). Every new file assigned to a file field
+of ``FormResponse``, ``BorderOfficerAssessment`` or ``Profile`` goes through
+``normalize_image`` right before the model is saved: it is decoded, downscaled
+to ``UPLOAD_IMAGE_MAX_SIDE``, rotated upright and re-encoded as
+``UPLOAD_IMAGE_FORMAT`` without metadata. Files that aren't images are stored
+unchanged. The sizes before and after are recorded in ``IngestedUpload``.
+
+The upload is decoded from the file Django (or the wizard staging area) already
+spooled, and the re-encoded image is written to a spooled temporary file, so the
+raw bytes of an upload are never held in memory.
+"""
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import models
+from django.db.models.signals import post_save, pre_save
+from PIL import Image, ImageOps
+
+from .models import BorderOfficerAssessment, FormResponse, IngestedUpload, Profile
+
+logger = logging.getLogger(__name__)
+
+INGESTED_MODELS = (FormResponse, BorderOfficerAssessment, Profile)
+
+EXTENSIONS = {
+    'JPEG': '.jpg',
+    'WEBP': '.webp',
+    'PNG': '.png',
+}
+
+# Re-encoded images stay in memory up to this size, larger ones spill to disk.
+SPOOL_MAX_SIZE = 2 * 1024 * 1024
+
+
+def _flatten(image, fmt):
+    """Convert ``image`` to a mode ``fmt`` can store; transparency goes on white for JPEG."""
+    if fmt != 'JPEG':
+        return image if image.mode in ('RGB', 'RGBA', 'L') else image.convert('RGBA')
+    if image.mode in ('RGB', 'L'):
+        return image
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalize_image(upload, name):
+    """Return ``upload`` re-encoded as a ``File``, or None when it isn't an image."""
+    fmt = settings.UPLOAD_IMAGE_FORMAT.upper()
+    max_side = settings.UPLOAD_IMAGE_MAX_SIDE
+    upload.seek(0)
+    try:
+        with Image.open(upload) as source:
+            # Let the JPEG decoder skip resolution we'd throw away anyway
+            source.draft('RGB', (max_side, max_side))
+            image = ImageOps.exif_transpose(source)
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+            image = _flatten(image, fmt)
+            icc_profile = image.info.get('icc_profile')
+            # Nothing from the original (EXIF, XMP, comments) is carried over
+            image.info = {}
+            options = {'optimize': True}
+            if fmt in ('JPEG', 'WEBP'):
+                options['quality'] = settings.UPLOAD_IMAGE_QUALITY
+            if icc_profile:
+                options['icc_profile'] = icc_profile
+            output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            image.save(output, fmt, **options)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        logger.info("Storing %s as is: %s", name, exc)
+        upload.seek(0)
+        return None
+    output.seek(0)
+    root, _ = os.path.splitext(os.path.basename(name))
+    return File(output, name=root + EXTENSIONS[fmt])
+
+
+def _file_fields(model):
+    return [field for field in model._meta.fields if isinstance(field, models.FileField)]
+
+
+def _on_pre_save(sender, instance, update_fields=None, **kwargs):
+    ingested = []
+    for field in _file_fields(sender):
+        if update_fields is not None and field.name not in update_fields:
+            continue
+        fieldfile = getattr(instance, field.attname)
+        # Only files assigned since the last save; stored ones are already ingested
+        if not fieldfile or fieldfile._committed:
+            continue
+        original_name = os.path.basename(fieldfile.name)
+        original_size = fieldfile.file.size
+        normalized = normalize_image(fieldfile.file, fieldfile.name)
+        if normalized is not None:
+            fieldfile.file = normalized
+            fieldfile.name = normalized.name
+        ingested.append((field, original_name, original_size, fieldfile.file.size, normalized is not None))
+    instance._ingested_uploads = ingested
+
+
+def _on_post_save(sender, instance, **kwargs):
+    ingested = getattr(instance, '_ingested_uploads', None)
+    if not ingested:
+        return
+    IngestedUpload.objects.bulk_create([
+        IngestedUpload(
+            name=getattr(instance, field.attname).name,
+            field=f'{sender.__name__}.{field.name}',
+            original_name=original_name,
+            original_size=original_size,
+            size=size,
+            normalized=normalized,
+        )
+        for field, original_name, original_size, size, normalized in ingested
+    ])
+    instance._ingested_uploads = []
+
+
+def connect_signals():
+    for model in INGESTED_MODELS:
+        pre_save.connect(_on_pre_save, sender=model, dispatch_uid=f'ingest_pre_save_{model.__name__}')
+        post_save.connect(_on_post_save, sender=model, dispatch_uid=f'ingest_post_save_{model.__name__}')
@@ -0,0 +1,69 @@
+"""Rows of the responses list, shared by the panel list and the admin changelist.
+
+A list row needs a handful of columns and the creator's name, so list querysets
+load only those (``list_queryset``) with the creator joined in the same query.
+``serialize_row`` turns such a response into the plain values both lists
+display; it must not touch fields outside ``LIST_FIELDS``, or every row would
+cost another query.
+"""
+from django.utils.text import Truncator
+
+LIST_FIELDS = (
+    'id',
+    'last_name',
+    'first_name',
+    'patronymic',
+    'full_name_and_birth',
+    'birth_place',
+    'threat_level',
+    'total_score',
+    'created_at',
+    'created_by__id',
+    'created_by__first_name',
+    'created_by__last_name',
+    'created_by__username',
+)
+
+
+def list_queryset(queryset):
+    """Restrict ``queryset`` to the columns of a list row, joining the creator."""
+    return queryset.select_related('created_by').only(*LIST_FIELDS)
+
+
+def full_name(response):
+    if response.last_name or response.first_name:
+        return f"{response.last_name} {response.first_name} {response.patronymic}".strip()
+    if response.full_name_and_birth:
+        return Truncator(response.full_name_and_birth).chars(50)
+    return ''
+
+
+def split_country(birth_place):
+    """Return ``(name, code)`` of a ``'Name|code'`` country choice; code is '' for free text."""
+    if birth_place and '|' in birth_place:
+        name, code = birth_place.split('|', 1)
+        return name, code.lower()
+    return birth_place or '', ''
+
+
+def creator_name(user):
+    if user is None:
+        return ''
+    name = f"{user.first_name} {user.last_name}".strip()
+    return name or user.get_username()
+
+
+def serialize_row(response):
+    """Plain values of one list row."""
+    country_name, country_code = split_country(response.birth_place)
+    return {
+        'id': response.pk,
+        'full_name': full_name(response),
+        'country_name': country_name,
+        'country_code': country_code,
+        'threat_level': response.threat_level,
+        'total_score': response.total_score,
+        'created_by_id': response.created_by_id,
+        'created_by_name': creator_name(response.created_by),
+        'created_at': response.created_at,
+    }
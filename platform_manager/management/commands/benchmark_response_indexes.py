@@ -0,0 +1,125 @@
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+# List view filters that can be combined; name search has its own index (see search.py)
+FILTERS = ('created_by', 'threat_level', 'country', 'dates')
+
+THREAT_LEVELS = ('Низкий', 'Средний', 'Высокий')
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed form responses and print query plans and timings of the responses list "
+        "for every filter combination (rolled back afterwards unless --keep)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Number of responses to seed')
+        parser.add_argument('--submitters', type=int, default=20, help='Number of users the responses are spread over')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the best time is reported')
+        parser.add_argument('--no-plans', action='store_true', help='Only print timings')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows instead of rolling back')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the generated data')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth import get_user_model
+        from django.db import connection, transaction
+        from django.utils import timezone
+        from platform_manager import rollups
+        from platform_manager.forms import COUNTRY_CHOICES
+        from platform_manager.models import FormResponse
+        from platform_manager.search import build_search_name
+        from platform_manager.views import filter_responses
+
+        rng = random.Random(options['seed'])
+        User = get_user_model()
+        countries = [value for value, label in COUNTRY_CHOICES if value]
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']} responses on {connection.vendor}...")
+            users = [
+                User.objects.create_user(
+                    email=f'index-benchmark-{index}@example.invalid', phone=f'+7000{index:07d}',
+                    username=f'index-benchmark-{index}',
+                )
+                for index in range(options['submitters'])
+            ]
+            now = timezone.now()
+            responses = []
+            for index in range(options['rows']):
+                response = FormResponse(
+                    last_name=f'Benchmark{index}',
+                    first_name='Index',
+                    created_by=rng.choice(users),
+                    threat_level=rng.choices(THREAT_LEVELS, weights=(70, 25, 5))[0],
+                    birth_place=rng.choice(countries),
+                )
+                # bulk_create doesn't call save(), which maintains the search column
+                response.search_name = build_search_name(response)
+                responses.append(response)
+            FormResponse.objects.bulk_create(responses, batch_size=1000)
+            # created_at is auto_now_add, spread it over the last year afterwards
+            for response in responses:
+                response.created_at = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+                response.created_date = timezone.localdate(response.created_at)
+            FormResponse.objects.bulk_update(responses, ['created_at', 'created_date'], batch_size=1000)
+
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            # Same queries as the list view of a manager (see views.filter_responses)
+            manager = User(is_superuser=True)
+            sample = responses[0]
+            today = timezone.localdate()
+            values = {
+                'created_by': {'created_by': str(sample.created_by_id)},
+                'threat_level': {'threat_level': 'Высокий'},
+                'country': {'country': sample.birth_place},
+                'dates': {
+                    'date_from': (today - timedelta(days=30)).isoformat(),
+                    'date_to': today.isoformat(),
+                },
+            }
+
+            for size in range(len(FILTERS) + 1):
+                for combination in itertools.combinations(FILTERS, size):
+                    params = {}
+                    for name in combination:
+                        params.update(values[name])
+                    queryset = filter_responses(manager, params)
+                    page = queryset[:50]
+
+                    page_time = self.best_of(options['repeat'], lambda: list(page.all()))
+                    count_time = self.best_of(options['repeat'], queryset.count)
+                    label = ' + '.join(combination) or 'no filters'
+                    self.stdout.write(self.style.MIGRATE_HEADING(label))
+                    self.stdout.write(
+                        f'  first page: {page_time * 1000:.2f} ms, '
+                        f'count ({queryset.count()} rows): {count_time * 1000:.2f} ms'
+                    )
+                    if not options['no_plans']:
+                        for line in page.explain().splitlines():
+                            self.stdout.write(f'    {line}')
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        if options['keep']:
+            # Bulk inserts bypass the signals that maintain the daily statistics
+            rollups.rebuild()
+            self.stdout.write(self.style.WARNING(
+                "Seeded rows were kept; their creators are the 'index-benchmark-*' users"
+            ))
+
+    def best_of(self, repeat, func):
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
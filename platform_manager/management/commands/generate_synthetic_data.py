@@ -0,0 +1,216 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Synthetic users are named with this prefix; --clear removes everything they created
+USERNAME_PREFIX = 'synthetic-'
+
+LAST_NAMES = (
+    'Ахметов', 'Жумабаев', 'Касымов', 'Оспанов', 'Нурланов', 'Сейтказиев', 'Тулегенов', 'Сулейменов',
+    'Байжанов', 'Мукашев', 'Ержанов', 'Әбенов', 'Құдайбергенов', 'Өмірзақов', 'Искаков', 'Жаксылыков',
+    'Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Рахимов', 'Каримов', 'Юсупов', 'Алиев',
+    'Мамедов', 'Назаров', 'Исмаилов', 'Турсунов', 'Хасанов',
+)
+FIRST_NAMES = {
+    'male': (
+        'Айдос', 'Ерлан', 'Нурсултан', 'Данияр', 'Руслан', 'Қайрат', 'Әлихан', 'Бауыржан', 'Тимур', 'Ислам',
+        'Азамат', 'Бекзат', 'Ұлан', 'Мақсат', 'Дмитрий', 'Сергей', 'Алексей', 'Фарход', 'Шерзод', 'Рустам',
+    ),
+    'female': (
+        'Айгерим', 'Динара', 'Гүлназ', 'Жанар', 'Әсел', 'Аружан', 'Мадина', 'Камила', 'Ольга', 'Елена',
+        'Наталья', 'Дильноза', 'Зарина', 'Малика', 'Сабина',
+    ),
+}
+PATRONYMICS = {
+    'male': ('Ерланович', 'Серикович', 'Маратович', 'Қайратұлы', 'Болатұлы', 'Сергеевич', 'Рустамович', ''),
+    'female': ('Ерлановна', 'Сериковна', 'Маратовна', 'Қайратқызы', 'Болатқызы', 'Сергеевна', 'Рустамовна', ''),
+}
+
+# Relative frequency of birth countries; countries not listed get weight 1
+COUNTRY_WEIGHTS = {'kz': 5, 'ru': 25, 'uz': 30, 'kg': 15, 'tj': 12, 'tm': 4, 'cn': 10, 'tr': 8, 'af': 3}
+
+# Share of assessments where a given criterion is marked
+CRITERION_RATE = 0.04
+
+
+def feminine(last_name):
+    return last_name + 'а' if last_name.endswith(('ов', 'ев', 'ин')) else last_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic form responses with officer assessments for load testing and "
+        "benchmarks (see run_benchmarks); --clear removes them again"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--responses', type=int, default=100000, help='Number of responses to create')
+        parser.add_argument('--submitters', type=int, default=50, help='Number of submitter accounts to spread them over')
+        parser.add_argument('--days', type=int, default=365, help='Spread creation dates over this many past days')
+        parser.add_argument('--photos', type=int, default=20, help='Distinct photos attached by reference')
+        parser.add_argument('--photo-share', type=float, default=0.3, help='Share of responses with a person photo')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows inserted or deleted per batch / transaction')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the generated data')
+        parser.add_argument('--clear', action='store_true', help='Delete the synthetic users and their responses instead')
+
+    def handle(self, *args, **options):
+        from platform_manager import blobs, rollups
+
+        photos = set()
+        if options['clear']:
+            photos = self.clear(max(1, options['batch_size']))
+        else:
+            if options['responses'] < 1 or options['submitters'] < 1:
+                raise CommandError('--responses and --submitters must be positive')
+            self.generate(options)
+
+        # Bulk inserts and deletes bypass the signals that maintain these
+        rollups.rebuild()
+        blobs.rebuild()
+        self.stdout.write(self.style.SUCCESS('Rebuilt daily statistics and media references'))
+        if photos:
+            self.delete_photos(photos)
+
+    def clear(self, batch_size):
+        """Delete the synthetic responses in batches; returns the photos they referenced."""
+        from django.contrib.auth import get_user_model
+        from django.db import transaction
+        from platform_manager.models import BorderOfficerAssessment, FormDraft, FormResponse
+
+        User = get_user_model()
+        responses = FormResponse.objects.filter(created_by__username__startswith=USERNAME_PREFIX)
+        photos = set(responses.exclude(person_photo='').values_list('person_photo', flat=True).distinct())
+        count = 0
+        while True:
+            with transaction.atomic():
+                pks = list(responses.values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                FormDraft.objects.filter(form_response__in=pks).delete()
+                # Plain DELETEs without loading the rows or sending signals; handle() rebuilds what they maintain
+                BorderOfficerAssessment.objects.filter(form_response__in=pks)._raw_delete(responses.db)
+                FormResponse.objects.filter(pk__in=pks)._raw_delete(responses.db)
+            count += len(pks)
+            self.stdout.write(f'  {count} deleted')
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} synthetic responses and their users'))
+        return photos
+
+    def delete_photos(self, names):
+        """Delete the stored photos ``names`` that nothing references any more, with their renditions."""
+        from django.core.files.storage import default_storage
+        from platform_manager.models import MediaBlob
+        from platform_manager.renditions import RENDITIONS, rendition_name
+        from platform_manager.storage import is_blob
+
+        referenced = set(MediaBlob.objects.filter(name__in=names).values_list('name', flat=True))
+        unused = [name for name in names if is_blob(name) and name not in referenced]
+        for name in unused:
+            default_storage.delete(name)
+            for size in RENDITIONS:
+                default_storage.delete(rendition_name(name, size))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {len(unused)} synthetic photos'))
+
+    def get_users(self, rng, count):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import Group
+
+        User = get_user_model()
+
+        def get_user(username, index, group):
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                user = User.objects.create_user(
+                    email=f'{username}@example.invalid', phone=f'+7999{index:07d}', username=username,
+                    first_name=rng.choice(FIRST_NAMES['male']), last_name=rng.choice(LAST_NAMES),
+                )
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+            user.groups.add(Group.objects.get_or_create(name=group)[0])
+            return user
+
+        manager = get_user(f'{USERNAME_PREFIX}manager', 0, 'manager')
+        submitters = [get_user(f'{USERNAME_PREFIX}submitter-{index}', index, 'submitter') for index in range(1, count + 1)]
+        return manager, submitters
+
+    def store_photos(self, rng, count):
+        """Store ``count`` distinct small photos and return their storage names."""
+        from io import BytesIO
+
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from PIL import Image
+
+        names = []
+        for index in range(count):
+            image = Image.new('RGB', (640, 480), tuple(rng.randrange(256) for _ in range(3)))
+            output = BytesIO()
+            image.save(output, 'JPEG', quality=80)
+            names.append(default_storage.save(f'synthetic/photo-{index}.jpg', ContentFile(output.getvalue())))
+        return names
+
+    def generate(self, options):
+        from django.db import transaction
+        from django.utils import timezone
+        from platform_manager import scoring
+        from platform_manager.forms import COUNTRY_CHOICES
+        from platform_manager.models import BorderOfficerAssessment, FormResponse
+        from platform_manager.search import build_search_name
+
+        rng = random.Random(options['seed'])
+        manager, submitters = self.get_users(rng, options['submitters'])
+        photos = self.store_photos(rng, options['photos']) if options['photos'] > 0 else []
+
+        countries = [value for value, label in COUNTRY_CHOICES if value]
+        country_weights = [COUNTRY_WEIGHTS.get(value.rsplit('|', 1)[-1].lower(), 1) for value in countries]
+        criteria = scoring.score_fields('assessment')
+        now = timezone.now()
+        total = options['responses']
+        batch_size = max(1, options['batch_size'])
+
+        self.stdout.write(f'Generating {total} responses over {len(submitters)} submitters...')
+        created = 0
+        while created < total:
+            responses = []
+            assessments = []
+            for _ in range(min(batch_size, total - created)):
+                gender = 'male' if rng.random() < 0.8 else 'female'
+                last_name = rng.choice(LAST_NAMES)
+                created_at = now - timedelta(seconds=rng.randrange(max(1, options['days']) * 24 * 60 * 60))
+                response = FormResponse(
+                    last_name=feminine(last_name) if gender == 'female' else last_name,
+                    first_name=rng.choice(FIRST_NAMES[gender]),
+                    patronymic=rng.choice(PATRONYMICS[gender]),
+                    birth_date=date(1960, 1, 1) + timedelta(days=rng.randrange(45 * 365)),
+                    birth_place=rng.choices(countries, weights=country_weights)[0],
+                    created_by=rng.choice(submitters),
+                    created_date=timezone.localdate(created_at),
+                )
+                if photos and rng.random() < options['photo_share']:
+                    response.person_photo = rng.choice(photos)
+                # bulk_create doesn't call save(), which maintains the search column
+                response.search_name = build_search_name(response)
+                response._synthetic_created_at = created_at
+
+                assessment = BorderOfficerAssessment(form_response=response, assessed_by=manager)
+                for name in criteria:
+                    setattr(assessment, name, rng.random() < CRITERION_RATE)
+                scoring.score(assessment, 'assessment')
+                response.apply_assessment_score(assessment)
+                responses.append(response)
+                assessments.append(assessment)
+
+            with transaction.atomic():
+                FormResponse.objects.bulk_create(responses)
+                BorderOfficerAssessment.objects.bulk_create(assessments)
+                # created_at is auto_now_add, spread it over the past days afterwards
+                for response in responses:
+                    response.created_at = response._synthetic_created_at
+                FormResponse.objects.bulk_update(responses, ['created_at'])
+            created += len(responses)
+            self.stdout.write(f'  {created}/{total}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {total} responses; benchmarks log in as '{manager.username}' and '{submitters[0].username}'"
+        ))
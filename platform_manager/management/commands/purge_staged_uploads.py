@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Delete expired form drafts and wizard uploads abandoned in the staging area"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=None,
+            help='Age in seconds after which a staged file is removed (defaults to WIZARD_UPLOAD_STAGING_TTL)',
+        )
+        parser.add_argument(
+            '--draft-max-age', type=int, default=None,
+            help='Age in seconds after which an untouched draft is removed (defaults to FORM_DRAFT_TTL)',
+        )
+
+    def handle(self, *args, **options):
+        from platform_manager.drafts import purge_expired_drafts, referenced_staged_paths
+        from platform_manager.uploads import purge_stale_uploads
+
+        drafts_removed = purge_expired_drafts(max_age=options['draft_max_age'])
+        removed = purge_stale_uploads(max_age=options['max_age'], keep=referenced_staged_paths())
+        self.stdout.write(self.style.SUCCESS(f'Removed drafts: {drafts_removed}, staged uploads: {removed}'))
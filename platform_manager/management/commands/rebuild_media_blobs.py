@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Recount the file field references of content-addressed media blobs"
+
+    def handle(self, *args, **options):
+        from platform_manager.blobs import rebuild
+
+        blobs = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt media blob references: {blobs} blobs'))
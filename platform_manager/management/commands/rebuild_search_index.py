@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate the name search index of form responses, e.g. after a migration "
+        "rebuilt the table on SQLite and dropped the index triggers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild the index on')
+
+    def handle(self, *args, **options):
+        from django.db import connections
+        from platform_manager.search import rebuild_search_index
+
+        rebuild_search_index(connections[options['database']])
+        self.stdout.write(self.style.SUCCESS('Rebuilt the name search index'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily threat statistics rollup from form responses"
+
+    def handle(self, *args, **options):
+        from platform_manager.rollups import rebuild
+
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily threat statistics: {rows} rows'))
@@ -0,0 +1,210 @@
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Number of primary key ranges per worker, so progress is reported more often
+# than once per worker and a slow range doesn't hold up the others for long.
+RANGES_PER_WORKER = 4
+
+
+def split_pk_ranges(parts):
+    """Split the UUID key space into ``parts`` contiguous ``(low, high)`` ranges.
+
+    Keys are random UUIDs, so equal slices of the key space hold roughly equal
+    numbers of rows. ``high`` is None for the last range.
+    """
+    step = (1 << 128) // parts
+    ranges = []
+    for index in range(parts):
+        low = uuid.UUID(int=index * step)
+        high = uuid.UUID(int=(index + 1) * step) if index < parts - 1 else None
+        ranges.append((low, high))
+    return ranges
+
+
+def recalculate_range(low=None, high=None, batch_size=500, dry_run=False, collect_diff=False, progress=None, version=None):
+    """Recalculate scores of responses with ``low <= pk < high``.
+
+    Rows are streamed, scored in memory and written back with ``bulk_update``
+    (one transaction per batch). A response with an officer assessment takes
+    the assessment's score; the questionnaire rules only apply to responses
+    that have none.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from platform_manager import scoring
+    from platform_manager.models import REVISION_FIELDS, BorderOfficerAssessment, FormResponse
+
+    version = version or scoring.current_version()
+    # Changed rows get a new revision: scores are printed in cached exports
+    update_fields = ['total_score', 'threat_level', 'score_version', *REVISION_FIELDS]
+    queryset = FormResponse.objects.select_related('officer_assessment').only(
+        'id', *update_fields, *scoring.score_fields('response', version),
+        'officer_assessment__id', 'officer_assessment__form_response',
+        *(f'officer_assessment__{name}' for name in update_fields),
+        *(f'officer_assessment__{name}' for name in scoring.score_fields('assessment', version)),
+    ).order_by('pk')
+    if low is not None:
+        queryset = queryset.filter(pk__gte=low)
+    if high is not None:
+        queryset = queryset.filter(pk__lt=high)
+
+    result = {'processed': 0, 'responses': 0, 'assessments': 0, 'diff': []}
+    responses = []
+    assessments = []
+
+    def flush():
+        if not dry_run and (responses or assessments):
+            with transaction.atomic():
+                BorderOfficerAssessment.objects.bulk_update(assessments, update_fields)
+                FormResponse.objects.bulk_update(responses, update_fields)
+        result['responses'] += len(responses)
+        result['assessments'] += len(assessments)
+        responses.clear()
+        assessments.clear()
+        if progress is not None:
+            progress(result)
+
+    for response in queryset.iterator(chunk_size=batch_size):
+        result['processed'] += 1
+        try:
+            assessment = response.officer_assessment
+        except BorderOfficerAssessment.DoesNotExist:
+            assessment = None
+
+        if assessment is not None:
+            old = (assessment.total_score, assessment.threat_level, assessment.score_version)
+            scoring.score(assessment, 'assessment', version)
+            if old != (assessment.total_score, assessment.threat_level, assessment.score_version):
+                assessment.revision += 1
+                assessment.updated_at = timezone.now()
+                assessments.append(assessment)
+                if collect_diff:
+                    result['diff'].append(
+                        f'BorderOfficerAssessment {assessment.pk}: {old[1]} ({old[0]}) -> '
+                        f'{assessment.threat_level} ({assessment.total_score})'
+                    )
+
+        old = (response.total_score, response.threat_level, response.score_version)
+        if assessment is not None:
+            response.apply_assessment_score(assessment)
+        else:
+            scoring.score(response, 'response', version)
+        if old != (response.total_score, response.threat_level, response.score_version):
+            response.revision += 1
+            response.updated_at = timezone.now()
+            responses.append(response)
+            if collect_diff:
+                result['diff'].append(
+                    f'FormResponse {response.pk}: {old[1]} ({old[0]}) -> '
+                    f'{response.threat_level} ({response.total_score})'
+                )
+
+        if result['processed'] % batch_size == 0:
+            flush()
+    flush()
+    return result
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def _run_range(low, high, batch_size, dry_run, collect_diff, version):
+    return recalculate_range(
+        low, high, batch_size=batch_size, dry_run=dry_run, collect_diff=collect_diff, version=version,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recalculate scores and threat levels of form responses and officer assessments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per bulk update / transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing anything')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Worker processes, each taking primary key ranges (useful on PostgreSQL; SQLite serializes writes)',
+        )
+        parser.add_argument(
+            '--rules-version', type=int, default=None,
+            help='Scoring rules version to apply (defaults to SCORING_RULES_VERSION / the latest)',
+        )
+        parser.add_argument(
+            '--in-database', action='store_true',
+            help='Re-score everything with single UPDATE statements instead of loading rows',
+        )
+
+    def handle(self, *args, **options):
+        from django.db import connections
+        from platform_manager import scoring
+        from platform_manager.models import FormResponse
+        from platform_manager.rollups import rebuild
+
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        workers = max(1, options['workers'])
+        version = options['rules_version'] or scoring.current_version()
+        if version not in scoring.RULESETS:
+            raise CommandError(f'Unknown scoring rules version: {version}')
+        collect_diff = dry_run or options['verbosity'] >= 2
+
+        if options['in_database']:
+            if dry_run:
+                assessments, responses = scoring.count_rescore_changes(version)
+                self.stdout.write(self.style.WARNING(
+                    f'Dry run: {responses} responses and {assessments} assessments would change (rules v{version})'
+                ))
+            else:
+                assessments, responses = scoring.rescore(version)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Re-scored {responses} responses and {assessments} assessments (rules v{version})'
+                ))
+            return
+
+        total = FormResponse.objects.count()
+        self.stdout.write(f'Recalculating {total} form responses with rules v{version}' + (' (dry run)' if dry_run else ''))
+
+        if workers == 1:
+            def progress(result):
+                self.stdout.write(f"  {result['processed']}/{total} processed, {result['responses']} responses changed")
+
+            results = [recalculate_range(
+                batch_size=batch_size, dry_run=dry_run, collect_diff=collect_diff, progress=progress, version=version,
+            )]
+        else:
+            # Workers open their own connections
+            connections.close_all()
+            results = []
+            processed = 0
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'), initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(_run_range, low, high, batch_size, dry_run, collect_diff, version)
+                    for low, high in split_pk_ranges(workers * RANGES_PER_WORKER)
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    processed += result['processed']
+                    self.stdout.write(f'  {processed}/{total} processed')
+
+        for result in results:
+            for line in result['diff']:
+                self.stdout.write(f'  {line}')
+
+        responses = sum(result['responses'] for result in results)
+        assessments = sum(result['assessments'] for result in results)
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'Dry run: {responses} responses and {assessments} assessments would change'
+            ))
+            return
+
+        if responses:
+            # bulk_update bypasses the signals that maintain the daily statistics
+            rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Updated {responses} responses and {assessments} assessments'))
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main scenarios (lists, search, detail, wizard, assessment, exports, "
+        "recalculation) on the current database and compare p50/p95 and query counts "
+        "with the stored baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Scenarios to run (all by default)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per scenario')
+        parser.add_argument('--baseline', help='Baseline file (default: benchmarks/baseline.json)')
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown over the baseline')
+        parser.add_argument('--check', action='store_true', help='Fail when a scenario regressed')
+        parser.add_argument('--list', action='store_true', help='List the scenarios and exit')
+        parser.add_argument(
+            '--allow-writes', action='store_true',
+            help='Run on a database that holds more than the synthetic dataset (scenarios submit and assess responses)',
+        )
+
+    def handle(self, *args, **options):
+        from platform_manager import benchmarks
+
+        if options['list']:
+            for item in benchmarks.SCENARIOS.values():
+                self.stdout.write(f'{item.name:<20} {item.description}')
+            return
+
+        path = Path(options['baseline']) if options['baseline'] else benchmarks.BASELINE_PATH
+        baseline = benchmarks.load_baseline(path)
+        if baseline:
+            dataset = benchmarks.dataset()
+            if baseline['dataset'] != dataset:
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline was measured on {baseline['dataset']}, this database is {dataset}"
+                ))
+        elif not options['save_baseline']:
+            self.stdout.write(self.style.WARNING(f'No baseline at {path}; run with --save-baseline to store one'))
+
+        try:
+            results = benchmarks.run(
+                options['scenarios'], max(1, options['repeat']),
+                progress=lambda item: self.stderr.write(f'  {item.name}...'),
+                allow_writes=options['allow_writes'],
+            )
+        except benchmarks.BenchmarkError as exc:
+            raise CommandError(str(exc))
+
+        previous = (baseline or {}).get('results', {})
+        regressed = []
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{'scenario':<20} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'queries':>8}   baseline p50/p95/queries"
+        ))
+        for result in results:
+            line = f'{result.scenario:<20} {result.runs:>5} {result.p50_ms:>10} {result.p95_ms:>10} {result.queries:>8}'
+            base = previous.get(result.scenario)
+            if base:
+                line += f"   {base['p50_ms']} / {base['p95_ms']} / {base['queries']}"
+            reasons = benchmarks.regressions(result, base, options['tolerance'])
+            if reasons:
+                regressed.append(result.scenario)
+                self.stdout.write(self.style.ERROR(f"{line}   REGRESSED: {'; '.join(reasons)}"))
+            else:
+                self.stdout.write(line)
+
+        if options['save_baseline']:
+            benchmarks.save_baseline(results, path)
+            self.stdout.write(self.style.SUCCESS(f'Saved the baseline to {path}'))
+        if regressed and options['check']:
+            raise CommandError(f"Regressed scenarios: {', '.join(regressed)}")
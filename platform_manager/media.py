@@ -0,0 +1,172 @@
+"""Access-checked delivery of uploaded media.
+
+Photos are served by ``views.protected_media`` instead of a public ``MEDIA_URL``.
+A file (or a rendition of it) may be fetched by managers and by the owner of an
+object referring to it: the submitter of the response, or the user of the
+profile. Blobs are shared by identical uploads, so any visible reference is
+enough. Stored exports (``exports/<response pk>/``) belong to the submitter of
+their response.
+
+Once access is granted the transfer itself is handed to the front proxy when
+``PROTECTED_MEDIA_SERVER`` is set: ``'nginx'`` answers with ``X-Accel-Redirect``
+to the ``internal`` location ``PROTECTED_MEDIA_INTERNAL_URL`` that aliases
+``MEDIA_ROOT``, ``'sendfile'`` answers with ``X-Sendfile`` (Apache mod_xsendfile,
+lighttpd). Without a proxy the file is streamed by ``file_response`` with ETag
+and single byte range support. Storages without local paths (MinIO) redirect to
+the storage URL.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.utils import validate_file_name
+from django.db import models
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import roles
+from .export_cache import EXPORT_ROOT
+from .models import BorderOfficerAssessment, FormResponse, Profile
+from .renditions import rendition_source
+from .storage import is_blob
+
+# Lookup from each model with files to the user owning it
+OWNER_LOOKUPS = {
+    FormResponse: 'created_by',
+    BorderOfficerAssessment: 'form_response__created_by',
+    Profile: 'user',
+}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Blob names change with their content, other names may be reused
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+CACHE_CONTROL = 'private, max-age=3600'
+
+
+def can_access(user, name):
+    if not user or not user.is_authenticated:
+        return False
+    if roles.is_manager(user):
+        return True
+    if name.startswith(f'{EXPORT_ROOT}/'):
+        try:
+            return FormResponse.objects.filter(pk=name.split('/')[1], created_by=user).exists()
+        except ValidationError:
+            return False
+    names = rendition_source(name) or [name]
+    for model, owner in OWNER_LOOKUPS.items():
+        fields = [field.attname for field in model._meta.fields if isinstance(field, models.FileField)]
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__in': names})
+        if model.objects.filter(condition, **{owner: user}).exists():
+            return True
+    return False
+
+
+def serve(request, name, storage=default_storage, content_type=None):
+    """Response delivering the stored file ``name``; access must be checked already."""
+    validate_file_name(name, allow_relative_path=True)
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    # Renditions of a blob are as immutable as the blob
+    immutable = all(is_blob(source) for source in rendition_source(name) or [name])
+    server = settings.PROTECTED_MEDIA_SERVER
+    if server == 'nginx':
+        # A missing file would become a 404 of the proxy the application never sees
+        if not storage.exists(name):
+            raise Http404
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.PROTECTED_MEDIA_INTERNAL_URL + quote(name)
+    else:
+        try:
+            path = storage.path(name)
+        except NotImplementedError:
+            return HttpResponseRedirect(storage.url(name))
+        if server == 'sendfile':
+            if not os.path.isfile(path):
+                raise Http404
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = path
+        else:
+            response = file_response(request, path, content_type)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else CACHE_CONTROL
+    return response
+
+
+def _byte_range(header, size):
+    """``(start, end)`` of a single ``Range`` header, None to send everything, ValueError if unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _iter_range(file, length):
+    try:
+        while length > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def file_response(request, path, content_type):
+    """Stream the file at ``path`` with ETag revalidation and single byte ranges."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    # A stale If-Range validator asks for the whole new file instead of a piece of it
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = _byte_range(range_header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    if byte_range is None:
+        # FileResponse lets the WSGI server use sendfile() where it can
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        file = open(path, 'rb')
+        file.seek(start)
+        response = StreamingHttpResponse(_iter_range(file, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -1,8 +1,31 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.http import HttpResponseForbidden
+from django.utils.functional import SimpleLazyObject
 from django.utils.translation import gettext as _
 
+from . import profiling
+from .roles import PANEL_ROLES, get_user_roles
+
+
+class UserRolesMiddleware:
+    """Expose the current user's group names as a lazily computed ``request.user_roles``.
+
+    Must come after ``AuthenticationMiddleware``. The set is loaded with one
+    query on first use (or taken from the cache) and shared by the other
+    middlewares, context processors and views.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user_roles = SimpleLazyObject(lambda: get_user_roles(request.user))
+        return self.get_response(request)
+
 
 class PanelRedirectMiddleware:
     """Redirect users in manager/submitter groups to the panel after login.
@@ -23,7 +46,7 @@ class PanelRedirectMiddleware:
 
         if should and request.user.is_authenticated:
             # Only redirect managers and submitters
-            if request.user.groups.filter(name__in=['manager', 'submitter']).exists():
+            if not request.user_roles.isdisjoint(PANEL_ROLES):
                 # Avoid redirect loops if already on panel
                 panel_url = reverse('manager_panel')
                 if request.path != panel_url:
@@ -49,7 +72,7 @@ class RestrictAdminAccessMiddleware:
                 # Allow only superusers
                 if not request.user.is_superuser:
                     # Redirect managers/submitters to their panel
-                    if request.user.groups.filter(name__in=['manager', 'submitter']).exists():
+                    if not request.user_roles.isdisjoint(PANEL_ROLES):
                         return redirect('manager_panel')
                     # Block other non-superuser staff
                     return HttpResponseForbidden(
@@ -59,3 +82,30 @@ class RestrictAdminAccessMiddleware:
                     )
 
         return self.get_response(request)
+
+
+class RequestProfilingMiddleware:
+    """Measure requests when ``REQUEST_PROFILING`` is on (see platform_manager.profiling).
+
+    Put it first so the time of the other middlewares is included. When
+    profiling is off Django drops the middleware at startup.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile, token = profiling.start()
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            profiling.stop(token)
+        profiling.finish(request, response, profile)
+        return response
+
+    def process_template_response(self, request, response):
+        profiling.time_template_response(response)
+        return response
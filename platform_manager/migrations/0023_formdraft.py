@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:10
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0022_formresponse_birth_date_formresponse_birth_place_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormDraft',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, verbose_name='Идентификатор')),
+                ('current_step', models.PositiveSmallIntegerField(default=1, verbose_name='Текущий шаг')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('form_response', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='drafts', to='platform_manager.formresponse', verbose_name='Редактируемый ответ')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='form_drafts', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Черновик формы',
+                'verbose_name_plural': 'Черновики форм',
+                'db_table': 'form_drafts',
+            },
+        ),
+        migrations.CreateModel(
+            name='FormDraftStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('step', models.PositiveSmallIntegerField(verbose_name='Шаг')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Ответы')),
+                ('files', models.JSONField(blank=True, default=dict, verbose_name='Загруженные файлы')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='steps', to='platform_manager.formdraft', verbose_name='Черновик')),
+            ],
+            options={
+                'verbose_name': 'Шаг черновика',
+                'verbose_name_plural': 'Шаги черновика',
+                'db_table': 'form_draft_steps',
+                'constraints': [models.UniqueConstraint(fields=('draft', 'step'), name='form_draft_step_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+
+def backfill_search_name(apps, schema_editor):
+    from platform_manager.search import build_search_name
+
+    FormResponse = apps.get_model('platform_manager', 'FormResponse')
+    batch = []
+    queryset = FormResponse.objects.only('id', 'last_name', 'first_name', 'patronymic', 'full_name_and_birth')
+    for response in queryset.iterator(chunk_size=1000):
+        response.search_name = build_search_name(response)
+        batch.append(response)
+        if len(batch) >= 1000:
+            FormResponse.objects.bulk_update(batch, ['search_name'])
+            batch = []
+    if batch:
+        FormResponse.objects.bulk_update(batch, ['search_name'])
+
+
+def create_search_index(apps, schema_editor):
+    from platform_manager.search import create_search_index
+
+    create_search_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    from platform_manager.search import drop_search_index
+
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0023_formdraft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formresponse',
+            name='search_name',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Поисковое имя'),
+        ),
+        migrations.RunPython(backfill_search_name, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
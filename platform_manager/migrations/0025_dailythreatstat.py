@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_daily_threat_stats(apps, schema_editor):
+    FormResponse = apps.get_model('platform_manager', 'FormResponse')
+    DailyThreatStat = apps.get_model('platform_manager', 'DailyThreatStat')
+    rows = (
+        FormResponse.objects.order_by()
+        .annotate(day=TruncDate('created_at', tzinfo=timezone.get_default_timezone()))
+        .values('day', 'birth_place', 'created_by', 'threat_level')
+        .annotate(total=Count('pk'))
+    )
+    DailyThreatStat.objects.bulk_create([
+        DailyThreatStat(
+            day=row['day'],
+            country=row['birth_place'] or '',
+            created_by_id=row['created_by'],
+            threat_level=row['threat_level'] or '',
+            count=row['total'],
+        )
+        for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0024_formresponse_search_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyThreatStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('country', models.CharField(blank=True, max_length=500, verbose_name='Страна')),
+                ('threat_level', models.CharField(blank=True, max_length=20, verbose_name='Уровень опасности')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Статистика за день',
+                'verbose_name_plural': 'Статистика по дням',
+                'db_table': 'daily_threat_stats',
+                'indexes': [models.Index(fields=['day', 'threat_level'], name='daily_threat_stat_day_level')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'country', 'created_by', 'threat_level'), name='daily_threat_stat_unique')],
+            },
+        ),
+        migrations.RunPython(populate_daily_threat_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0025_dailythreatstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='borderofficerassessment',
+            name='score_version',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Версия правил оценки'),
+        ),
+        migrations.AddField(
+            model_name='formresponse',
+            name='score_version',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Версия правил оценки'),
+        ),
+    ]
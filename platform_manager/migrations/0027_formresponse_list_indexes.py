@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0026_score_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['-created_at'], name='form_respon_created_9aaa13_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['created_by', '-created_at'], name='form_respon_created_0ca78c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['threat_level', '-created_at'], name='form_respon_threat__cc4b69_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['birth_place', '-created_at'], name='form_respon_birth_p_25713f_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+def backfill_created_date(apps, schema_editor):
+    from django.db.models.functions import TruncDate
+    from django.utils import timezone
+
+    FormResponse = apps.get_model('platform_manager', 'FormResponse')
+    FormResponse.objects.filter(created_date__isnull=True).update(
+        created_date=TruncDate('created_at', tzinfo=timezone.get_default_timezone())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0027_formresponse_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formresponse',
+            name='created_date',
+            field=models.DateField(db_index=True, editable=False, null=True, verbose_name='День создания'),
+        ),
+        migrations.RunPython(backfill_created_date, migrations.RunPython.noop),
+    ]
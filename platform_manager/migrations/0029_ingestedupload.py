@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0028_formresponse_created_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=255, verbose_name='Файл')),
+                ('field', models.CharField(max_length=100, verbose_name='Поле')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='Исходное имя')),
+                ('original_size', models.BigIntegerField(verbose_name='Исходный размер')),
+                ('size', models.BigIntegerField(verbose_name='Размер после обработки')),
+                ('normalized', models.BooleanField(default=False, verbose_name='Изображение перекодировано')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')),
+            ],
+            options={
+                'verbose_name': 'Загруженный файл',
+                'verbose_name_plural': 'Загруженные файлы',
+                'db_table': 'ingested_uploads',
+            },
+        ),
+    ]
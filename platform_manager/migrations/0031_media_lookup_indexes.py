@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0030_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borderofficerassessment',
+            index=models.Index(fields=['radical_internet_photo'], name='border_offi_radical_ba5c19_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borderofficerassessment',
+            index=models.Index(fields=['suspicious_mobile_photo'], name='border_offi_suspici_ecf934_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['full_name_photo'], name='form_respon_full_na_34a52c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['person_photo'], name='form_respon_person__a544af_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0031_media_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventlog',
+            name='event_type',
+            field=models.CharField(choices=[('NOTIFICATION', 'Отправка уведомления'), ('AUDIT', 'Аудит'), ('SYSTEM', 'Система'), ('PAYMENT', 'оплата'), ('GEOZONE', 'Гео Зона'), ('PERF', 'Производительность'), ('OTHER', 'Другое')], max_length=64, verbose_name='Тип события'),
+        ),
+    ]
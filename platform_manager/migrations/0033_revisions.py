@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+def restore_search_index(apps, schema_editor):
+    # SQLite adds these columns by rebuilding form_responses, which drops the search triggers
+    from platform_manager.search import create_search_index, drop_search_index
+
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_index(schema_editor)
+        create_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0032_eventlog_perf'),
+    ]
+
+    operations = [
+        # Removing the columns rebuilds the table as well
+        migrations.RunPython(migrations.RunPython.noop, restore_search_index),
+        migrations.AddField(
+            model_name='borderofficerassessment',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Редакция'),
+        ),
+        migrations.AddField(
+            model_name='borderofficerassessment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='formresponse',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Редакция'),
+        ),
+        migrations.AddField(
+            model_name='formresponse',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(restore_search_index, migrations.RunPython.noop),
+    ]
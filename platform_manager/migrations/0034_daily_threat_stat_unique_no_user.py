@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+def merge_no_user_buckets(apps, schema_editor):
+    # Deleting a user used to set created_by to NULL on their buckets, repeating the no-user ones
+    DailyThreatStat = apps.get_model('platform_manager', 'DailyThreatStat')
+    kept = {}
+    for stat in DailyThreatStat.objects.filter(created_by__isnull=True).order_by('pk'):
+        key = (stat.day, stat.country, stat.threat_level)
+        if key in kept:
+            kept[key].count += stat.count
+            kept[key].save(update_fields=['count'])
+            stat.delete()
+        else:
+            kept[key] = stat
+    DailyThreatStat.objects.filter(count=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform_manager', '0033_revisions'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_no_user_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailythreatstat',
+            constraint=models.UniqueConstraint(condition=models.Q(('created_by__isnull', True)), fields=('day', 'country', 'threat_level'), name='daily_threat_stat_unique_no_user'),
+        ),
+    ]
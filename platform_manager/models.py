@@ -247,6 +247,7 @@ class EventLog(models.Model):
         ("SYSTEM", "Система"),
         ("PAYMENT", "оплата"),
         ("GEOZONE", "Гео Зона"),
+        ("PERF", "Производительность"),
         ("OTHER", "Другое"),
     ]
 
@@ -265,6 +266,18 @@ class EventLog(models.Model):
         verbose_name_plural = "События"
 
 
+# Saved with every change of a response or assessment, including bulk updates
+REVISION_FIELDS = ('revision', 'updated_at')
+
+
+def bump_revision(instance, save_kwargs):
+    """Count the save of ``instance`` with ``save_kwargs`` as a new revision."""
+    if not instance._state.adding:
+        instance.revision += 1
+    if save_kwargs.get('update_fields') is not None:
+        save_kwargs['update_fields'] = set(save_kwargs['update_fields']) | set(REVISION_FIELDS)
+
+
 class FormResponse(models.Model):
     """Form response storing the questionnaire requested by the user.
 
@@ -348,53 +361,61 @@ class FormResponse(models.Model):
     # Basic metadata
     created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='form_responses', verbose_name="Пользователь")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    # Calendar day of created_at in TIME_ZONE, set on insert; date filters use it
+    # instead of created_at__date, which can't use an index
+    created_date = models.DateField(null=True, editable=False, db_index=True, verbose_name="День создания")
     
     # Scoring system
     total_score = models.IntegerField(default=0, verbose_name="Общий балл")
     threat_level = models.CharField(max_length=20, blank=True, verbose_name="Уровень опасности")
+    score_version = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Версия правил оценки")
+
+    # Case-folded names for search, maintained on save (see platform_manager.search)
+    search_name = models.TextField(blank=True, default='', editable=False, verbose_name="Поисковое имя")
+
+    # Bumped on every save; cached exports are keyed by it (see platform_manager.export_cache)
+    revision = models.PositiveIntegerField(default=1, editable=False, verbose_name="Редакция")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
 
     class Meta:
         db_table = "form_responses"
+        # Lists are always newest first, optionally narrowed by creator, level or country
+        indexes = [
+            models.Index(fields=["-created_at"]),
+            models.Index(fields=["created_by", "-created_at"]),
+            models.Index(fields=["threat_level", "-created_at"]),
+            models.Index(fields=["birth_place", "-created_at"]),
+            # Protected media looks up the response a photo belongs to
+            models.Index(fields=["full_name_photo"]),
+            models.Index(fields=["person_photo"]),
+        ]
         verbose_name = "Ответ на форму"
         verbose_name_plural = "Ответы на форму"
 
+    def save(self, *args, **kwargs):
+        from .search import SEARCH_SOURCE_FIELDS, build_search_name
+
+        self.search_name = build_search_name(self)
+        if self.created_date is None:
+            self.created_date = timezone.localdate(self.created_at or timezone.now())
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'created_date'}
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(SEARCH_SOURCE_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | {'search_name'}
+        bump_revision(self, kwargs)
+        super().save(*args, **kwargs)
+
     def calculate_score(self):
-        """Calculate threat score based on questionnaire responses."""
-        score = 0
-        
-        # Criteria based on provided scoring table
-        # Note: Some criteria need manual review by border officer
-        
-        if self.criminal_record:
-            score += 10  # Criterion 9: Criminal element
-            
-        if self.detained_abroad:
-            score += 20  # Criterion 3: Issues in documents/history
-            
-        if self.deported:
-            score += 20  # Criterion 3: Deportation
-            
-        if self.visited_countries:
-            score += 20  # Criterion 3: Travel to listed countries
-            
-        if self.relatives_wanted:
-            score += 10  # Criterion 8: Relatives with MTO connections
-            
-        if self.religious:
-            score += 15  # Criterion 4: Religious inclinations
-            
-        # Update total score
-        self.total_score = score
-        
-        # Determine threat level: 0=Low, 1-74=Medium, 75+=High
-        if score >= 75:
-            self.threat_level = "Высокий"
-        elif score >= 1:
-            self.threat_level = "Средний"
-        else:
-            self.threat_level = "Низкий"
-            
-        return score
+        """Calculate threat score based on questionnaire responses (see platform_manager.scoring)."""
+        from .scoring import score
+        return score(self, 'response')
+
+    def apply_assessment_score(self, assessment):
+        """Take the score of the officer's assessment, which overrides the questionnaire score."""
+        self.total_score = assessment.total_score
+        self.threat_level = assessment.threat_level
+        self.score_version = assessment.score_version
 
     def __str__(self):
         if self.last_name or self.first_name:
@@ -467,53 +488,33 @@ class BorderOfficerAssessment(models.Model):
     # Scoring
     total_score = models.IntegerField(default=0, verbose_name="Общий балл")
     threat_level = models.CharField(max_length=20, blank=True, verbose_name="Уровень опасности")
+    score_version = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Версия правил оценки")
     
     # Metadata
     assessed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='assessments', verbose_name="Оценил")
     assessed_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата оценки")
     notes = models.TextField(blank=True, verbose_name="Дополнительные заметки")
+    revision = models.PositiveIntegerField(default=1, editable=False, verbose_name="Редакция")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
     
     class Meta:
         db_table = "border_officer_assessments"
+        # Protected media looks up the assessment a photo belongs to
+        indexes = [
+            models.Index(fields=["radical_internet_photo"]),
+            models.Index(fields=["suspicious_mobile_photo"]),
+        ]
         verbose_name = "Оценка пограничника"
         verbose_name_plural = "Оценки пограничника"
     
+    def save(self, *args, **kwargs):
+        bump_revision(self, kwargs)
+        super().save(*args, **kwargs)
+    
     def calculate_score(self):
-        """Calculate threat score based on officer's assessment"""
-        score = 0
-        
-        if self.radical_internet:
-            score += 65
-        if self.radical_religious_ideology:
-            score += 45
-        if self.document_issues:
-            score += 20
-        if self.religious_deviations:
-            score += 15
-        if self.suspicious_mobile_content:
-            score += 15
-        if self.suspicious_behavior:
-            score += 15
-        if self.psychological_issues:
-            score += 15
-        if self.relatives_mto:
-            score += 10
-        if self.criminal_element:
-            score += 10
-        if self.violence_traces:
-            score += 10
-        
-        self.total_score = score
-        
-        # Determine threat level: 0=Low, 1-74=Medium, 75+=High
-        if score >= 75:
-            self.threat_level = "Высокий"
-        elif score >= 1:
-            self.threat_level = "Средний"
-        else:
-            self.threat_level = "Низкий"
-        
-        return score
+        """Calculate threat score based on officer's assessment (see platform_manager.scoring)."""
+        from .scoring import score
+        return score(self, 'assessment')
     
     def get_radical_internet_content_labels(self):
         """Get readable labels for radical internet content"""
@@ -582,4 +583,133 @@ class BorderOfficerAssessment(models.Model):
         return [choices_dict.get(value, value) for value in self.violence_traces_types]
     
     def __str__(self):
-        return f"Оценка для {self.form_response} - {self.threat_level} ({self.total_score} баллов)"
\ No newline at end of file
+        return f"Оценка для {self.form_response} - {self.threat_level} ({self.total_score} баллов)"
+
+
+class FormDraft(models.Model):
+    """Server-side draft of the multi-step questionnaire.
+
+    Answers are stored per step in ``FormDraftStep`` rows so every wizard step
+    only writes its own fields. A draft either creates a new ``FormResponse``
+    or edits an existing one (``form_response`` is set).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, verbose_name="Идентификатор")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='form_drafts', verbose_name="Пользователь")
+    form_response = models.ForeignKey(FormResponse, null=True, blank=True, on_delete=models.CASCADE, related_name='drafts', verbose_name="Редактируемый ответ")
+    current_step = models.PositiveSmallIntegerField(default=1, verbose_name="Текущий шаг")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    class Meta:
+        db_table = "form_drafts"
+        verbose_name = "Черновик формы"
+        verbose_name_plural = "Черновики форм"
+
+    def get_data(self):
+        """Merge all saved steps into ``(form_data, file_data)`` dicts."""
+        form_data = {}
+        file_data = {}
+        for step in self.steps.order_by('step'):
+            form_data.update(step.data)
+            file_data.update(step.files)
+        return form_data, file_data
+
+    def __str__(self):
+        return f"Черновик {self.user} (шаг {self.current_step})"
+
+
+class FormDraftStep(models.Model):
+    """Answers of a single wizard step within a draft.
+
+    Step 0 holds the initial values when an existing response is edited.
+    ``files`` maps field names to handles of staged uploads.
+    """
+    draft = models.ForeignKey(FormDraft, on_delete=models.CASCADE, related_name='steps', verbose_name="Черновик")
+    step = models.PositiveSmallIntegerField(verbose_name="Шаг")
+    data = JSONField(default=dict, blank=True, verbose_name="Ответы")
+    files = JSONField(default=dict, blank=True, verbose_name="Загруженные файлы")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    class Meta:
+        db_table = "form_draft_steps"
+        verbose_name = "Шаг черновика"
+        verbose_name_plural = "Шаги черновика"
+        constraints = [
+            models.UniqueConstraint(fields=['draft', 'step'], name='form_draft_step_unique'),
+        ]
+
+
+class DailyThreatStat(models.Model):
+    """Number of form responses per day, country, submitter and threat level.
+
+    Maintained incrementally from ``FormResponse`` saves and deletes (see
+    ``platform_manager.rollups``) and rebuilt with ``rebuild_threat_stats``.
+    Dashboards sum these rows instead of scanning ``form_responses``.
+    """
+    day = models.DateField(verbose_name="День")
+    country = models.CharField(max_length=500, blank=True, verbose_name="Страна")
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+', verbose_name="Пользователь")
+    threat_level = models.CharField(max_length=20, blank=True, verbose_name="Уровень опасности")
+    count = models.PositiveIntegerField(default=0, verbose_name="Количество")
+
+    class Meta:
+        db_table = "daily_threat_stats"
+        verbose_name = "Статистика за день"
+        verbose_name_plural = "Статистика по дням"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'country', 'created_by', 'threat_level'], name='daily_threat_stat_unique'),
+            # NULLs never conflict in the constraint above
+            models.UniqueConstraint(
+                fields=['day', 'country', 'threat_level'], condition=models.Q(created_by__isnull=True),
+                name='daily_threat_stat_unique_no_user',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'threat_level'], name='daily_threat_stat_day_level'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.country} {self.threat_level}: {self.count}"
+
+
+class IngestedUpload(models.Model):
+    """Size of an uploaded file before and after ingest normalization.
+
+    Written by ``platform_manager.ingest`` for every file stored in a file
+    field of ``FormResponse``, ``BorderOfficerAssessment`` and ``Profile``.
+    ``name`` is the storage name of the stored file.
+    """
+    name = models.CharField(max_length=255, db_index=True, verbose_name="Файл")
+    field = models.CharField(max_length=100, verbose_name="Поле")
+    original_name = models.CharField(max_length=255, blank=True, verbose_name="Исходное имя")
+    original_size = models.BigIntegerField(verbose_name="Исходный размер")
+    size = models.BigIntegerField(verbose_name="Размер после обработки")
+    normalized = models.BooleanField(default=False, verbose_name="Изображение перекодировано")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата загрузки")
+
+    class Meta:
+        db_table = "ingested_uploads"
+        verbose_name = "Загруженный файл"
+        verbose_name_plural = "Загруженные файлы"
+
+    def __str__(self):
+        return f"{self.name}: {self.original_size} → {self.size}"
+
+
+class MediaBlob(models.Model):
+    """A content-addressed media file and the number of file fields referring to it.
+
+    Maintained from saves and deletes of the models with file fields (see
+    ``platform_manager.blobs``); the file is deleted once nothing refers to it.
+    """
+    name = models.CharField(max_length=255, unique=True, verbose_name="Файл")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Количество ссылок")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    class Meta:
+        db_table = "media_blobs"
+        verbose_name = "Файл хранилища"
+        verbose_name_plural = "Файлы хранилища"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
@@ -1,6 +1,8 @@
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 
+from .roles import MANAGER, get_user_roles
+
 def get_menu_items(request):
     """Return menu items for the platform manager app."""
     items = []
@@ -16,7 +18,7 @@ def get_menu_items(request):
         })
 
     # Responses list - only for managers
-    if user.groups.filter(name='manager').exists():
+    if MANAGER in get_user_roles(user):
         items.append({
             'title': _('View Responses'),
             'url': reverse_lazy('platform_manager:form_responses'),
@@ -0,0 +1,145 @@
+"""Pagination of response lists without OFFSET and exact counts.
+
+``KeysetPaginator`` walks a queryset newest first on (``created_at``, ``id``).
+A page is fetched with a range condition on the last (or first) row of the
+neighbouring page, which the ``created_at`` indexes answer directly however deep
+the page is. Pages are addressed by opaque cursors instead of numbers.
+
+``EstimatedCountPaginator`` is a regular ``Paginator`` for page-number lists
+such as the admin changelist; on PostgreSQL large counts come from the planner
+statistics instead of a ``COUNT(*)`` over the whole table.
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(response, direction):
+    payload = json.dumps([response.created_at.isoformat(), str(response.pk), direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, pk, direction)`` of a cursor made by ``encode_cursor``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = datetime.fromisoformat(created_at)
+        pk = uuid.UUID(pk)
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if direction not in (NEXT, PREVIOUS) or created_at.tzinfo is None:
+        raise InvalidCursor(cursor)
+    return created_at, pk, direction
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Newest-first cursor pagination of a ``FormResponse`` queryset."""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        """Return the page after/before ``cursor``, or the first page.
+
+        Raises ``InvalidCursor`` for cursors that weren't made by this module.
+        """
+        if not cursor:
+            rows = list(self.queryset.order_by('-created_at', '-pk')[:self.per_page + 1])
+            return self._page(rows[:self.per_page], more_after=len(rows) > self.per_page, more_before=False)
+
+        created_at, pk, direction = decode_cursor(cursor)
+        if direction == NEXT:
+            # created_at <= t keeps the range usable by the index; ties are broken on the primary key
+            rows = list(
+                self.queryset.filter(created_at__lte=created_at)
+                .exclude(created_at=created_at, pk__gte=pk)
+                .order_by('-created_at', '-pk')[:self.per_page + 1]
+            )
+            return self._page(rows[:self.per_page], more_after=len(rows) > self.per_page, more_before=True)
+
+        rows = list(
+            self.queryset.filter(created_at__gte=created_at)
+            .exclude(created_at=created_at, pk__lte=pk)
+            .order_by('created_at', 'pk')[:self.per_page + 1]
+        )
+        more_before = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._page(rows, more_after=True, more_before=more_before)
+
+    def _page(self, rows, more_after, more_before):
+        if not rows:
+            return KeysetPage(rows)
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], NEXT) if more_after else None,
+            previous_cursor=encode_cursor(rows[0], PREVIOUS) if more_before else None,
+        )
+
+
+def estimate_count(queryset):
+    """Planner's row estimate for ``queryset`` on PostgreSQL; None on other databases."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Page-number paginator that trusts the planner's estimate for large results.
+
+    Small results are counted exactly, so the last pages of a short list stay
+    correct.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate > self.exact_count_limit:
+                return estimate
+        return super().count
@@ -0,0 +1,210 @@
+"""Opt-in request profiling and Prometheus metrics.
+
+With ``REQUEST_PROFILING`` on, ``RequestProfilingMiddleware`` measures every
+request: total time, SQL statement count and time (through a database execute
+wrapper), template rendering and the spans hot paths mark with ``timed()``
+(wizard steps and submits, list statistics, PDF/DOCX rendering). The numbers
+are aggregated per view in this process and served as Prometheus text by
+``views.metrics``. A sample of requests (``REQUEST_PROFILING_SAMPLE_RATE``,
+plus every request slower than ``REQUEST_PROFILING_SLOW_MS``) is also stored as
+a ``PERF`` ``EventLog`` entry with the session size, for looking at single
+slow requests afterwards.
+
+Aggregates live in process memory: each worker reports its own requests since
+it started, so scrape every worker or sum the series.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .models import EventLog
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Measurements of one request; also the execute wrapper counting its SQL."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.spans = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+    def add(self, name, seconds):
+        self.spans[name] += seconds
+
+
+def start():
+    """Begin profiling the current request; returns ``(profile, token)`` for ``stop()``."""
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to span ``name`` of the request being profiled."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start_time)
+
+
+def time_template_response(response):
+    """Time the deferred rendering of a ``TemplateResponse`` as the 'template' span."""
+    profile = _current.get()
+    if profile is None:
+        return
+    start_time = time.perf_counter()
+    response.add_post_render_callback(lambda response: profile.add('template', time.perf_counter() - start_time))
+
+
+class Metrics:
+    """Per-view request counters and histograms of this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.duration_sum = defaultdict(float)
+        self.duration_count = defaultdict(int)
+        self.sql_count = defaultdict(int)
+        self.sql_time = defaultdict(float)
+        self.span_time = defaultdict(float)
+
+    def observe(self, view, method, status, profile, duration):
+        with self.lock:
+            self.requests[(view, method, str(status))] += 1
+            buckets = self.buckets[view]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[index] += 1
+            self.duration_sum[view] += duration
+            self.duration_count[view] += 1
+            self.sql_count[view] += profile.sql_count
+            self.sql_time[view] += profile.sql_time
+            for name, seconds in profile.spans.items():
+                self.span_time[(view, name)] += seconds
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self.lock:
+            lines = []
+            _family(lines, 'granica_requests_total', 'counter', 'Profiled requests.', [
+                ({'view': view, 'method': method, 'status': status}, count)
+                for (view, method, status), count in sorted(self.requests.items())
+            ])
+            lines.append('# HELP granica_request_duration_seconds Request duration.')
+            lines.append('# TYPE granica_request_duration_seconds histogram')
+            for view in sorted(self.duration_count):
+                for bound, count in zip(DURATION_BUCKETS, self.buckets[view]):
+                    lines.append(_sample('granica_request_duration_seconds_bucket', {'view': view, 'le': str(bound)}, count))
+                count = self.duration_count[view]
+                lines.append(_sample('granica_request_duration_seconds_bucket', {'view': view, 'le': '+Inf'}, count))
+                lines.append(_sample('granica_request_duration_seconds_sum', {'view': view}, self.duration_sum[view]))
+                lines.append(_sample('granica_request_duration_seconds_count', {'view': view}, count))
+            _family(lines, 'granica_sql_queries_total', 'counter', 'SQL statements run by requests.', [
+                ({'view': view}, count) for view, count in sorted(self.sql_count.items())
+            ])
+            _family(lines, 'granica_sql_seconds_total', 'counter', 'Time requests spent in SQL.', [
+                ({'view': view}, seconds) for view, seconds in sorted(self.sql_time.items())
+            ])
+            _family(lines, 'granica_span_seconds_total', 'counter', 'Time requests spent in instrumented sections.', [
+                ({'view': view, 'span': name}, seconds) for (view, name), seconds in sorted(self.span_time.items())
+            ])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, labels, value):
+    label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+    return f'{name}{{{label_text}}} {value}'
+
+
+def _family(lines, name, kind, help_text, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    lines.extend(_sample(name, labels, value) for labels, value in samples)
+
+
+metrics = Metrics()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+def session_size(request):
+    """Size of the encoded session, or None when the request didn't load it."""
+    session = getattr(request, 'session', None)
+    if session is None or not session.accessed:
+        return None
+    return len(session.encode(session._get_session()))
+
+
+def finish(request, response, profile):
+    """Aggregate ``profile`` and store it as an event when it is sampled."""
+    duration = time.perf_counter() - profile.started
+    view = view_name(request)
+    metrics.observe(view, request.method, response.status_code, profile, duration)
+
+    slow = duration * 1000 >= settings.REQUEST_PROFILING_SLOW_MS
+    if not slow and random.random() >= settings.REQUEST_PROFILING_SAMPLE_RATE:
+        return
+
+    user = getattr(request, 'user', None)
+    payload = {
+        'view': view,
+        'path': request.path,
+        'method': request.method,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 2),
+        'sql_count': profile.sql_count,
+        'sql_ms': round(profile.sql_time * 1000, 2),
+        'spans_ms': {name: round(seconds * 1000, 2) for name, seconds in profile.spans.items()},
+        'session_bytes': session_size(request),
+        'slow': slow,
+    }
+    try:
+        EventLog.objects.create(
+            event_type='PERF',
+            severity='WARNING' if slow else 'INFO',
+            user=user if user is not None and user.is_authenticated else None,
+            payload=payload,
+        )
+    except Exception:
+        # Profiling must never break the request it measured
+        logger.exception("Could not store the request profile of %s", request.path)
@@ -0,0 +1,142 @@
+"""Downscaled renditions of the photos attached to form responses.
+
+Officers attach phone photos of several megabytes. Pages show a small
+thumbnail and exports embed an image sized for a printed page, so each photo
+gets two derivatives: ``thumb`` and ``export``. They are stored next to the
+media under ``renditions/<size>/`` with a name derived from the original, and
+are generated once a save of the response commits (see ``connect_signals``),
+outside of its transaction, or on first use for photos uploaded before. They
+are only read through the storage API, so they work on remote storages such
+as MinIO too. Files that Pillow can't read (the suspicious content attachment
+accepts any file) have no rendition; callers then fall back to the original.
+"""
+import logging
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+
+from .models import BorderOfficerAssessment, FormResponse
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels and JPEG quality of each rendition
+RENDITIONS = {
+    'thumb': (320, 75),
+    'export': (1600, 85),
+}
+
+RENDITION_ROOT = 'renditions'
+
+PHOTO_FIELDS = {
+    FormResponse: ('full_name_photo', 'person_photo'),
+    BorderOfficerAssessment: ('radical_internet_photo', 'suspicious_mobile_photo'),
+}
+
+# Originals that failed to decode are remembered so pages don't retry them on every view
+_FAILED_KEY = 'rendition-failed:{}'
+_FAILED_TIMEOUT = 24 * 60 * 60
+
+
+def rendition_name(name, size):
+    if not name.endswith('.jpg'):
+        name += '.jpg'
+    return f'{RENDITION_ROOT}/{size}/{name}'
+
+
+def rendition_source(name):
+    """Storage names a rendition ``name`` may have been rendered from; None for other files."""
+    for size in RENDITIONS:
+        prefix = f'{RENDITION_ROOT}/{size}/'
+        if name.startswith(prefix):
+            source = name[len(prefix):]
+            return [source, source[:-len('.jpg')]] if source.endswith('.jpg') else [source]
+    return None
+
+
+def render(source, size):
+    """Return the JPEG bytes of ``source`` (a readable file) downscaled for ``size``."""
+    max_side, quality = RENDITIONS[size]
+    with Image.open(source) as image:
+        # Let the JPEG decoder skip resolution we'd throw away anyway
+        image.draft('RGB', (max_side, max_side))
+        # Phone photos are often stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = BytesIO()
+        image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def get_rendition(fieldfile, size):
+    """Storage name of the ``size`` rendition of ``fieldfile``, or None.
+
+    Generates the rendition when it doesn't exist yet. None means there is no
+    file or it isn't an image Pillow can read.
+    """
+    if not fieldfile or size not in RENDITIONS:
+        return None
+    storage = fieldfile.storage
+    name = rendition_name(fieldfile.name, size)
+    if storage.exists(name):
+        return name
+    failed_key = _FAILED_KEY.format(fieldfile.name)
+    if cache.get(failed_key):
+        return None
+    try:
+        with storage.open(fieldfile.name, 'rb') as source:
+            content = render(source, size)
+    except Exception as exc:
+        logger.info("No %s rendition for %s: %s", size, fieldfile.name, exc)
+        cache.set(failed_key, True, _FAILED_TIMEOUT)
+        return None
+    # Another request may have rendered it meanwhile; keep whichever landed first
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(content))
+
+
+def rendition_url(fieldfile, size):
+    """URL of the ``size`` rendition, or of the original file when there is none."""
+    if not fieldfile:
+        return ''
+    name = get_rendition(fieldfile, size)
+    return fieldfile.storage.url(name) if name else fieldfile.url
+
+
+def rendition_file(fieldfile, size):
+    """In-memory copy of the ``size`` rendition, or None when the file isn't an image."""
+    name = get_rendition(fieldfile, size)
+    if name is None:
+        return None
+    # Storages like MinIO have no local path to hand to ReportLab or python-docx
+    with fieldfile.storage.open(name, 'rb') as file:
+        return BytesIO(file.read())
+
+
+def render_all(fieldfiles):
+    for fieldfile in fieldfiles:
+        for size in RENDITIONS:
+            get_rendition(fieldfile, size)
+
+
+def _on_saved(sender, instance, update_fields=None, **kwargs):
+    fieldfiles = [
+        getattr(instance, field_name) for field_name in PHOTO_FIELDS[sender]
+        if update_fields is None or field_name in update_fields
+    ]
+    fieldfiles = [fieldfile for fieldfile in fieldfiles if fieldfile]
+    if fieldfiles:
+        # Decoding phone photos would hold the write transaction (and SQLite's lock) open;
+        # a failure only means the renditions are made on first use
+        transaction.on_commit(lambda: render_all(fieldfiles), robust=True)
+
+
+def connect_signals():
+    for model in PHOTO_FIELDS:
+        post_save.connect(_on_saved, sender=model, dispatch_uid=f'renditions_post_save_{model.__name__}')
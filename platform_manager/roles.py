@@ -0,0 +1,98 @@
+"""Group-based roles of the current user.
+
+Role checks used to run ``user.groups.filter(name=...).exists()`` in every
+middleware, context processor and view. ``get_user_roles()`` loads the group
+names once per user object (``request.user`` lives for the whole request).
+
+With ``USER_ROLES_CACHE_TTL`` set they are also kept in the cache across
+requests. Membership changes, group renames and deletions invalidate the
+cached sets, but only in the cache the changing process sees: with the
+per-process default (``LocMemCache``) other workers would keep granting
+removed roles until the TTL runs out, so the TTL defaults to 0 and should only
+be raised with a shared cache (Redis, Memcached, database).
+"""
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+MANAGER = 'manager'
+SUBMITTER = 'submitter'
+PANEL_ROLES = (MANAGER, SUBMITTER)
+
+_VERSION_KEY = 'platform_manager:user_roles:version'
+
+
+def _cache_ttl():
+    return getattr(settings, 'USER_ROLES_CACHE_TTL', 0)
+
+
+def _cache_key(user_pk):
+    # Group renames/deletes bump the version instead of deleting every user's key
+    version = cache.get_or_set(_VERSION_KEY, 1, None)
+    return f'platform_manager:user_roles:{version}:{user_pk}'
+
+
+def get_user_roles(user):
+    """Return the frozenset of group names of ``user`` (empty for anonymous users)."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_roles_cache', None)
+    if roles is not None:
+        return roles
+    ttl = _cache_ttl()
+    key = _cache_key(user.pk) if ttl else None
+    if key:
+        roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        if key:
+            cache.set(key, roles, ttl)
+    user._roles_cache = roles
+    return roles
+
+
+def has_role(user, *names):
+    return not get_user_roles(user).isdisjoint(names)
+
+
+def is_manager(user):
+    """Superusers and members of the 'manager' group have full manager access."""
+    if not user or not user.is_authenticated:
+        return False
+    return user.is_superuser or MANAGER in get_user_roles(user)
+
+
+def invalidate_user_roles(*user_pks):
+    for pk in user_pks:
+        cache.delete(_cache_key(pk))
+
+
+def _on_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if reverse:
+        # group.user_set.add(...): ``instance`` is the group
+        if pk_set:
+            invalidate_user_roles(*pk_set)
+        elif action == 'pre_clear':
+            invalidate_user_roles(*instance.user_set.values_list('pk', flat=True))
+    else:
+        instance.__dict__.pop('_roles_cache', None)
+        invalidate_user_roles(instance.pk)
+
+
+def _on_group_changed(sender, **kwargs):
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 2, None)
+
+
+def connect_signals():
+    from django.contrib.auth import get_user_model
+
+    m2m_changed.connect(_on_groups_changed, sender=get_user_model().groups.through, dispatch_uid='user_roles_m2m')
+    post_save.connect(_on_group_changed, sender=Group, dispatch_uid='user_roles_group_saved')
+    post_delete.connect(_on_group_changed, sender=Group, dispatch_uid='user_roles_group_deleted')
+
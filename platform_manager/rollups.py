@@ -0,0 +1,125 @@
+"""Incremental maintenance of the ``DailyThreatStat`` rollup.
+
+Every ``FormResponse`` contributes one unit to the row of its
+(day, country, submitter, threat level) bucket. Saves that move a response to
+another bucket (usually a new threat level after an officer assessment) move
+the unit; deletes remove it. Buckets that drop to zero are deleted, so the
+rollup always has the rows ``rebuild()`` would create. Changes made with
+``QuerySet.update()`` or ``bulk_update()`` bypass signals, so bulk jobs call
+``rebuild()`` afterwards.
+
+Responses without a submitter share one bucket per day, country and threat
+level; a partial unique constraint keeps it single, as NULLs never conflict in
+the main one. Deleting a user merges their buckets into those.
+
+Days are the ``created_date`` of the responses (calendar day of creation in
+``TIME_ZONE``), the column the date filters of the responses list use.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from .models import DailyThreatStat, FormResponse, User
+
+# FormResponse fields that decide the bucket of a response.
+ROLLUP_FIELDS = ('created_date', 'birth_place', 'created_by', 'threat_level')
+
+
+def rollup_key(day, country, created_by_id, threat_level):
+    return (day, country or '', created_by_id, threat_level or '')
+
+
+def response_key(response):
+    return rollup_key(response.created_date, response.birth_place, response.created_by_id, response.threat_level)
+
+
+def _bucket(key):
+    day, country, created_by_id, threat_level = key
+    return DailyThreatStat.objects.filter(day=day, country=country, created_by_id=created_by_id, threat_level=threat_level)
+
+
+def apply_delta(key, delta):
+    """Add ``delta`` responses to the bucket ``key``."""
+    if delta < 0:
+        _bucket(key).filter(count__gte=-delta).update(count=F('count') + delta)
+        _bucket(key).filter(count=0).delete()
+        return
+    if _bucket(key).update(count=F('count') + delta):
+        return
+    day, country, created_by_id, threat_level = key
+    try:
+        with transaction.atomic():
+            DailyThreatStat.objects.create(
+                day=day, country=country, created_by_id=created_by_id, threat_level=threat_level, count=delta
+            )
+    except IntegrityError:
+        # A concurrent request created the bucket first
+        _bucket(key).update(count=F('count') + delta)
+
+
+def rebuild():
+    """Recompute the whole rollup from ``form_responses``; returns the row count."""
+    rows = (
+        FormResponse.objects.order_by()
+        .values('created_date', 'birth_place', 'created_by', 'threat_level')
+        .annotate(total=Count('pk'))
+    )
+    stats = [
+        DailyThreatStat(
+            day=row['created_date'],
+            country=row['birth_place'] or '',
+            created_by_id=row['created_by'],
+            threat_level=row['threat_level'] or '',
+            count=row['total'],
+        )
+        for row in rows.iterator()
+    ]
+    with transaction.atomic():
+        DailyThreatStat.objects.all().delete()
+        DailyThreatStat.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
+
+
+def _remember_previous_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._rollup_previous_key = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(ROLLUP_FIELDS):
+        return
+    previous = (
+        FormResponse.objects.filter(pk=instance.pk)
+        .values_list('created_date', 'birth_place', 'created_by_id', 'threat_level')
+        .first()
+    )
+    if previous is not None:
+        instance._rollup_previous_key = rollup_key(*previous)
+
+
+def _on_response_saved(sender, instance, created, **kwargs):
+    key = response_key(instance)
+    previous = getattr(instance, '_rollup_previous_key', None)
+    instance._rollup_previous_key = None
+    if created:
+        apply_delta(key, 1)
+    elif previous is not None and previous != key:
+        apply_delta(previous, -1)
+        apply_delta(key, 1)
+
+
+def _on_response_deleted(sender, instance, **kwargs):
+    apply_delta(response_key(instance), -1)
+
+
+def _on_user_deleted(sender, instance, **kwargs):
+    # Deleting the user sets created_by to NULL; their buckets join the no-submitter ones
+    buckets = DailyThreatStat.objects.filter(created_by=instance)
+    for day, country, threat_level, count in buckets.values_list('day', 'country', 'threat_level', 'count'):
+        apply_delta(rollup_key(day, country, None, threat_level), count)
+    buckets.delete()
+
+
+def connect_signals():
+    pre_save.connect(_remember_previous_key, sender=FormResponse, dispatch_uid='daily_threat_stat_pre_save')
+    post_save.connect(_on_response_saved, sender=FormResponse, dispatch_uid='daily_threat_stat_post_save')
+    post_delete.connect(_on_response_deleted, sender=FormResponse, dispatch_uid='daily_threat_stat_post_delete')
+    pre_delete.connect(_on_user_deleted, sender=User, dispatch_uid='daily_threat_stat_user_pre_delete')
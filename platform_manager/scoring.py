@@ -0,0 +1,191 @@
+"""Versioned threat scoring rules.
+
+A rule set gives the weight of every yes/no answer and the score thresholds of
+the threat levels. ``FormResponse`` is scored from the questionnaire
+(``'response'`` rules) unless an officer assessment exists, in which case it
+takes the assessment's score (``'assessment'`` rules).
+
+The same rules are available as SQL expressions, so a whole table can be
+re-scored with one ``UPDATE`` after a policy change (see ``rescore()``). When
+weights or thresholds change, add a new version instead of editing an existing
+one and point ``SCORING_RULES_VERSION`` at it; every stored score records the
+version that produced it in ``score_version``.
+"""
+from functools import reduce
+from operator import add
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+LEVEL_LOW = 'Низкий'
+LEVEL_MEDIUM = 'Средний'
+LEVEL_HIGH = 'Высокий'
+
+RULESETS = {
+    1: {
+        # (minimum score, level), highest first; below all of them the level is low
+        'thresholds': ((75, LEVEL_HIGH), (1, LEVEL_MEDIUM)),
+        'weights': {
+            'assessment': {
+                'radical_internet': 65,
+                'radical_religious_ideology': 45,
+                'document_issues': 20,
+                'religious_deviations': 15,
+                'suspicious_mobile_content': 15,
+                'suspicious_behavior': 15,
+                'psychological_issues': 15,
+                'relatives_mto': 10,
+                'criminal_element': 10,
+                'violence_traces': 10,
+            },
+            'response': {
+                'criminal_record': 10,  # Criterion 9: Criminal element
+                'detained_abroad': 20,  # Criterion 3: Issues in documents/history
+                'deported': 20,  # Criterion 3: Deportation
+                'visited_countries': 20,  # Criterion 3: Travel to listed countries
+                'relatives_wanted': 10,  # Criterion 8: Relatives with MTO connections
+                'religious': 15,  # Criterion 4: Religious inclinations
+            },
+        },
+    },
+}
+
+
+def current_version():
+    return getattr(settings, 'SCORING_RULES_VERSION', max(RULESETS))
+
+
+def get_rules(version=None):
+    return RULESETS[version or current_version()]
+
+
+def score_fields(kind, version=None):
+    """Names of the boolean fields the ``kind`` rules read."""
+    return tuple(get_rules(version)['weights'][kind])
+
+
+def threat_level_for(score, version=None):
+    for minimum, level in get_rules(version)['thresholds']:
+        if score >= minimum:
+            return level
+    return LEVEL_LOW
+
+
+def score(instance, kind, version=None):
+    """Set ``total_score``, ``threat_level`` and ``score_version`` on ``instance``."""
+    version = version or current_version()
+    weights = get_rules(version)['weights'][kind]
+    total = sum(weight for name, weight in weights.items() if getattr(instance, name))
+    instance.total_score = total
+    instance.threat_level = threat_level_for(total, version)
+    instance.score_version = version
+    return total
+
+
+# ------------------------------
+# SQL expressions
+# ------------------------------
+
+def score_expression(kind, version=None, prefix=''):
+    """``SUM(CASE WHEN field THEN weight ELSE 0 END)`` over the rule fields of one row.
+
+    ``prefix`` reads the fields through a relation, e.g. ``'officer_assessment__'``.
+    """
+    weights = get_rules(version)['weights'][kind]
+    terms = [
+        Case(When(**{prefix + name: True}, then=Value(weight)), default=Value(0), output_field=IntegerField())
+        for name, weight in weights.items()
+    ]
+    return reduce(add, terms, Value(0))
+
+
+def threat_level_expression(score_expr, version=None):
+    whens = [
+        When(GreaterThanOrEqual(score_expr, minimum), then=Value(level))
+        for minimum, level in get_rules(version)['thresholds']
+    ]
+    return Case(*whens, default=Value(LEVEL_LOW))
+
+
+def rescore(version=None):
+    """Re-score every assessment and response in the database with three UPDATEs.
+
+    Only rows whose score, level or rules version change are written, and
+    returns their ``(assessments, responses)`` counts. Updates bypass model
+    signals, so the daily statistics rollup is rebuilt afterwards.
+    """
+    from .models import BorderOfficerAssessment, FormResponse
+    from .rollups import rebuild
+
+    version = version or current_version()
+    changed = _changed(version)
+    # Scores are printed in exports, so every changed row gets a new revision
+    revision = {'revision': F('revision') + 1, 'updated_at': timezone.now()}
+    with transaction.atomic():
+        assessment_score = score_expression('assessment', version)
+        assessment_level = threat_level_expression(assessment_score, version)
+        assessments = BorderOfficerAssessment.objects.alias(
+            new_score=assessment_score, new_level=assessment_level,
+        ).filter(changed).update(
+            total_score=assessment_score,
+            threat_level=assessment_level,
+            score_version=version,
+            **revision,
+        )
+
+        assessed = BorderOfficerAssessment.objects.filter(form_response=OuterRef('pk'))
+        assessed_score = Subquery(assessed.values('total_score')[:1])
+        assessed_level = Subquery(assessed.values('threat_level')[:1])
+        responses = FormResponse.objects.filter(officer_assessment__isnull=False).alias(
+            new_score=assessed_score, new_level=assessed_level,
+        ).filter(changed).update(
+            total_score=assessed_score,
+            threat_level=assessed_level,
+            score_version=version,
+            **revision,
+        )
+
+        response_score = score_expression('response', version)
+        response_level = threat_level_expression(response_score, version)
+        responses += FormResponse.objects.filter(officer_assessment__isnull=True).alias(
+            new_score=response_score, new_level=response_level,
+        ).filter(changed).update(
+            total_score=response_score,
+            threat_level=response_level,
+            score_version=version,
+            **revision,
+        )
+        rebuild()
+    return assessments, responses
+
+
+def _changed(version):
+    """Rows whose ``new_score``/``new_level`` aliases or rules version differ from the stored ones."""
+    return ~Q(total_score=F('new_score')) | ~Q(threat_level=F('new_level')) | ~Q(score_version=version)
+
+
+def count_rescore_changes(version=None):
+    """Return ``(assessments, responses)`` that ``rescore(version)`` would change."""
+    from .models import BorderOfficerAssessment, FormResponse
+
+    version = version or current_version()
+    changed = _changed(version)
+
+    assessment_score = score_expression('assessment', version)
+    assessments = BorderOfficerAssessment.objects.alias(
+        new_score=assessment_score,
+        new_level=threat_level_expression(assessment_score, version),
+    ).filter(changed).count()
+
+    response_score = Case(
+        When(officer_assessment__isnull=False, then=score_expression('assessment', version, prefix='officer_assessment__')),
+        default=score_expression('response', version),
+    )
+    responses = FormResponse.objects.alias(
+        new_score=response_score,
+        new_level=threat_level_expression(response_score, version),
+    ).filter(changed).count()
+    return assessments, responses
@@ -0,0 +1,150 @@
+"""Name search for form responses.
+
+``FormResponse.search_name`` keeps a case-folded copy of the name fields that
+is maintained on save. SQLite's LIKE/lower() only fold ASCII, so folding is
+done in Python where Cyrillic and Kazakh letters (Қ/Ұ/Ғ/Ә/Ө/Ү/Һ/І/Ң) are
+handled correctly; search terms are folded the same way.
+
+The column is indexed per backend:
+
+- SQLite: an FTS5 table with the trigram tokenizer, kept in sync by triggers;
+- PostgreSQL: a GIN index with ``gin_trgm_ops`` that serves ``LIKE '%term%'``.
+
+SQLite drops the triggers whenever a migration rebuilds ``form_responses``.
+Such migrations recreate the index (see 0033); if one doesn't, searches fall
+back to scanning ``search_name`` until ``rebuild_search_index`` is run.
+"""
+import logging
+import unicodedata
+
+from django.db import OperationalError, connections
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'form_responses_search'
+FTS_TRIGGERS = tuple(f'{FTS_TABLE}_{suffix}' for suffix in ('ai', 'ad', 'au'))
+
+# Trigram indexes can't answer shorter queries; these fall back to a LIKE scan.
+MIN_INDEXED_LENGTH = 3
+
+SEARCH_SOURCE_FIELDS = ('last_name', 'first_name', 'patronymic', 'full_name_and_birth')
+
+
+def normalize_search_text(*parts):
+    """Fold text for case- and accent-insensitive name matching."""
+    text = ' '.join(part for part in parts if part)
+    text = unicodedata.normalize('NFKC', text).casefold().replace('ё', 'е')
+    return ' '.join(text.split())
+
+
+def build_search_name(response):
+    """Return the value stored in ``FormResponse.search_name``."""
+    return normalize_search_text(*(getattr(response, name) for name in SEARCH_SOURCE_FIELDS))
+
+
+_fts_available = {}
+
+
+def has_fts_index(connection):
+    """Return True if the SQLite FTS5 search table and its sync triggers exist on ``connection``."""
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_available:
+        names = (FTS_TABLE, *FTS_TRIGGERS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names
+            )
+            found = {name for name, in cursor.fetchall()}
+        available = found.issuperset(names)
+        if FTS_TABLE in found and not available:
+            # Rows saved since the triggers went missing aren't in the table
+            logger.warning(
+                "The name search index of %s has no sync triggers, searching without it; "
+                "run the rebuild_search_index command", connection.alias,
+            )
+        _fts_available[connection.alias] = available
+    return _fts_available[connection.alias]
+
+
+def search_responses(queryset, term):
+    """Filter ``queryset`` by name using the backend's search index."""
+    needle = normalize_search_text(term)
+    if not needle:
+        return queryset
+    connection = connections[queryset.db]
+    if len(needle) >= MIN_INDEXED_LENGTH and has_fts_index(connection):
+        phrase = '"{}"'.format(needle.replace('"', '""'))
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT response_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [phrase]
+        ))
+    return queryset.filter(search_name__contains=needle)
+
+
+# ------------------------------
+# Index maintenance (used by migrations)
+# ------------------------------
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(response_id UNINDEXED, search_name, tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON form_responses BEGIN
+        INSERT INTO {FTS_TABLE}(response_id, search_name) VALUES (new.id, new.search_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON form_responses BEGIN
+        DELETE FROM {FTS_TABLE} WHERE response_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_name ON form_responses
+    WHEN old.search_name IS NOT new.search_name BEGIN
+        DELETE FROM {FTS_TABLE} WHERE response_id = old.id;
+        INSERT INTO {FTS_TABLE}(response_id, search_name) VALUES (new.id, new.search_name);
+    END""",
+    f"INSERT INTO {FTS_TABLE}(response_id, search_name) SELECT id, search_name FROM form_responses",
+]
+
+SQLITE_DROP = [
+    *(f"DROP TRIGGER IF EXISTS {trigger}" for trigger in FTS_TRIGGERS),
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS form_responses_search_trgm ON form_responses USING gin (search_name gin_trgm_ops)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS form_responses_search_trgm",
+]
+
+
+def create_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    _fts_available.pop(schema_editor.connection.alias, None)
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_CREATE[0])
+        except OperationalError:
+            # SQLite built without FTS5/trigram: search falls back to LIKE on search_name
+            return
+        statements = SQLITE_CREATE[1:]
+    elif vendor == 'postgresql':
+        statements = POSTGRES_CREATE
+    else:
+        statements = []
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+    _fts_available.pop(schema_editor.connection.alias, None)
+
+
+def rebuild_search_index(connection):
+    """Drop and recreate the search index on ``connection`` with the current rows."""
+    with connection.schema_editor() as schema_editor:
+        drop_search_index(schema_editor)
+        create_search_index(schema_editor)
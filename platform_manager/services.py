@@ -0,0 +1,76 @@
+"""Write path of questionnaire submissions and officer assessments.
+
+A submission is a ``FormResponse`` and its ``BorderOfficerAssessment``; the
+response carries the assessment's score. The score is computed before anything
+is written, so each row is written once inside one transaction: new rows with a
+single INSERT, existing rows with an UPDATE of the fields that changed. SQLite
+allows one writer at a time, and this keeps the write lock short.
+"""
+from django.db import transaction
+
+# Fields of a response taken from its assessment (see FormResponse.apply_assessment_score)
+SCORE_FIELDS = ('total_score', 'threat_level', 'score_version')
+
+
+def changed_fields(form):
+    """Model fields of ``form.instance`` whose value the bound ``form`` changed."""
+    concrete = {field.name for field in form.instance._meta.concrete_fields}
+    return {name for name in form.changed_data if name in concrete}
+
+
+def _save(instance, update_fields):
+    if instance._state.adding:
+        instance.save()
+    else:
+        instance.save(update_fields=update_fields)
+
+
+def _assess(assessment_form, response, user):
+    """Unsaved assessment from ``assessment_form`` with its score, and its changed fields."""
+    assessment = assessment_form.save(commit=False)
+    assessment.form_response = response
+    update_fields = changed_fields(assessment_form) | set(SCORE_FIELDS)
+    if user is not None:
+        assessment.assessed_by = user
+        update_fields.add('assessed_by')
+    assessment.calculate_score()
+    return assessment, update_fields
+
+
+def submit_response(form, assessment_form, user):
+    """Create the response and assessment of validated wizard forms; returns the response."""
+    with transaction.atomic():
+        response = form.save(commit=False)
+        response.created_by = user
+        assessment, _ = _assess(assessment_form, response, user)
+        response.apply_assessment_score(assessment)
+        response.save()
+        # The response has its primary key now
+        assessment.form_response = response
+        assessment.save()
+    return response
+
+
+def update_response(form, assessment_form, user):
+    """Save an edited response and its (possibly new) assessment; returns the response.
+
+    ``user`` becomes the assessor of an assessment that has none yet.
+    """
+    with transaction.atomic():
+        response = form.save(commit=False)
+        assessor = user if not assessment_form.instance.assessed_by_id else None
+        assessment, assessment_fields = _assess(assessment_form, response, assessor)
+        response.apply_assessment_score(assessment)
+        _save(response, changed_fields(form) | set(SCORE_FIELDS))
+        _save(assessment, assessment_fields)
+    return response
+
+
+def save_assessment(response, assessment_form, user):
+    """Save the officer's assessment of ``response`` and copy its score to the response."""
+    with transaction.atomic():
+        assessment, update_fields = _assess(assessment_form, response, user)
+        _save(assessment, update_fields)
+        response.apply_assessment_score(assessment)
+        response.save(update_fields=SCORE_FIELDS)
+    return assessment
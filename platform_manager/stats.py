@@ -0,0 +1,209 @@
+"""Dashboard statistics for the responses list and the manager panel.
+
+Unless the list is filtered by name, the numbers are summed from the
+``DailyThreatStat`` rollup, so their cost depends on the number of days rather
+than the number of responses. Name searches fall back to a single
+``GROUP BY created_by`` query with conditional counts over the filtered
+responses. Results are cached for a short time (``RESPONSE_STATS_CACHE_TTL``)
+under a key built from the normalized filter parameters and the viewer's role.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import DailyThreatStat, FormResponse
+from .search import normalize_search_text
+
+THREAT_LEVELS = {
+    'low': 'Низкий',
+    'medium': 'Средний',
+    'high': 'Высокий',
+}
+
+# GET parameters that narrow the responses queryset.
+FILTER_PARAMS = ('search', 'date_from', 'date_to', 'created_by', 'threat_level', 'country')
+
+TOP_SUBMITTERS = 5
+
+
+def _cache_ttl():
+    return getattr(settings, 'RESPONSE_STATS_CACHE_TTL', 60)
+
+
+def normalize_filters(params):
+    """Return the filter parameters that affect the queryset, normalized."""
+    filters = {}
+    for name in FILTER_PARAMS:
+        value = (params.get(name) or '').strip()
+        if not value:
+            continue
+        if name == 'search':
+            value = normalize_search_text(value)
+        filters[name] = value
+    return filters
+
+
+def stats_cache_key(filters, role):
+    payload = json.dumps({'filters': filters, 'role': role}, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.md5(payload.encode('utf-8')).hexdigest()
+    return f'platform_manager:response_stats:{digest}'
+
+
+def _build_stats(rows, users):
+    """Turn per-submitter rows with ``count`` and per-level counts into the dashboard block."""
+    threat_stats = {key: sum(row[key] for row in rows) for key in THREAT_LEVELS}
+    submitters = [row for row in rows if row['created_by'] is not None]
+    submitters.sort(key=lambda row: row['count'], reverse=True)
+    top_submitters = []
+    for row in submitters[:TOP_SUBMITTERS]:
+        user = users(row)
+        top_submitters.append({
+            'created_by__first_name': user['first_name'],
+            'created_by__last_name': user['last_name'],
+            'created_by__username': user['username'],
+            'count': row['count'],
+        })
+    return {
+        'threat_stats': threat_stats,
+        'total_responses': sum(row['count'] for row in rows),
+        'top_submitters': top_submitters,
+    }
+
+
+def compute_response_stats(queryset):
+    """Aggregate the dashboard block for ``queryset`` in one query."""
+    aggregates = {
+        key: Count('pk', filter=Q(threat_level=level))
+        for key, level in THREAT_LEVELS.items()
+    }
+    rows = list(
+        queryset.order_by()
+        .values('created_by', 'created_by__first_name', 'created_by__last_name', 'created_by__username')
+        .annotate(count=Count('pk'), **aggregates)
+    )
+
+    return _build_stats(rows, lambda row: {
+        'first_name': row['created_by__first_name'],
+        'last_name': row['created_by__last_name'],
+        'username': row['created_by__username'],
+    })
+
+
+def compute_rollup_stats(filters, owner=None):
+    """Aggregate the dashboard block from the ``DailyThreatStat`` rollup.
+
+    ``filters`` are normalized list filters without ``search``; ``owner``
+    limits the numbers to one submitter.
+    """
+    stats = DailyThreatStat.objects.order_by()
+    if owner is not None:
+        stats = stats.filter(created_by=owner)
+    if filters.get('date_from'):
+        stats = stats.filter(day__gte=filters['date_from'])
+    if filters.get('date_to'):
+        stats = stats.filter(day__lte=filters['date_to'])
+    if filters.get('created_by'):
+        stats = stats.filter(created_by_id=filters['created_by'])
+    if filters.get('threat_level'):
+        stats = stats.filter(threat_level=filters['threat_level'])
+    if filters.get('country'):
+        stats = stats.filter(country=filters['country'])
+
+    aggregates = {
+        key: Sum('count', filter=Q(threat_level=level), default=0)
+        for key, level in THREAT_LEVELS.items()
+    }
+    rows = []
+    for row in stats.values('created_by').annotate(total=Sum('count'), **aggregates).filter(total__gt=0):
+        row['count'] = row.pop('total')
+        rows.append(row)
+
+    top_ids = [row['created_by'] for row in sorted(
+        (row for row in rows if row['created_by'] is not None), key=lambda row: row['count'], reverse=True
+    )[:TOP_SUBMITTERS]]
+    users = {
+        user['id']: user
+        for user in get_user_model().objects.filter(pk__in=top_ids).values('id', 'first_name', 'last_name', 'username')
+    }
+    missing = {'first_name': '', 'last_name': '', 'username': ''}
+    return _build_stats(rows, lambda row: users.get(row['created_by'], missing))
+
+
+def get_response_stats(queryset, params, role, owner=None):
+    """Return cached dashboard statistics for a filtered responses queryset.
+
+    ``role`` must identify everything that scopes ``queryset`` besides the
+    filter parameters (e.g. ``'manager'`` or ``'submitter:<user id>'``); for
+    submitters ``owner`` is the user whose responses are counted.
+    """
+    filters = normalize_filters(params)
+    key = stats_cache_key(filters, role)
+    stats = cache.get(key)
+    if stats is None:
+        if filters.get('search'):
+            stats = compute_response_stats(queryset)
+        else:
+            stats = compute_rollup_stats(filters, owner=owner)
+        cache.set(key, stats, _cache_ttl())
+    return stats
+
+
+def get_dashboard_summary(days=14):
+    """Threat distribution overall, per day for the last ``days`` days and top countries."""
+    totals = dict(
+        DailyThreatStat.objects.order_by().values_list('threat_level').annotate(total=Sum('count'))
+    )
+    threat_stats = {key: totals.get(level, 0) for key, level in THREAT_LEVELS.items()}
+
+    today = timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+    per_day = {}
+    recent = (
+        DailyThreatStat.objects.order_by()
+        .filter(day__gte=first_day, day__lte=today)
+        .values_list('day', 'threat_level')
+        .annotate(total=Sum('count'))
+    )
+    for day, threat_level, total in recent:
+        per_day.setdefault(day, {})[threat_level] = total
+    daily_stats = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        counts = per_day.get(day, {})
+        row = {key: counts.get(level, 0) for key, level in THREAT_LEVELS.items()}
+        row['day'] = day
+        row['total'] = sum(counts.values())
+        daily_stats.append(row)
+
+    top_countries = list(
+        DailyThreatStat.objects.order_by().exclude(country='')
+        .values('country').annotate(total=Sum('count'))
+        .filter(total__gt=0).order_by('-total')[:5]
+    )
+    return {
+        'threat_stats': threat_stats,
+        'total_responses': sum(totals.values()),
+        'daily_stats': daily_stats,
+        'top_countries': top_countries,
+    }
+
+
+def get_submitter_choices():
+    """Return users that created at least one response (creator filter options)."""
+    key = 'platform_manager:response_submitters'
+    users = cache.get(key)
+    if users is None:
+        User = get_user_model()
+        users = list(
+            User.objects.filter(pk__in=FormResponse.objects.order_by().values('created_by'))
+            .only('id', 'first_name', 'last_name', 'username')
+            .order_by('first_name', 'last_name')
+        )
+        cache.set(key, users, _cache_ttl())
+    return users
@@ -0,0 +1,70 @@
+"""Content-addressed media storage.
+
+Files are stored under the SHA-256 of their content instead of the name the
+upload field generates, in directories sharded by the first bytes of the hash
+(``blobs/3f/a2/3fa2....jpg``). Saving content that is already stored returns the
+existing name without writing anything, so a photo re-attached when a response
+is edited is stored once. ``platform_manager.blobs`` counts the model fields
+referring to each blob and deletes blobs nobody refers to anymore.
+
+The mixin works on top of any storage; ``ContentAddressedFileSystemStorage`` and
+``ContentAddressedMinioStorage`` are the ones configured in ``STORAGES``.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from minio_storage.storage import MinioMediaStorage
+
+BLOB_ROOT = 'blobs'
+
+# Files under these roots are derived from blobs or records and keep the name they are saved with
+DERIVED_ROOTS = ('renditions/', 'exports/')
+
+
+def content_digest(content):
+    """SHA-256 hex digest of a Django ``File``, read chunk by chunk."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(digest, ext):
+    return f'{BLOB_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_ROOT + '/')
+
+
+class ContentAddressedStorageMixin:
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if name.startswith(DERIVED_ROOTS):
+            return super().save(name, content, max_length=max_length)
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        ext = os.path.splitext(name)[1].lower()
+        blob = blob_name(content_digest(content), ext)
+        # Reference the blob first so a concurrent release can't delete the file we find
+        from .blobs import pin
+        pin(blob, self)
+        if self.exists(blob):
+            return blob
+        saved = super().save(blob, content, max_length=max_length)
+        if saved != blob:
+            # A concurrent upload of the same content was stored first
+            self.delete(saved)
+        return blob
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedStorageMixin, FileSystemStorage):
+    pass
+
+
+class ContentAddressedMinioStorage(ContentAddressedStorageMixin, MinioMediaStorage):
+    pass
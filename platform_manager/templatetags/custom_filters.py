@@ -1,5 +1,7 @@
 from django import template
 
+from platform_manager.renditions import rendition_url
+
 register = template.Library()
 
 @register.filter
@@ -24,3 +26,8 @@ def get_country_name(value):
         parts = value.split('|')
         return parts[0] if len(parts) > 0 else value
     return value
+
+@register.filter
+def rendition(fieldfile, size):
+    """URL of a downscaled photo ('thumb' or 'export'); the original for non-images"""
+    return rendition_url(fieldfile, size)
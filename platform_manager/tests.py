@@ -1,3 +1,1420 @@
-from django.test import TestCase
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from itertools import chain, combinations
+from unittest import mock, skipUnless
+from datetime import timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.templatetags import admin_list
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from docx import Document
+from PIL import ExifTags, Image
+
+from . import benchmarks, drafts, export_cache, exports, profiling, renditions, rollups, scoring, search, services, uploads, urls
+from .forms import BorderOfficerAssessmentForm, FormResponseForm
+from .listing import list_queryset, serialize_row
+from .models import (
+    BorderOfficerAssessment, DailyThreatStat, EventLog, FormDraft, FormResponse, IngestedUpload, MediaBlob, User,
+)
+from .pagination import InvalidCursor, KeysetPaginator, encode_cursor
+
+
+def use_temporary_media(test):
+    """Store the files ``test`` writes (exports, renditions) in a directory removed afterwards."""
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root)
+    override = override_settings(MEDIA_ROOT=media_root)
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+def use_temporary_staging(test):
+    """Stage the wizard uploads of ``test`` in a directory removed afterwards."""
+    staging_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, staging_root)
+    override = override_settings(WIZARD_UPLOAD_STAGING_ROOT=staging_root)
+    override.enable()
+    test.addCleanup(override.disable)
+    # The staging storage is created once per process
+    uploads.get_staging_storage.cache_clear()
+    test.addCleanup(uploads.get_staging_storage.cache_clear)
+
+
+class ListRowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_superuser(
+            email='manager@example.com', phone='+77010000001', username='manager', password='secret',
+        )
+        cls.submitter = User.objects.create_user(
+            email='officer@example.com', phone='+77010000002', username='officer',
+            first_name='Айгерим', last_name='Садыкова',
+        )
+
+    def create_responses(self, count, **fields):
+        for index in range(count):
+            FormResponse.objects.create(
+                last_name=f'Иванов{index}', first_name='Пётр', birth_place='Россия|ru',
+                created_by=self.submitter, threat_level='Средний', total_score=15, **fields,
+            )
+
+    def test_serialize_row(self):
+        response = FormResponse.objects.create(
+            last_name='Иванов', first_name='Пётр', patronymic='Сергеевич', birth_place='Турция|TR',
+            created_by=self.submitter, threat_level='Высокий', total_score=80,
+        )
+        row = serialize_row(list_queryset(FormResponse.objects.all()).get())
+        self.assertEqual(row['id'], response.pk)
+        self.assertEqual(row['full_name'], 'Иванов Пётр Сергеевич')
+        self.assertEqual((row['country_name'], row['country_code']), ('Турция', 'tr'))
+        self.assertEqual((row['threat_level'], row['total_score']), ('Высокий', 80))
+        self.assertEqual(row['created_by_name'], 'Айгерим Садыкова')
+        self.assertEqual(row['created_at'], response.created_at)
+
+    def test_serialize_row_fallbacks(self):
+        FormResponse.objects.create(full_name_and_birth='Иванов Пётр, 01.01.1990, ' + 'x' * 60, birth_place='Атырау')
+        row = serialize_row(list_queryset(FormResponse.objects.all()).get())
+        self.assertEqual(len(row['full_name']), 50)
+        self.assertEqual((row['country_name'], row['country_code']), ('Атырау', ''))
+        self.assertEqual(row['created_by_name'], '')
+
+        self.submitter.first_name = self.submitter.last_name = ''
+        self.submitter.save()
+        FormResponse.objects.all().update(created_by=self.submitter)
+        row = serialize_row(list_queryset(FormResponse.objects.all()).get())
+        self.assertEqual(row['created_by_name'], 'officer')
+
+    def test_serializing_a_list_takes_one_query(self):
+        self.create_responses(10)
+        with self.assertNumQueries(1):
+            rows = [serialize_row(response) for response in list_queryset(FormResponse.objects.all())]
+        self.assertEqual(len(rows), 10)
+
+    def list_page_queries(self):
+        self.client.force_login(self.manager)
+        url = reverse('platform_manager:form_responses')
+        # Dashboard stats are cached for a minute; start from the same state each time
+        cache.clear()
+        self.client.get(url, {'threat_level': 'Средний'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'threat_level': 'Средний'})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), len(response.context['rows'])
+
+    def test_list_page_query_count_is_constant(self):
+        self.create_responses(1)
+        one_row = self.list_page_queries()
+        self.create_responses(20)
+        self.assertEqual(self.list_page_queries(), (one_row[0], 21))
+
+    def changelist_queries(self):
+        model_admin = admin.site._registry[FormResponse]
+        request = RequestFactory().get('/admin/platform_manager/formresponse/')
+        request.user = self.manager
+        with CaptureQueriesContext(connection) as queries:
+            changelist = model_admin.get_changelist_instance(request)
+            for obj in changelist.result_list:
+                model_admin.get_full_name(obj)
+                model_admin.get_country_display(obj)
+                model_admin.get_created_by(obj)
+        return len(queries), changelist.result_count
+
+    def test_changelist_query_count_is_constant(self):
+        self.create_responses(1)
+        one_row = self.changelist_queries()
+        self.create_responses(20)
+        self.assertEqual(self.changelist_queries(), (one_row[0], 21))
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_superuser(
+            email='manager@example.com', phone='+77010000001', username='manager', password='secret',
+        )
+        for index in range(7):
+            FormResponse.objects.create(last_name=f'Иванов{index}', created_by=cls.manager)
+        # Rows sharing a timestamp are ordered by primary key
+        FormResponse.objects.filter(last_name__in=['Иванов2', 'Иванов3', 'Иванов4']).update(
+            created_at=FormResponse.objects.get(last_name='Иванов2').created_at,
+        )
+        cls.expected = list(FormResponse.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def test_walks_forward_and_back(self):
+        paginator = KeysetPaginator(FormResponse.objects.all(), per_page=3)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([response.pk for page in pages for response in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual([response.pk for response in back], self.expected[3:6])
+        first = paginator.page(back.previous_cursor)
+        self.assertEqual([response.pk for response in first], self.expected[:3])
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(FormResponse.objects.all(), per_page=3)
+        for cursor in ('garbage', 'W10', encode_cursor(FormResponse.objects.first(), 'x')):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_list_and_api(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('platform_manager:form_responses_api'), {'limit': 5})
+        data = response.json()
+        self.assertEqual([row['id'] for row in data['results']], [str(pk) for pk in self.expected[:5]])
+        self.assertIsNone(data['previous'])
+        self.assertEqual(data['estimated_total'], 7)
+
+        data = self.client.get(
+            reverse('platform_manager:form_responses_api'), {'limit': 5, 'cursor': data['next']}
+        ).json()
+        self.assertEqual([row['id'] for row in data['results']], [str(pk) for pk in self.expected[5:]])
+        self.assertIsNone(data['next'])
+
+        response = self.client.get(reverse('platform_manager:form_responses'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(RESPONSES_LIST_PAGINATION='offset', RESPONSE_STATS_CACHE_TTL=60)
+    def test_offset_pages_count_current_rows(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('manager_panel'))
+        cache.clear()
+        with mock.patch('platform_manager.views.ResponsesListView.paginate_by', 5):
+            # The first request caches the statistics of the list
+            response = self.client.get(reverse('platform_manager:form_responses'))
+            self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+            for index in range(4):
+                FormResponse.objects.create(last_name=f'Петров{index}', created_by=self.manager)
+            response = self.client.get(reverse('platform_manager:form_responses'), {'page': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 3)
+        self.assertEqual(response.context['total_count'], 11)
+
+
+class QueryBudgetTests(TestCase):
+    """Every panel page and admin changelist stays within its query budget.
+
+    Each page is requested by every role with a cold cache, once over a few
+    responses and again after more are added: the number of queries must stay
+    within the view's budget and must not change with the number of rows.
+    Admin changelists are built and their rows formatted the way the changelist
+    template does, for the roles allowed to see them.
+    """
+    # Most queries one request of the view may run, for any role
+    BUDGETS = {
+        'manager_panel': 6,
+        'platform_manager:form_submit': 3,
+        'platform_manager:form_submitted': 3,
+        'platform_manager:form_responses': 7,
+        'platform_manager:export_responses_bulk': 4,
+        'platform_manager:form_responses_api': 6,
+        'platform_manager:form_response_detail': 4,
+        # Opening the edit wizard copies the response into a new draft
+        'platform_manager:form_response_edit': 18,
+        'platform_manager:form_response_delete': 5,
+        'platform_manager:export_response_pdf': 4,
+        'platform_manager:export_response_docx': 4,
+        'platform_manager:officer_assessment': 5,
+        'platform_manager:logout': 4,
+        'admin:admin_logentry_changelist': 5,
+        'admin:auth_group_changelist': 3,
+        'admin:platform_manager_adminuser_changelist': 3,
+        'admin:platform_manager_eventlog_changelist': 3,
+        'admin:platform_manager_formresponse_changelist': 2,
+        'admin:platform_manager_ingestedupload_changelist': 3,
+        'admin:platform_manager_notificationtemplate_changelist': 3,
+        'admin:platform_manager_profile_changelist': 3,
+        'admin:platform_manager_user_changelist': 4,
+    }
+    ROLES = ('admin', 'manager', 'submitter')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            'admin': User.objects.create_superuser(
+                email='admin@example.com', phone='+77010000001', username='admin', password='secret',
+            ),
+            'manager': User.objects.create_user(
+                email='manager@example.com', phone='+77010000002', username='manager',
+            ),
+            'submitter': User.objects.create_user(
+                email='officer@example.com', phone='+77010000003', username='officer',
+            ),
+        }
+        cls.users['manager'].groups.add(Group.objects.create(name='manager'))
+        cls.users['submitter'].groups.add(Group.objects.create(name='submitter'))
+        cls.response = cls.create_responses(2)[0]
+
+    @classmethod
+    def create_responses(cls, count):
+        responses = []
+        for index in range(count):
+            response = FormResponse.objects.create(
+                last_name=f'Иванов{index}', first_name='Пётр', birth_place='Россия|ru',
+                created_by=cls.users['submitter' if index % 2 == 0 else 'manager'],
+            )
+            BorderOfficerAssessment.objects.create(
+                form_response=response, assessed_by=cls.users['manager'], radical_internet=index % 3 == 0,
+            )
+            EventLog.objects.create(event_type='PERF', user=cls.users['submitter'], payload={'index': index})
+            responses.append(response)
+        return responses
+
+    def setUp(self):
+        use_temporary_media(self)
+
+    def pages(self):
+        """``(view name, url)`` of every page of the app, logout last."""
+        pages = [('manager_panel', reverse('manager_panel'))]
+        for pattern in urls.urlpatterns:
+            name = f'{urls.app_name}:{pattern.name}'
+            args = [self.response.pk] if 'pk' in pattern.pattern.converters else []
+            pages.append((name, reverse(name, args=args)))
+        pages.sort(key=lambda page: page[0] == 'platform_manager:logout')
+        return pages
+
+    def page_queries(self, role):
+        client = Client()
+        client.force_login(self.users[role])
+        # The first page after login is redirected to the panel
+        client.get(reverse('manager_panel'))
+        for name, url in self.pages():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 500, f'{url} as {role}')
+            # The next request resets the query log the context reads from
+            yield name, queries.captured_queries
+
+    def changelist_queries(self, role):
+        for model, model_admin in admin.site._registry.items():
+            name = f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+            request = RequestFactory().get(reverse(name))
+            request.user = self.users[role]
+            if not model_admin.has_view_or_change_permission(request):
+                continue
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = model_admin.changelist_view(request)
+                list(admin_list.results(response.context_data['cl']))
+            yield name, queries.captured_queries
+
+    def all_queries(self):
+        """``{(role, view name): captured queries}`` of every page and changelist."""
+        result = {}
+        for role in self.ROLES:
+            for name, queries in [*self.page_queries(role), *self.changelist_queries(role)]:
+                result[role, name] = queries
+        return result
+
+    def assertWithinBudget(self, name, queries, msg):
+        self.assertIn(name, self.BUDGETS, f'{name} has no query budget')
+        budget = self.BUDGETS[name]
+        if len(queries) > budget:
+            sql = '\n'.join(f'{index}. {query["sql"]}' for index, query in enumerate(queries, 1))
+            self.fail(f'{msg}: {len(queries)} queries over the budget of {budget}:\n{sql}')
+
+    def test_query_budgets(self):
+        few = self.all_queries()
+        self.create_responses(20)
+        many = self.all_queries()
+        self.assertEqual(set(many), set(few))
+        for (role, name), queries in many.items():
+            with self.subTest(role=role, view=name):
+                self.assertWithinBudget(name, queries, f'{name} as {role}')
+                self.assertEqual(
+                    len(queries), len(few[role, name]), f'{name} as {role} runs more queries with more rows'
+                )
+
+
+class ExportCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_superuser(
+            email='manager@example.com', phone='+77010000001', username='manager', password='secret',
+        )
+        cls.response = FormResponse.objects.create(last_name='Иванов', first_name='Пётр', created_by=cls.manager)
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client.force_login(self.manager)
+        self.client.get(reverse('manager_panel'))
+
+    def stored(self):
+        try:
+            return default_storage.listdir(export_cache.export_directory(self.response.pk))[1]
+        except FileNotFoundError:
+            return []
+
+    def export(self):
+        response = self.client.get(reverse('platform_manager:export_response_pdf', args=[self.response.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        return b''.join(response.streaming_content)
+
+    def test_repeat_exports_are_served_from_storage(self):
+        content = self.export()
+        self.assertEqual(len(self.stored()), 1)
+        name = export_cache.export_name(self.response, 'pdf', 'ru')
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(b'cached'))
+        self.assertEqual(self.export(), b'cached')
+        self.assertTrue(content.startswith(b'%PDF'))
+
+    def test_changes_invalidate_exports(self):
+        self.export()
+        first = self.stored()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.response.first_name = 'Павел'
+            self.response.save(update_fields=['first_name'])
+        self.assertEqual(self.response.revision, 2)
+        self.assertEqual(self.stored(), [])
+
+        self.export()
+        with self.captureOnCommitCallbacks(execute=True):
+            BorderOfficerAssessment.objects.create(form_response=self.response, radical_internet=True)
+        self.assertEqual(self.stored(), [])
+        self.response.refresh_from_db()
+        self.export()
+        self.assertNotEqual(self.stored(), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.response.delete()
+        self.assertEqual(self.stored(), [])
+
+
+class BulkExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_superuser(
+            email='manager@example.com', phone='+77010000001', username='manager', password='secret',
+        )
+        cls.submitter = User.objects.create_user(email='officer@example.com', phone='+77010000002', username='officer')
+        cls.submitter.groups.add(Group.objects.create(name='submitter'))
+        cls.own = FormResponse.objects.create(last_name='Иванов', first_name='Пётр', created_by=cls.submitter)
+        cls.other = FormResponse.objects.create(last_name='Петров', first_name='Олег', created_by=cls.manager)
+        BorderOfficerAssessment.objects.create(form_response=cls.other, radical_internet=True)
+
+    def setUp(self):
+        use_temporary_media(self)
+
+    def export(self, user, status=200, **params):
+        client = Client()
+        client.force_login(user)
+        client.get(reverse('manager_panel'))
+        response = client.get(reverse('platform_manager:export_responses_bulk'), params)
+        self.assertEqual(response.status_code, status)
+        if response.streaming:
+            return response, b''.join(response.streaming_content)
+        return response, response.content
+
+    def archive(self, content):
+        archive = zipfile.ZipFile(BytesIO(content))
+        self.assertIsNone(archive.testzip())
+        return {name: archive.read(name) for name in archive.namelist()}
+
+    def test_merged_pdf(self):
+        response, content = self.export(self.manager, format='pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        # Each response starts on a new page
+        self.assertGreaterEqual(len(re.findall(rb'/Type /Page\b(?!s)', content)), 2)
+
+    def test_zip_of_pdf_files(self):
+        response, content = self.export(self.manager, format='zip', files='pdf')
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        members = self.archive(content)
+        self.assertEqual(sorted(members), sorted(f'{exports.export_basename(obj)}.pdf' for obj in (self.own, self.other)))
+        self.assertTrue(all(data.startswith(b'%PDF') for data in members.values()))
+
+    def test_zip_of_all_files_with_merged_pdf(self):
+        _, content = self.export(self.manager, format='both', files='all')
+        members = self.archive(content)
+        self.assertEqual(sorted(members), sorted([
+            'responses.pdf', *(f'{exports.export_basename(obj)}.{kind}' for obj in (self.own, self.other) for kind in ('pdf', 'docx')),
+        ]))
+        document = Document(BytesIO(members[f'{exports.export_basename(self.other)}.docx']))
+        text = [paragraph.text for paragraph in document.paragraphs]
+        text += [cell.text for table in document.tables for row in table.rows for cell in row.cells]
+        self.assertIn('Петров', '\n'.join(text))
+
+    def test_submitters_export_their_own_responses(self):
+        _, content = self.export(self.submitter, format='zip', files='docx')
+        self.assertEqual(list(self.archive(content)), [f'{exports.export_basename(self.own)}.docx'])
+
+    def test_rejected_exports(self):
+        self.export(self.manager, status=400, format='zip', search='Сидоров')
+        self.export(self.manager, status=400, format='xls')
+        self.export(self.manager, status=400, format='zip', files='xls')
+        with override_settings(BULK_EXPORT_MAX_RESPONSES=1):
+            self.export(self.manager, status=400, format='zip')
+        self.export(self.submitter, status=200, format='zip', search='Иванов')
+
+
+class WizardDraftTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.submitter = User.objects.create_user(
+            email='officer@example.com', phone='+77010000001', username='officer',
+        )
+        cls.submitter.groups.add(Group.objects.create(name='submitter'))
+
+    def setUp(self):
+        use_temporary_media(self)
+        use_temporary_staging(self)
+        self.client = self.login(self.submitter)
+
+    def login(self, user):
+        client = Client()
+        client.force_login(user)
+        client.get(reverse('manager_panel'))
+        return client
+
+    def photo(self, name='photo.jpg'):
+        output = BytesIO()
+        Image.new('RGB', (64, 48), 'red').save(output, 'JPEG')
+        return SimpleUploadedFile(name, output.getvalue(), content_type='image/jpeg')
+
+    def post_step(self, number, action='next', **data):
+        return self.client.post(
+            reverse('platform_manager:form_submit'), {'current_step': number, 'action': action, **data},
+        )
+
+    def staged(self):
+        return sorted(os.listdir(uploads.get_staging_storage().location))
+
+    def test_uploads_are_staged_and_promoted_on_submit(self):
+        self.post_step(1, last_name='Иванов', first_name='Пётр', person_photo=self.photo('first.jpg'))
+        draft = FormDraft.objects.get(user=self.submitter)
+        first = draft.get_data()[1]['person_photo']
+        self.assertEqual(self.client.session['form_draft_id'], str(draft.pk))
+        self.assertEqual((first['name'], first['content_type']), ('first.jpg', 'image/jpeg'))
+        self.assertEqual(self.staged(), [first['path']])
+
+        # Uploading again replaces the staged file of the field
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_step(1, last_name='Иванов', first_name='Пётр', person_photo=self.photo('second.jpg'))
+        second = draft.get_data()[1]['person_photo']
+        self.assertEqual(self.staged(), [second['path']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_step(22, 'submit')
+        self.assertRedirects(response, reverse('platform_manager:form_submitted'), fetch_redirect_response=False)
+        form_response = FormResponse.objects.get()
+        self.assertEqual(form_response.last_name, 'Иванов')
+        self.assertTrue(default_storage.exists(form_response.person_photo.name))
+        self.assertEqual(self.staged(), [])
+        self.assertFalse(FormDraft.objects.exists())
+
+    def test_purge_stale_uploads(self):
+        old, kept, fresh = (uploads.stage_upload(self.photo()) for _ in range(3))
+        storage = uploads.get_staging_storage()
+        for handle in (old, kept):
+            os.utime(storage.path(handle['path']), (time.time() - 2 * 60 * 60,) * 2)
+        self.assertEqual(uploads.purge_stale_uploads(max_age=60 * 60, keep={kept['path']}), 1)
+        self.assertEqual(self.staged(), sorted([kept['path'], fresh['path']]))
+
+    def test_draft_resumes_on_another_device(self):
+        self.post_step(1, last_name='Иванов', first_name='Пётр')
+        draft = FormDraft.objects.get()
+        url = reverse('platform_manager:form_submit')
+
+        other_device = self.login(self.submitter)
+        response = other_device.get(url, {'draft': draft.pk, 'step': 1})
+        self.assertContains(response, 'value="Иванов"')
+        self.assertEqual(other_device.session['form_draft_id'], str(draft.pk))
+
+        # Drafts of other users can't be resumed
+        stranger = User.objects.create_user(email='other@example.com', phone='+77010000002', username='other')
+        response = self.login(stranger).get(url, {'draft': draft.pk, 'step': 1})
+        self.assertNotContains(response, 'value="Иванов"')
+        self.assertEqual(FormDraft.objects.count(), 1)
+
+    def test_tabs_keep_their_own_drafts(self):
+        url = reverse('platform_manager:form_submit')
+        response = self.post_step(1, last_name='Иванов', first_name='Пётр')
+        first = FormDraft.objects.get()
+        self.assertEqual(response.url, f'{url}?step=2&draft={first.pk}')
+        response = self.client.get(response.url)
+        self.assertContains(response, f'action="?draft={first.pk}"')
+
+        # Another tab resumes a second draft, which the session now remembers
+        second = FormDraft.objects.create(user=self.submitter)
+        response = self.client.get(url, {'draft': second.pk})
+        self.assertContains(response, f'action="?draft={second.pk}"')
+        self.assertEqual(self.client.session['form_draft_id'], str(second.pk))
+
+        # Step posts of both tabs interleave, each to the draft in its form action
+        first_tab = f'{url}?draft={first.pk}'
+        second_tab = f'{url}?draft={second.pk}'
+        response = self.client.post(first_tab, {'current_step': 1, 'action': 'next', 'last_name': 'Иванов', 'first_name': 'Павел'})
+        self.assertEqual(response.url, f'{url}?step=2&draft={first.pk}')
+        self.client.post(second_tab, {'current_step': 1, 'action': 'next', 'last_name': 'Петров'})
+        response = self.client.post(
+            first_tab, {'current_step': 2, 'action': 'previous'}, headers={'X-Wizard-Fragment': '1'},
+        )
+        self.assertContains(response, f'action="?draft={first.pk}"')
+        self.assertContains(response, 'value="Павел"')
+
+        self.assertEqual(
+            [(draft.get_data()[0].get('last_name'), draft.get_data()[0].get('first_name')) for draft in (first, second)],
+            [('Иванов', 'Павел'), ('Петров', None)],
+        )
+
+    def test_edit_seeds_draft_with_current_answers(self):
+        form_response = FormResponse.objects.create(last_name='Иванов', first_name='Пётр', created_by=self.submitter)
+        BorderOfficerAssessment.objects.create(form_response=form_response, radical_internet=True)
+        url = reverse('platform_manager:form_response_edit', args=[form_response.pk])
+
+        self.client.get(url)
+        draft = FormDraft.objects.get(form_response=form_response)
+        seeded = draft.steps.get(step=0).data
+        self.assertEqual((seeded['last_name'], seeded['first_name']), ('Иванов', 'Пётр'))
+        self.assertIs(seeded['radical_internet'], True)
+
+        self.client.post(url, {'current_step': 1, 'action': 'next', 'last_name': 'Иванов', 'first_name': 'Павел'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'current_step': 22, 'action': 'submit'})
+        form_response.refresh_from_db()
+        self.assertEqual(form_response.first_name, 'Павел')
+        self.assertTrue(form_response.officer_assessment.radical_internet)
+        self.assertFalse(FormDraft.objects.exists())
+
+    def test_purge_expired_drafts(self):
+        expired = FormDraft.objects.create(user=self.submitter)
+        alive = FormDraft.objects.create(user=self.submitter)
+        for draft in (expired, alive):
+            drafts.save_step(draft, 1, {'last_name': 'Иванов'}, {'person_photo': uploads.stage_upload(self.photo())})
+        storage = uploads.get_staging_storage()
+        for path in self.staged():
+            os.utime(storage.path(path), (time.time() - 2 * 60 * 60,) * 2)
+        FormDraft.objects.filter(pk=expired.pk).update(updated_at=timezone.now() - timedelta(days=8))
+
+        call_command('purge_staged_uploads', max_age=60 * 60, stdout=StringIO())
+        self.assertEqual(list(FormDraft.objects.all()), [alive])
+        self.assertEqual(self.staged(), [alive.get_data()[1]['person_photo']['path']])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.kazakh = FormResponse.objects.create(last_name='ҚАСЫМОВ', first_name='Әлихан', patronymic='Ұланұлы')
+        cls.russian = FormResponse.objects.create(last_name='Ёлкин', first_name='Пётр')
+        FormResponse.objects.create(last_name='Иванов', first_name='Сергей')
+
+    def assertFinds(self, term, *expected):
+        found = search.search_responses(FormResponse.objects.all(), term)
+        self.assertEqual(set(found), set(expected), term)
+
+    def test_case_and_letter_folding(self):
+        # Terms of three letters and more use the index, shorter ones scan search_name
+        for term in ('қасымов', 'ҚасЫм', 'әлихан', 'ӘЛИХ', 'ұланұлы', 'Қа'):
+            self.assertFinds(term, self.kazakh)
+        for term in ('ЕЛКИН', 'ёлк', 'петр', 'Пётр', 'Ёл'):
+            self.assertFinds(term, self.russian)
+        self.assertFinds('Қасымова')
+        self.assertFinds('   ', *FormResponse.objects.all())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'The FTS5 index is SQLite only')
+class SearchIndexTests(TransactionTestCase):
+    def setUp(self):
+        # has_fts_index() remembers its answer per connection
+        search._fts_available.clear()
+        self.addCleanup(search._fts_available.clear)
+
+    def test_search_without_index_triggers(self):
+        self.assertTrue(search.has_fts_index(connection))
+        # What SQLite does to the triggers when a migration rebuilds the table
+        with connection.cursor() as cursor:
+            for trigger in search.FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {trigger}')
+        self.addCleanup(search.rebuild_search_index, connection)
+        search._fts_available.clear()
+        added = FormResponse.objects.create(last_name='Қайратов')
+
+        with self.assertLogs('platform_manager.search', 'WARNING'):
+            self.assertFalse(search.has_fts_index(connection))
+        self.assertEqual(list(search.search_responses(FormResponse.objects.all(), 'ҚАЙРАТ')), [added])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertTrue(search.has_fts_index(connection))
+        self.assertEqual(list(search.search_responses(FormResponse.objects.all(), 'ҚАЙРАТ')), [added])
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.submitters = [
+            User.objects.create_user(
+                email=f'officer{index}@example.com', phone=f'+7701000000{index}', username=f'officer{index}',
+            )
+            for index in range(2)
+        ]
+
+    def stats(self):
+        return sorted(DailyThreatStat.objects.values_list('day', 'country', 'created_by', 'threat_level', 'count'), key=str)
+
+    def assertMatchesRebuild(self):
+        incremental = self.stats()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.stats())
+
+    def test_signal_deltas_match_rebuild(self):
+        responses = [
+            FormResponse.objects.create(
+                last_name=f'Иванов{index}', birth_place=['Россия|ru', 'Турция|TR'][index % 2],
+                created_by=[*self.submitters, None][index % 3], threat_level='Низкий',
+            )
+            for index in range(9)
+        ]
+        self.assertMatchesRebuild()
+
+        responses[0].threat_level = 'Высокий'
+        responses[0].save()
+        responses[1].birth_place = 'Россия|ru'
+        responses[1].save(update_fields=['birth_place'])
+        # Saves that don't touch the bucket fields leave the rollup alone
+        responses[2].first_name = 'Пётр'
+        responses[2].save(update_fields=['first_name'])
+        self.assertMatchesRebuild()
+
+        for response in responses[3:6]:
+            response.delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(DailyThreatStat.objects.filter(count=0).exists())
+
+        # The deleted user's buckets join the no-submitter ones
+        self.submitters[0].delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(DailyThreatStat.objects.filter(created_by=None).count(), 2)
+
+    def test_single_bucket_without_submitter(self):
+        key = rollups.rollup_key(timezone.localdate(), 'Россия|ru', None, 'Низкий')
+        rollups.apply_delta(key, 1)
+        rollups.apply_delta(key, 2)
+        self.assertEqual(list(DailyThreatStat.objects.values_list('created_by', 'count')), [(None, 3)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyThreatStat.objects.create(day=key[0], country=key[1], threat_level=key[3], count=1)
+
+        rollups.apply_delta(key, -3)
+        self.assertFalse(DailyThreatStat.objects.exists())
+
+
+class RecalculateCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.responses = []
+        for index in range(7):
+            response = FormResponse.objects.create(last_name=f'Иванов{index}', criminal_record=index % 2 == 0, deported=index % 3 == 0)
+            if index % 3 == 1:
+                BorderOfficerAssessment.objects.create(form_response=response, radical_internet=True, relatives_mto=index == 4)
+            cls.responses.append(response)
+
+    def setUp(self):
+        # Stale scores on every row, as after a change of the rules
+        FormResponse.objects.update(total_score=-1, threat_level='')
+        BorderOfficerAssessment.objects.update(total_score=-1, threat_level='')
+
+    def rows(self):
+        return (
+            list(FormResponse.objects.order_by('pk').values_list('pk', 'total_score', 'threat_level', 'revision')),
+            list(BorderOfficerAssessment.objects.order_by('pk').values_list('pk', 'total_score', 'threat_level', 'revision')),
+        )
+
+    def recalculate(self, *args):
+        output = StringIO()
+        call_command('recalculate_threat_levels', *args, stdout=output)
+        return output.getvalue()
+
+    def assertScored(self):
+        for response in FormResponse.objects.select_related('officer_assessment'):
+            assessment = getattr(response, 'officer_assessment', None)
+            source = BorderOfficerAssessment() if assessment else FormResponse()
+            for name in scoring.score_fields('assessment' if assessment else 'response'):
+                setattr(source, name, getattr(assessment or response, name))
+            scoring.score(source, 'assessment' if assessment else 'response')
+            expected = (source.total_score, source.threat_level, 2)
+            if assessment is not None:
+                self.assertEqual((assessment.total_score, assessment.threat_level, assessment.revision), expected)
+            # Assessed responses take the assessment's score, not the questionnaire's
+            self.assertEqual((response.total_score, response.threat_level, response.revision), expected)
+
+    def test_dry_run_writes_nothing(self):
+        before = self.rows()
+        output = self.recalculate('--dry-run')
+        self.assertEqual(self.rows(), before)
+        self.assertIn('Dry run: 7 responses and 2 assessments would change', output)
+        self.assertIn(f'FormResponse {self.responses[0].pk}: ', output)
+
+        output = self.recalculate('--dry-run', '--in-database')
+        self.assertEqual(self.rows(), before)
+        self.assertIn('Dry run: 7 responses and 2 assessments would change', output)
+
+    def test_batches(self):
+        # Batches of 3 end in the middle of the rows and leave a partial one
+        output = self.recalculate('--batch-size', '3')
+        self.assertIn('Updated 7 responses and 2 assessments', output)
+        self.assertEqual([line.strip() for line in output.splitlines() if 'processed' in line], [
+            '3/7 processed, 3 responses changed', '6/7 processed, 6 responses changed', '7/7 processed, 7 responses changed',
+        ])
+        self.assertScored()
+        # Nothing is left to change, so nothing gets a new revision
+        self.assertIn('Updated 0 responses and 0 assessments', self.recalculate())
+        self.assertScored()
+
+    def test_key_ranges_match_a_single_pass(self):
+        from .management.commands.recalculate_threat_levels import recalculate_range, split_pk_ranges
+
+        ranges = split_pk_ranges(8)
+        self.assertEqual(ranges[0][0].int, 0)
+        self.assertIsNone(ranges[-1][1])
+        self.assertEqual([high for _, high in ranges[:-1]], [low for low, _ in ranges[1:]])
+
+        single = recalculate_range(dry_run=True, collect_diff=True)
+        results = [recalculate_range(low, high, batch_size=2, collect_diff=True) for low, high in ranges]
+        self.assertEqual(sum(result['processed'] for result in results), single['processed'])
+        self.assertEqual(sorted(line for result in results for line in result['diff']), sorted(single['diff']))
+        self.assertScored()
+
+
+class ScoringTests(TestCase):
+    """``rescore()`` and ``count_rescore_changes()`` in SQL agree with ``score()`` in Python."""
+    # Answer combinations scoring exactly on and next to both thresholds
+    EDGE_VERSION = 99
+    EDGE_RULES = {
+        'thresholds': ((30, scoring.LEVEL_HIGH), (10, scoring.LEVEL_MEDIUM)),
+        'weights': {
+            'assessment': {'radical_internet': 10, 'document_issues': 20, 'violence_traces': 1},
+            'response': {'criminal_record': 9, 'deported': 1, 'religious': 20},
+        },
+    }
+
+    def create(self, answers, assessment_answers=None):
+        response = FormResponse.objects.create(last_name='Иванов', **dict.fromkeys(answers, True))
+        if assessment_answers is not None:
+            BorderOfficerAssessment.objects.create(form_response=response, **dict.fromkeys(assessment_answers, True))
+
+    def create_all_combinations(self, version):
+        def subsets(fields):
+            return chain.from_iterable(combinations(fields, size) for size in range(len(fields) + 1))
+
+        response_fields = scoring.score_fields('response', version)
+        for answers in subsets(response_fields):
+            self.create(answers)
+        for answers in subsets(scoring.score_fields('assessment', version)):
+            # The assessment's score wins over the questionnaire's
+            self.create(response_fields, answers)
+
+    def assertRescoreMatchesPython(self, version):
+        # Start from wrong scores so every row has to change
+        FormResponse.objects.update(total_score=-1, threat_level='')
+        BorderOfficerAssessment.objects.update(total_score=-1, threat_level='')
+        self.assertEqual(
+            scoring.count_rescore_changes(version),
+            (BorderOfficerAssessment.objects.count(), FormResponse.objects.count()),
+        )
+        scoring.rescore(version)
+
+        levels = set()
+        for response in FormResponse.objects.select_related('officer_assessment'):
+            assessment = getattr(response, 'officer_assessment', None)
+            stored = [(response.total_score, response.threat_level, response.score_version)]
+            if assessment is not None:
+                stored.append((assessment.total_score, assessment.threat_level, assessment.score_version))
+            source = assessment or response
+            scoring.score(source, 'assessment' if assessment else 'response', version)
+            expected = (source.total_score, source.threat_level, version)
+            self.assertEqual(stored, [expected] * len(stored))
+            levels.add(expected[1])
+        self.assertEqual(levels, {scoring.LEVEL_LOW, scoring.LEVEL_MEDIUM, scoring.LEVEL_HIGH})
+        self.assertEqual(scoring.count_rescore_changes(version), (0, 0))
+
+    def test_threshold_edges(self):
+        with mock.patch.dict(scoring.RULESETS, {self.EDGE_VERSION: self.EDGE_RULES}):
+            self.create_all_combinations(self.EDGE_VERSION)
+            self.assertRescoreMatchesPython(self.EDGE_VERSION)
+        self.assertLessEqual({9, 10, 29, 30}, set(FormResponse.objects.values_list('total_score', flat=True)))
+
+    def test_current_rules(self):
+        version = scoring.current_version()
+        self.create(())
+        self.create(('detained_abroad', 'deported', 'visited_countries', 'criminal_record'))
+        self.create(('detained_abroad', 'deported', 'visited_countries', 'religious'))
+        for answers in [(), ('relatives_mto',), ('radical_internet',), ('radical_internet', 'relatives_mto')]:
+            self.create((), answers)
+        self.assertRescoreMatchesPython(version)
+
+    def test_rescore_writes_only_changed_rows(self):
+        version = scoring.current_version()
+        self.create(('criminal_record',))
+        self.create(('deported',), ('radical_internet',))
+        self.create(('religious',))
+        self.assertEqual(scoring.rescore(version), (1, 3))
+
+        def rows():
+            return (
+                list(FormResponse.objects.order_by('pk').values_list('pk', 'revision', 'updated_at')),
+                list(BorderOfficerAssessment.objects.values_list('pk', 'revision', 'updated_at')),
+            )
+
+        before = rows()
+        self.assertEqual(scoring.rescore(version), (0, 0))
+        self.assertEqual(rows(), before)
+
+        # Only the stale rows get a new revision
+        BorderOfficerAssessment.objects.update(total_score=-1)
+        self.assertEqual(scoring.rescore(version), (1, 0))
+        stale = FormResponse.objects.get(criminal_record=True)
+        FormResponse.objects.filter(pk=stale.pk).update(threat_level='')
+        self.assertEqual(scoring.rescore(version), (0, 1))
+        responses, assessments = rows()
+        self.assertEqual(
+            [revision for _, revision, _ in responses],
+            [revision + (pk == stale.pk) for pk, revision, _ in before[0]],
+        )
+        self.assertEqual([revision for _, revision, _ in assessments], [before[1][0][1] + 1])
+
+
+class RoleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='manager')
+        cls.manager = User.objects.create_user(email='manager@example.com', phone='+77010000001', username='manager')
+        cls.manager.groups.add(cls.group)
+        cls.response = FormResponse.objects.create(last_name='Иванов')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager)
+        self.client.get(reverse('manager_panel'))
+
+    def assertAssessmentAllowed(self, allowed):
+        response = self.client.get(reverse('platform_manager:officer_assessment', args=[self.response.pk]))
+        if allowed:
+            self.assertEqual(response.status_code, 200)
+        else:
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('?next=', response.url)
+
+    def test_removing_the_group_revokes_access(self):
+        self.assertAssessmentAllowed(True)
+        # Removed without signals, like a change made by another worker process
+        User.groups.through.objects.filter(user=self.manager).delete()
+        self.assertAssessmentAllowed(False)
+
+    @override_settings(USER_ROLES_CACHE_TTL=300)
+    def test_group_changes_invalidate_cached_roles(self):
+        self.assertAssessmentAllowed(True)
+        self.manager.groups.remove(self.group)
+        self.assertAssessmentAllowed(False)
+        self.group.user_set.add(self.manager)
+        self.assertAssessmentAllowed(True)
+
+
+class RenditionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_superuser(
+            email='manager@example.com', phone='+77010000001', username='manager', password='secret',
+        )
+
+    def setUp(self):
+        use_temporary_media(self)
+        cache.clear()
+
+    def test_renditions_are_rendered_after_commit(self):
+        output = BytesIO()
+        Image.new('RGB', (2000, 1000), 'red').save(output, 'JPEG')
+        response = FormResponse(last_name='Иванов', created_by=self.manager)
+        response.person_photo.save('photo.jpg', ContentFile(output.getvalue()), save=False)
+        names = [renditions.rendition_name(response.person_photo.name, size) for size in renditions.RENDITIONS]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response.save()
+            self.assertFalse(any(default_storage.exists(name) for name in names))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+
+        # The detail page shows the thumbnail and links the original
+        self.client.force_login(self.manager)
+        self.client.get(reverse('manager_panel'))
+        page = self.client.get(reverse('platform_manager:form_response_detail', args=[response.pk]))
+        self.assertContains(page, f'href="{response.person_photo.url}"')
+        thumb = renditions.rendition_name(response.person_photo.name, 'thumb')
+        self.assertContains(page, f'src="{default_storage.url(thumb)}"')
+
+    # Like remote storages such as MinIO, it has no filesystem paths
+    @override_settings(STORAGES={**settings.STORAGES, 'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+    def test_exports_embed_renditions_without_local_paths(self):
+        output = BytesIO()
+        Image.new('RGB', (2000, 1000), 'red').save(output, 'JPEG')
+        response = FormResponse(last_name='Иванов', created_by=self.manager)
+        response.person_photo.save('photo.jpg', ContentFile(output.getvalue()))
+        response = FormResponse.objects.select_related('officer_assessment', 'created_by').get(pk=response.pk)
+
+        document = Document(exports.render_response_docx_file(response))
+        pdf = exports.render_response_pdf_file(response).read()
+        self.assertEqual(len(document.inline_shapes), 1)
+        self.assertEqual(round(document.inline_shapes[0].width.cm), 15)
+        self.assertIn(b'/Subtype /Image', pdf)
+
+
+class IngestTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        cache.clear()
+
+    def jpeg(self, size=(64, 48), exif=None):
+        output = BytesIO()
+        Image.new('RGB', size, 'red').save(output, 'JPEG', **({'exif': exif} if exif is not None else {}))
+        return output.getvalue()
+
+    def store(self, content, name='photo.jpg'):
+        # As a form assigns an upload; FieldFile.save() would store it before the model is saved
+        response = FormResponse(last_name='Иванов', person_photo=SimpleUploadedFile(name, content))
+        response.save()
+        return response
+
+    def stored_image(self, response):
+        with default_storage.open(response.person_photo.name, 'rb') as file:
+            image = Image.open(BytesIO(file.read()))
+            image.load()
+        return image
+
+    def test_metadata_is_stripped_and_orientation_applied(self):
+        exif = Image.Exif()
+        # Camera held upright: the sensor image is stored sideways with a rotation tag
+        exif[ExifTags.Base.Orientation] = 6
+        exif[ExifTags.Base.Make] = 'Tablet'
+        exif.get_ifd(ExifTags.IFD.GPSInfo).update({
+            ExifTags.GPS.GPSLatitudeRef: 'N', ExifTags.GPS.GPSLatitude: (43.0, 15.0, 0.0),
+        })
+        original = self.jpeg((200, 100), exif.tobytes())
+        self.assertIn(ExifTags.IFD.GPSInfo, Image.open(BytesIO(original)).getexif())
+
+        image = self.stored_image(self.store(original))
+        self.assertEqual(image.size, (100, 200))
+        self.assertEqual(dict(image.getexif()), {})
+        self.assertNotIn('exif', image.info)
+
+    @override_settings(UPLOAD_IMAGE_MAX_SIDE=1000)
+    def test_large_images_are_downscaled(self):
+        self.assertEqual(self.stored_image(self.store(self.jpeg((3000, 1500)))).size, (1000, 500))
+        # Small images keep their size
+        self.assertEqual(self.stored_image(self.store(self.jpeg((64, 48)))).size, (64, 48))
+
+    def test_other_files_are_stored_unchanged(self):
+        for name, content in [('scan.pdf', b'%PDF-1.4 not an image'), ('broken.jpg', self.jpeg((640, 480))[:300])]:
+            with self.subTest(name=name):
+                response = self.store(content, name)
+                self.assertTrue(response.person_photo.name.endswith(os.path.splitext(name)[1]))
+                with default_storage.open(response.person_photo.name, 'rb') as file:
+                    self.assertEqual(file.read(), content)
+                upload = IngestedUpload.objects.get(name=response.person_photo.name)
+                self.assertEqual((upload.original_size, upload.size, upload.normalized), (len(content), len(content), False))
+
+    def test_sizes_are_recorded_once(self):
+        original = self.jpeg((1200, 900))
+        response = self.store(original, 'camera.png')
+        name = response.person_photo.name
+        self.assertTrue(name.endswith('.jpg'))
+        upload = IngestedUpload.objects.get()
+        self.assertEqual(
+            (upload.name, upload.field, upload.original_name, upload.original_size, upload.size, upload.normalized),
+            (name, 'FormResponse.person_photo', 'camera.png', len(original), default_storage.size(name), True),
+        )
+
+        # Stored files aren't decoded and re-encoded again on later saves
+        with mock.patch('platform_manager.ingest.normalize_image') as normalize:
+            response.first_name = 'Пётр'
+            response.save()
+            FormResponse.objects.get(pk=response.pk).save()
+        normalize.assert_not_called()
+        self.assertEqual(IngestedUpload.objects.count(), 1)
+        self.assertEqual(FormResponse.objects.get(pk=response.pk).person_photo.name, name)
+
+
+class MediaBlobTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+
+    def save_photo(self):
+        return default_storage.save('photo.jpg', ContentFile(b'photo'))
+
+    def ref_count(self, name):
+        return MediaBlob.objects.filter(name=name).values_list('ref_count', flat=True).first()
+
+    def test_stored_content_is_referenced_until_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            name = self.save_photo()
+            response = FormResponse.objects.create(last_name='Иванов', person_photo=name)
+            self.assertEqual(self.ref_count(name), 2)
+        self.assertEqual(self.ref_count(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        # Content stored but never attached goes after the commit
+        with self.captureOnCommitCallbacks(execute=True):
+            orphan = default_storage.save('other.jpg', ContentFile(b'other'))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertIsNone(self.ref_count(orphan))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertIsNone(self.ref_count(name))
+
+    def test_content_stored_again_while_the_last_reference_goes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            name = self.save_photo()
+            first = FormResponse.objects.create(last_name='Иванов', person_photo=name)
+        with self.captureOnCommitCallbacks() as release:
+            first.delete()
+
+        # Another upload of the same content finds the file before the release commits
+        self.assertEqual(self.save_photo(), name)
+        for callback in release:
+            callback()
+        self.assertTrue(default_storage.exists(name))
+        FormResponse.objects.create(last_name='Петров', person_photo=name)
+        self.assertEqual(self.ref_count(name), 2)
+
+
+class MediaAccessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.other, cls.manager = [
+            User.objects.create_user(email=f'{username}@example.com', phone=f'+7701000000{index}', username=username)
+            for index, username in enumerate(('owner', 'other', 'manager'))
+        ]
+        cls.owner.groups.add(Group.objects.create(name='submitter'))
+        cls.other.groups.add(Group.objects.get(name='submitter'))
+        cls.manager.groups.add(Group.objects.create(name='manager'))
+
+    def setUp(self):
+        use_temporary_media(self)
+        cache.clear()
+        output = BytesIO()
+        Image.new('RGB', (64, 48), 'red').save(output, 'JPEG')
+        self.response = FormResponse(last_name='Иванов', created_by=self.owner)
+        self.response.person_photo.save('photo.jpg', ContentFile(output.getvalue()))
+        self.names = {
+            'photo': self.response.person_photo.name,
+            'rendition': renditions.get_rendition(self.response.person_photo, 'thumb'),
+            'export': default_storage.save(f'{export_cache.export_directory(self.response.pk)}/1-0.ru.pdf', ContentFile(b'%PDF')),
+        }
+
+    def fetch(self, user, name):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+            client.get(reverse('manager_panel'))
+        return client.get(default_storage.url(name))
+
+    def test_access(self):
+        allowed = {self.owner: True, self.other: False, self.manager: True}
+        for kind, name in self.names.items():
+            for user, expected in allowed.items():
+                with self.subTest(kind=kind, user=user.username):
+                    response = self.fetch(user, name)
+                    self.assertEqual(response.status_code, 200 if expected else 404)
+            with self.subTest(kind=kind, user='anonymous'):
+                response = self.fetch(None, name)
+                self.assertEqual(response.status_code, 302)
+                self.assertIn('?next=', response.url)
+
+        # Unrelated names are refused without a lookup error
+        self.assertEqual(self.fetch(self.owner, 'exports/not-a-uuid/1-0.ru.pdf').status_code, 404)
+        self.assertEqual(self.fetch(self.owner, 'blobs/00/00/missing.jpg').status_code, 404)
+
+    @override_settings(PROTECTED_MEDIA_SERVER='nginx', PROTECTED_MEDIA_INTERNAL_URL='/protected-media/')
+    def test_nginx_handoff(self):
+        name = self.names['photo']
+        response = self.fetch(self.owner, name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{name}')
+        self.assertEqual(response.content, b'')
+
+        # The file is checked before the proxy is asked to send it
+        default_storage.delete(name)
+        self.assertEqual(self.fetch(self.manager, name).status_code, 404)
+
+
+def bound_form(form_class, instance=None, **changes):
+    """``form_class`` bound to the current values of ``instance`` with ``changes`` applied."""
+    initial = form_class(instance=instance)
+    data = {field.name: field.value() for field in initial if field.value() is not None}
+    data.update(changes)
+    form = form_class(data, instance=instance)
+    assert form.is_valid(), form.errors
+    return form
+
+
+class ServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='officer@example.com', phone='+77010000001', username='officer')
+
+    def submit(self, **changes):
+        return services.submit_response(
+            bound_form(FormResponseForm, last_name='Иванов'),
+            bound_form(BorderOfficerAssessmentForm, **changes),
+            self.user,
+        )
+
+    def test_submit_writes_each_row_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.submit(radical_internet=True)
+        tables = {f'"{model._meta.db_table}"' for model in (FormResponse, BorderOfficerAssessment)}
+        # Statements look like INSERT INTO "table" ... or UPDATE "table" SET ...
+        writes = [words[0] for words in (query['sql'].split()[:3] for query in queries) if tables & set(words)]
+        self.assertEqual(writes, ['INSERT', 'INSERT'])
+
+        response.refresh_from_db()
+        assessment = response.officer_assessment
+        self.assertEqual((response.created_by, assessment.assessed_by), (self.user, self.user))
+        self.assertEqual((response.revision, assessment.revision), (1, 1))
+        self.assertEqual(response.total_score, assessment.total_score)
+        self.assertGreater(response.total_score, 0)
+
+    def test_update_saves_changed_and_score_fields(self):
+        response = self.submit()
+        assessment = response.officer_assessment
+        form = bound_form(FormResponseForm, response, first_name='Пётр')
+        assessment_form = bound_form(BorderOfficerAssessmentForm, assessment, radical_internet=True)
+
+        with mock.patch.object(FormResponse, 'save', autospec=True, side_effect=FormResponse.save) as response_save, \
+                mock.patch.object(BorderOfficerAssessment, 'save', autospec=True, side_effect=BorderOfficerAssessment.save) as assessment_save:
+            services.update_response(form, assessment_form, self.user)
+        self.assertEqual(set(response_save.call_args.kwargs['update_fields']), {'first_name', *services.SCORE_FIELDS})
+        # The assessor is kept, so only the answer and the score are written
+        self.assertEqual(set(assessment_save.call_args.kwargs['update_fields']), {'radical_internet', *services.SCORE_FIELDS})
+
+        response.refresh_from_db()
+        assessment.refresh_from_db()
+        self.assertEqual((response.first_name, response.revision), ('Пётр', 2))
+        self.assertEqual((assessment.radical_internet, assessment.revision), (True, 2))
+        self.assertEqual(response.total_score, assessment.total_score)
+        self.assertGreater(response.total_score, 0)
+
+    def test_save_assessment_bumps_revisions(self):
+        response = self.submit()
+        assessment = response.officer_assessment
+        services.save_assessment(response, bound_form(BorderOfficerAssessmentForm, assessment, radical_internet=True), self.user)
+        response.refresh_from_db()
+        assessment.refresh_from_db()
+        self.assertEqual((response.revision, assessment.revision), (2, 2))
+        self.assertEqual(response.total_score, assessment.total_score)
+
+    def test_failed_assessment_rolls_back_response(self):
+        with mock.patch.object(BorderOfficerAssessment, 'save', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.submit()
+        self.assertFalse(FormResponse.objects.exists())
+
+        response = self.submit()
+        form = bound_form(FormResponseForm, response, first_name='Пётр')
+        assessment_form = bound_form(BorderOfficerAssessmentForm, response.officer_assessment, radical_internet=True)
+        with mock.patch.object(BorderOfficerAssessment, 'save', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                services.update_response(form, assessment_form, self.user)
+        response.refresh_from_db()
+        self.assertEqual((response.first_name, response.revision, response.total_score), ('', 1, 0))
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='user@example.com', phone='+77010000001', username='user')
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+77010000002', username='admin', password='x')
+
+    def fetch(self, user=None, address='127.0.0.1'):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        return client.get('/metrics', REMOTE_ADDR=address)
+
+    def test_local_requests_need_a_superuser(self):
+        # A request through a local reverse proxy comes from 127.0.0.1
+        self.assertEqual(self.fetch().status_code, 404)
+        self.assertEqual(self.fetch(self.user).status_code, 404)
+        self.assertEqual(self.fetch(self.admin).status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_allowed_addresses(self):
+        self.assertEqual(self.fetch(address='10.0.0.5').status_code, 200)
+        self.assertEqual(self.fetch().status_code, 404)
+
+
+PROMETHEUS_LINE = re.compile(
+    r'# (HELP|TYPE) [a-z_]+ .+'
+    r'|[a-z_]+\{([a-z_]+="(?:[^"\\]|\\.)*")(,[a-z_]+="(?:[^"\\]|\\.)*")*\} [0-9.e+-]+'
+)
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_SLOW_MS=60000)
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@example.com', phone='+77010000002', username='admin', password='x')
+
+    def setUp(self):
+        # Fresh counters so other tests' requests don't leak in
+        patcher = mock.patch.object(profiling, 'metrics', profiling.Metrics())
+        self.metrics = patcher.start()
+        self.addCleanup(patcher.stop)
+        # The middleware is installed when the client handles its first request
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def fetch(self, times=1):
+        for _ in range(times):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_counters_move(self):
+        self.fetch(3)
+        view = profiling.view_name(self.client.get('/metrics').wsgi_request)
+        self.assertEqual(self.metrics.requests[(view, 'GET', '200')], 4)
+        self.assertEqual(self.metrics.duration_count[view], 4)
+        self.assertGreater(self.metrics.duration_sum[view], 0)
+        # Every request loads at least the session and the user
+        self.assertGreaterEqual(self.metrics.sql_count[view], 8)
+        self.assertGreater(self.metrics.sql_time[view], 0)
+
+    def test_render_parses(self):
+        self.fetch(2)
+        text = self.client.get('/metrics').content.decode()
+        lines = text.splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            self.assertRegex(line, f'^(?:{PROMETHEUS_LINE.pattern})$')
+        samples = dict(line.rsplit(' ', 1) for line in lines if not line.startswith('#'))
+        requests = [float(value) for name, value in samples.items() if name.startswith('granica_requests_total{')]
+        self.assertEqual(sum(requests), 2)
+        # The +Inf bucket and the count of a histogram agree
+        infinite = [value for name, value in samples.items() if 'le="+Inf"' in name]
+        counts = [value for name, value in samples.items() if name.startswith('granica_request_duration_seconds_count{')]
+        self.assertEqual(infinite, counts)
+
+    def test_label_values_are_escaped(self):
+        profile = profiling.RequestProfile()
+        self.metrics.observe('say "hi"\\now', 'GET', 200, profile, 0.01)
+        line = next(line for line in self.metrics.render().splitlines() if line.startswith('granica_requests_total{'))
+        self.assertRegex(line, PROMETHEUS_LINE)
+        self.assertIn(r'view="say \"hi\"\\now"', line)
+
+    def perf_events(self):
+        return EventLog.objects.filter(event_type='PERF')
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0)
+    def test_every_request_sampled(self):
+        self.fetch(3)
+        events = self.perf_events()
+        self.assertEqual(events.count(), 3)
+        payload = events.first().payload
+        self.assertEqual(payload['path'], '/metrics')
+        self.assertEqual(payload['status'], 200)
+        self.assertGreater(payload['sql_count'], 0)
+        self.assertFalse(payload['slow'])
+        self.assertEqual(events.first().user, self.admin)
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0.25)
+    def test_sampled_at_rate(self):
+        draws = [0.1, 0.9, 0.3, 0.2, 0.5, 0.6, 0.7, 0.8]
+        with mock.patch('platform_manager.profiling.random.random', side_effect=draws):
+            self.fetch(len(draws))
+        self.assertEqual(self.perf_events().count(), 2)
+        # Unsampled requests are still counted
+        self.assertEqual(sum(self.metrics.requests.values()), len(draws))
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+    def test_no_events_when_sampling_is_off(self):
+        self.fetch(5)
+        self.assertFalse(self.perf_events().exists())
+        self.assertEqual(sum(self.metrics.requests.values()), 5)
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0, REQUEST_PROFILING_SLOW_MS=0)
+    def test_slow_requests_always_logged(self):
+        self.fetch(2)
+        events = self.perf_events()
+        self.assertEqual(events.count(), 2)
+        self.assertTrue(all(event.severity == 'WARNING' and event.payload['slow'] for event in events))
+
+    @override_settings(REQUEST_PROFILING=False, REQUEST_PROFILING_SAMPLE_RATE=1.0)
+    def test_off(self):
+        client = Client()
+        client.force_login(self.admin)
+        client.get('/metrics')
+        self.assertFalse(self.metrics.requests)
+        self.assertFalse(self.perf_events().exists())
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_superuser(email='manager@example.com', phone='+77010000001', username='synthetic-manager', password='x')
+        cls.submitter = User.objects.create_user(email='submitter@example.com', phone='+77010000002', username='synthetic-submitter-1')
+        cls.response = FormResponse.objects.create(last_name='Иванов', criminal_record=True, created_by=cls.submitter)
+        BorderOfficerAssessment.objects.create(form_response=cls.response, radical_internet=True)
+
+    def setUp(self):
+        use_temporary_media(self)
+        use_temporary_staging(self)
+
+    def rows(self):
+        return (
+            list(FormResponse.objects.values_list('pk', 'total_score', 'threat_level', 'revision', 'updated_at')),
+            list(BorderOfficerAssessment.objects.values_list('pk', 'total_score', 'threat_level', 'revision', 'updated_at')),
+        )
+
+    def test_recalculate_is_rolled_back(self):
+        FormResponse.objects.update(total_score=-1, threat_level='')
+        BorderOfficerAssessment.objects.update(total_score=-1, threat_level='')
+        before = self.rows()
+        [result] = benchmarks.run(['recalculate'], repeat=2)
+        self.assertEqual(result.runs, 2)
+        self.assertGreater(result.queries, 0)
+        self.assertEqual(self.rows(), before)
+
+    def test_refuses_real_data(self):
+        officer = User.objects.create_user(email='officer@example.com', phone='+77010000003', username='officer')
+        FormResponse.objects.create(last_name='Петров', created_by=officer)
+        self.assertFalse(benchmarks.is_synthetic())
+        with self.assertRaises(benchmarks.BenchmarkError):
+            benchmarks.run(['recalculate'], repeat=1)
+        with self.assertRaisesMessage(CommandError, '--allow-writes'):
+            call_command('run_benchmarks', 'recalculate', '--repeat', '1', stdout=StringIO(), stderr=StringIO())
+        output = StringIO()
+        call_command(
+            'run_benchmarks', 'recalculate', '--repeat', '1', '--allow-writes',
+            '--baseline', os.path.join(settings.MEDIA_ROOT, 'baseline.json'), stdout=output, stderr=StringIO(),
+        )
+        self.assertIn('recalculate', output.getvalue())
+
+    def test_synthetic_dataset(self):
+        self.assertTrue(benchmarks.is_synthetic())
+        FormResponse.objects.all().delete()
+        self.assertFalse(benchmarks.is_synthetic())
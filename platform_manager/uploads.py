@@ -0,0 +1,122 @@
+"""Disk-backed staging area for files uploaded during the form wizard.
+
+Photos attached on intermediate wizard steps are written in chunks to a
+quarantine directory outside of MEDIA_ROOT. Only a small handle (staged path,
+original name, content type and size) is kept in the session, and the final
+submit attaches the staged files directly without re-reading them into memory.
+Abandoned uploads are removed by the ``purge_staged_uploads`` command.
+"""
+import os
+import time
+import uuid
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+
+
+@lru_cache(maxsize=None)
+def get_staging_storage():
+    """Return the storage used for staged wizard uploads."""
+    location = getattr(settings, 'WIZARD_UPLOAD_STAGING_ROOT', os.path.join(settings.BASE_DIR, 'upload_staging'))
+    return FileSystemStorage(location=location)
+
+
+def stage_upload(uploaded_file, previous=None):
+    """Write an uploaded file to the staging area and return its session handle.
+
+    The storage streams the upload chunk by chunk (or moves the temporary file
+    when Django already spooled it to disk), so the content is never held in
+    memory as a whole. A previously staged file for the same field is removed.
+    """
+    storage = get_staging_storage()
+    ext = os.path.splitext(uploaded_file.name)[1].lower()
+    path = storage.save(f'{uuid.uuid4().hex}{ext}', uploaded_file)
+    if previous:
+        discard_staged(previous)
+    return {
+        'path': path,
+        'name': uploaded_file.name,
+        'content_type': uploaded_file.content_type,
+        'size': uploaded_file.size,
+        'staged_at': time.time(),
+    }
+
+
+def open_staged(handle):
+    """Open a staged file as an ``UploadedFile`` or return None if it is gone."""
+    if not isinstance(handle, dict) or 'path' not in handle:
+        return None
+    storage = get_staging_storage()
+    if not storage.exists(handle['path']):
+        return None
+    return UploadedFile(
+        file=storage.open(handle['path'], 'rb'),
+        name=handle['name'],
+        content_type=handle.get('content_type'),
+        size=handle.get('size'),
+    )
+
+
+def open_staged_files(file_data):
+    """Open every staged file from a ``{field_name: handle}`` mapping."""
+    files = {}
+    for field_name, handle in (file_data or {}).items():
+        staged = open_staged(handle)
+        if staged is not None:
+            files[field_name] = staged
+    return files
+
+
+def close_files(files):
+    """Close file objects returned by ``open_staged_files``."""
+    for staged in files.values():
+        try:
+            staged.close()
+        except Exception:
+            pass
+
+
+def discard_staged(handle):
+    """Delete a staged file; missing files are ignored."""
+    if not isinstance(handle, dict) or 'path' not in handle:
+        return
+    try:
+        get_staging_storage().delete(handle['path'])
+    except OSError:
+        pass
+
+
+def discard_staged_files(file_data):
+    """Delete every staged file from a ``{field_name: handle}`` mapping."""
+    for handle in (file_data or {}).values():
+        discard_staged(handle)
+
+
+def purge_stale_uploads(max_age=None, keep=()):
+    """Delete staged files older than ``max_age`` seconds and return their count.
+
+    Defaults to ``WIZARD_UPLOAD_STAGING_TTL`` (24 hours). Paths listed in
+    ``keep`` (files of drafts that are still alive) are left alone.
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'WIZARD_UPLOAD_STAGING_TTL', 24 * 60 * 60)
+    storage = get_staging_storage()
+    if not os.path.isdir(storage.location):
+        return 0
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    removed = 0
+    _, filenames = storage.listdir('')
+    for filename in filenames:
+        if filename in keep:
+            continue
+        try:
+            if storage.get_modified_time(filename) < cutoff:
+                storage.delete(filename)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -7,6 +7,8 @@ urlpatterns = [
 	path('submit/', views.SubmitFormView.as_view(), name='form_submit'),
 	path('submitted/', views.FormSubmittedView.as_view(), name='form_submitted'),
 	path('responses/', views.ResponsesListView.as_view(), name='form_responses'),
+	path('responses/export/', views.export_responses_bulk, name='export_responses_bulk'),
+	path('responses/api/', views.responses_api, name='form_responses_api'),
 	path('responses/<uuid:pk>/', views.FormResponseDetailView.as_view(), name='form_response_detail'),
 	path('responses/<uuid:pk>/edit/', views.EditFormResponseView.as_view(), name='form_response_edit'),
 	path('responses/<uuid:pk>/delete/', views.FormResponseDeleteView.as_view(), name='form_response_delete'),
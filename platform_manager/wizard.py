@@ -0,0 +1,172 @@
+"""Step schema of the 22-step questionnaire wizard.
+
+Each step lists the questionnaire (``FormResponse``) and officer assessment
+fields it renders. The schema is compiled once at import into ``Step`` objects
+that know their boolean, multiple choice and file fields and carry form classes
+limited to their own fields. A step POST binds, validates and stores only the
+fields of that step, and the wizard page builds only the forms of the step it
+shows.
+"""
+from django import forms
+
+from .forms import BorderOfficerAssessmentForm, FormResponseForm
+
+TOTAL_STEPS = 22
+
+STEP_FIELDS = {
+    1: ('last_name', 'first_name', 'patronymic', 'birth_date', 'birth_place', 'full_name_photo', 'person_photo'),
+    2: ('name_changed', 'name_change_reason'),
+    3: ('phones_emails',),
+    4: ('military_service', 'military_details'),
+    5: ('criminal_record', 'criminal_period_where', 'criminal_offenses'),
+    6: ('detained_abroad', 'detained_when_why', 'detained_where'),
+    7: ('relatives_wanted', 'relatives_wanted_reason'),
+    8: ('religious', 'denomination', 'denomination_other'),
+    9: ('visited_countries', 'visited_when_purpose', 'visited_duration'),
+    10: ('deported', 'deportation_details'),
+    11: ('not_allowed_reason',),
+    12: ('last_time_in_homeland',),
+    13: ('suspicious_mobile_content', 'suspicious_mobile_types', 'suspicious_mobile_details', 'suspicious_mobile_photo'),
+    14: ('radical_religious_ideology', 'radical_religious_signs', 'radical_religious_details'),
+    15: ('document_issues', 'document_issues_types', 'document_issues_details'),
+    16: ('religious_deviations', 'religious_deviations_types', 'religious_deviations_details'),
+    17: (
+        'radical_internet', 'radical_internet_content', 'radical_internet_sheikhs',
+        'radical_internet_details', 'radical_internet_photo',
+    ),
+    18: ('suspicious_behavior', 'suspicious_behavior_types', 'suspicious_behavior_details'),
+    19: ('psychological_issues', 'psychological_types', 'psychological_details'),
+    20: ('relatives_mto', 'relatives_mto_types', 'criminal_element_types', 'relatives_mto_details'),
+    21: ('criminal_element', 'criminal_element_details'),
+    22: ('violence_traces', 'violence_traces_types', 'violence_traces_details', 'notes'),
+}
+
+# Answers that only make sense when the yes/no question they follow is checked
+DEPENDENT_FIELDS = {
+    'name_changed': ('name_change_reason',),
+    'military_service': ('military_details',),
+    'criminal_record': ('criminal_period_where', 'criminal_offenses'),
+    'detained_abroad': ('detained_when_why', 'detained_where'),
+    'relatives_in_countries': ('relatives_full_name', 'relatives_when_left', 'relatives_occupation', 'relatives_details'),
+    'relatives_wanted': ('relatives_wanted_reason',),
+    'religious': ('denomination', 'denomination_other'),
+    'visited_countries': ('visited_when_purpose', 'visited_duration', 'visited_countries_details'),
+    'deported': ('deportation_details',),
+}
+
+
+def _subset_form(base, fields, number):
+    """Subclass of the ModelForm ``base`` that only has ``fields``."""
+    # Declared fields are added whatever Meta.fields says, so drop the foreign ones
+    attrs = {name: None for name in base.declared_fields if name not in fields}
+    attrs['Meta'] = type('Meta', (base.Meta,), {'fields': list(fields)})
+    return type(f'{base.__name__}Step{number}', (base,), attrs)
+
+
+class Step:
+    """One wizard step: its fields and the forms that render and validate them."""
+
+    def __init__(self, number, fields):
+        self.number = number
+        self.fields = tuple(fields)
+        response_fields = [name for name in self.fields if name in FormResponseForm.base_fields]
+        assessment_fields = [name for name in self.fields if name in BorderOfficerAssessmentForm.base_fields]
+        unknown = set(self.fields) - set(response_fields) - set(assessment_fields)
+        if unknown:
+            raise ValueError(f'Wizard step {number} has unknown fields: {", ".join(sorted(unknown))}')
+
+        self.response_form_class = _subset_form(FormResponseForm, response_fields, number) if response_fields else None
+        self.assessment_form_class = (
+            _subset_form(BorderOfficerAssessmentForm, assessment_fields, number) if assessment_fields else None
+        )
+
+        base_fields = {**FormResponseForm.base_fields, **BorderOfficerAssessmentForm.base_fields}
+        self.bool_fields = tuple(name for name in self.fields if isinstance(base_fields[name], forms.BooleanField))
+        self.multi_fields = tuple(
+            name for name in self.fields if isinstance(base_fields[name], forms.MultipleChoiceField)
+        )
+        self.file_fields = tuple(name for name in self.fields if isinstance(base_fields[name], forms.FileField))
+
+    def get_forms(self, data=None, files=None, initial=None):
+        """Return ``(form, assessment_form)`` for this step; a missing side is None."""
+        kwargs = {'initial': initial} if data is None else {'data': data, 'files': files}
+        form = self.response_form_class(**kwargs) if self.response_form_class else None
+        assessment_form = self.assessment_form_class(**kwargs) if self.assessment_form_class else None
+        return form, assessment_form
+
+    def parse(self, post):
+        """Return the draft answers of this step from a step POST.
+
+        Checkboxes are stored as booleans and multiple choice fields as lists,
+        so an unchecked answer overrides what an earlier visit saved.
+        """
+        data = {}
+        for name in self.fields:
+            if name in self.file_fields:
+                continue
+            if name in self.bool_fields:
+                data[name] = post.get(name) == 'on'
+            elif name in self.multi_fields:
+                data[name] = post.getlist(name)
+            elif name in post:
+                data[name] = post.get(name)
+        return data
+
+    def uploaded_files(self, files):
+        return {name: files[name] for name in self.file_fields if name in files}
+
+
+STEPS = {number: Step(number, fields) for number, fields in STEP_FIELDS.items()}
+
+FIELD_STEPS = {name: step.number for step in STEPS.values() for name in step.fields}
+
+BOOL_FIELDS = tuple(name for step in STEPS.values() for name in step.bool_fields) + ('relatives_in_countries',)
+
+
+def get_step(value, default=1):
+    """Return the step number in ``value`` (a GET/POST parameter) within 1..TOTAL_STEPS."""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = default
+    return min(max(number, 1), TOTAL_STEPS)
+
+
+def submit_data(form_data):
+    """Turn merged draft answers into form data for the final submit.
+
+    Checked answers become ``'on'``; unchecked ones are dropped together with
+    the answers that depend on them.
+    """
+    data = dict(form_data)
+    for name in BOOL_FIELDS:
+        value = form_data.get(name)
+        if value is True or value == 'on':
+            data[name] = 'on'
+        elif name in data:
+            del data[name]
+            for dependent in DEPENDENT_FIELDS.get(name, ()):
+                data[dependent] = ''
+    return data
+
+
+def form_errors(*forms_):
+    """Flatten the errors of bound forms into ``'Label: message'`` strings."""
+    errors = []
+    for form in forms_:
+        if form is None:
+            continue
+        for name, messages in form.errors.items():
+            label = form.fields[name].label if name in form.fields else None
+            errors.extend(f'{label}: {message}' if label else message for message in messages)
+    return errors
+
+
+def first_invalid_step(*forms_):
+    """Number of the first step holding a field with errors in the bound ``forms_``."""
+    steps = [
+        FIELD_STEPS.get(name, 1)
+        for form in forms_ if form is not None
+        for name in form.errors
+    ]
+    return min(steps) if steps else 1